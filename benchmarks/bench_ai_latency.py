@@ -0,0 +1,178 @@
+"""
+AI呼び出しの応答時間のベンチマーク
+
+役割:
+- ローカルのスタブサーバー（utils.ai_stub_server）に対して AIInterface の send_message（順番と並行）、
+  analyze_tasks_batch、stream_message を実行し、応答時間の p50 / p95 / p99 とスループットを表示する
+  （実際のAPIを使わずに、AIの呼び出し経路の性能の変化を確かめる）
+
+使い方:
+- python benchmarks/bench_ai_latency.py [--requests 200] [--concurrency 8] [--latency-ms 50] [--jitter-ms 20]
+  [--error-rate 0] [--stream-chunks 20] [--stream-interval-ms 5] [--batch-size 16] [--batches 10]
+  [--scenarios send send_concurrent batch stream]
+
+注意点:
+- 一時ディレクトリにDBを作成し、終了後に削除する（会話履歴の保存とコンテキストの組み立ても計測に含まれる）
+- 応答キャッシュは使わない（毎回スタブサーバーまで送る）
+- --error-rate を指定した場合は再試行の待ち時間も応答時間に含まれる（待ち時間の基準は --backoff-ms）
+- ストリーミングは最初の断片が届くまでの時間（TTFT）と、最後まで受け取るまでの時間を別に表示する
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from cryptography.fernet import Fernet
+
+from src.core.ai_interface import AIInterface, AIRequestError, ERROR_RESPONSE
+from src.data.ai_conversation import AIConversationManager
+from src.data.database import Database
+from src.utils.ai_stub_server import StubChatServer
+
+SCENARIOS = ['send', 'send_concurrent', 'batch', 'stream']
+ANALYSIS_CONTENT = '[{"title": "資料を集める"}, {"title": "構成を決める"}, {"title": "下書きを書く"}]'
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return (time.perf_counter() - started) * 1000, result
+
+
+def _report(label, latencies, wall_seconds, items, failures):
+    throughput = items / wall_seconds if wall_seconds > 0 else 0.0
+    print(f"{label:<22}{len(latencies):>6}{failures:>6}{_percentile(latencies, 0.5):>10.1f}"
+          f"{_percentile(latencies, 0.95):>10.1f}{_percentile(latencies, 0.99):>10.1f}{max(latencies):>10.1f}"
+          f"{throughput:>12.1f}")
+
+
+def run_send(ai, requests, concurrency):
+    def send(index):
+        return _timed(ai.send_message, f"質問 {index}")
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        results = [send(index) for index in range(requests)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(send, range(requests)))
+    wall = time.perf_counter() - started
+    return [ms for ms, _ in results], wall, requests, sum(1 for _, reply in results if reply == ERROR_RESPONSE)
+
+
+def run_batch(ai, batches, batch_size):
+    latencies = []
+    failures = 0
+    started = time.perf_counter()
+    for batch in range(batches):
+        descriptions = [f"レポート {batch}-{index} を仕上げる" for index in range(batch_size)]
+        ms, results = _timed(ai.analyze_tasks_batch, descriptions, None, False)
+        latencies.append(ms)
+        failures += sum(1 for items in results if not items)
+    return latencies, time.perf_counter() - started, batches * batch_size, failures
+
+
+def run_stream(ai, requests):
+    first_chunk = []
+    total = []
+    failures = 0
+    started = time.perf_counter()
+    for index in range(requests):
+        request_started = time.perf_counter()
+        first = None
+        try:
+            for _ in ai.stream_message(f"質問 {index}"):
+                if first is None:
+                    first = (time.perf_counter() - request_started) * 1000
+        except AIRequestError:
+            failures += 1
+            continue
+        first_chunk.append(first if first is not None else 0.0)
+        total.append((time.perf_counter() - request_started) * 1000)
+    return first_chunk, total, time.perf_counter() - started, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI呼び出しの応答時間のベンチマーク")
+    parser.add_argument('--requests', type=int, default=200, help="send / stream の送信回数")
+    parser.add_argument('--concurrency', type=int, default=8, help="並行送信と一括分解の同時実行数")
+    parser.add_argument('--latency-ms', type=float, default=50, help="スタブサーバーの応答までの遅延")
+    parser.add_argument('--jitter-ms', type=float, default=20, help="遅延に加える乱数の上限")
+    parser.add_argument('--error-rate', type=float, default=0, help="エラー（503）を返す割合")
+    parser.add_argument('--backoff-ms', type=float, default=20, help="再試行の待ち時間の基準")
+    parser.add_argument('--stream-chunks', type=int, default=20)
+    parser.add_argument('--stream-interval-ms', type=float, default=5)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--batches', type=int, default=10)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    database = Database({'database_path': os.path.join(temp_dir, 'bench.db')})
+    server = StubChatServer(latency=args.latency_ms / 1000, latency_jitter=args.jitter_ms / 1000,
+                            stream_chunks=[f"断片{index} " for index in range(args.stream_chunks)],
+                            stream_interval=args.stream_interval_ms / 1000, error_rate=args.error_rate,
+                            seed=args.seed).start()
+    key = Fernet.generate_key()
+    config = {
+        'encryption_key': key.decode(),
+        'encrypted_openai_api_key': Fernet(key).encrypt(b'bench-key').decode(),
+        'ai_api_url': server.url,
+        'ai_cache_path': '',
+        'ai_backoff_base': args.backoff_ms / 1000,
+        'ai_batch_concurrency': args.concurrency,
+        # エラーを注入しても送信が止まらないようにする
+        'ai_circuit_failure_threshold': 10 ** 9,
+    }
+    ai = None
+    try:
+        database.initialize()
+        ai = AIInterface(config, AIConversationManager(database))
+        print(f"スタブサーバー: 遅延 {args.latency_ms:.0f}±{args.jitter_ms:.0f}ms, エラー率 {args.error_rate:.0%}, "
+              f"同時実行数 {args.concurrency}")
+        print(f"{'シナリオ':<22}{'件数':>6}{'失敗':>6}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}"
+              f"{'最大(ms)':>10}{'件/秒':>12}")
+
+        if 'send' in args.scenarios:
+            _report('send_message', *run_send(ai, args.requests, 1))
+        if 'send_concurrent' in args.scenarios:
+            _report(f'send_message x{args.concurrency}', *run_send(ai, args.requests, args.concurrency))
+        if 'batch' in args.scenarios:
+            server.content = ANALYSIS_CONTENT
+            # 件/秒は分解したタスク説明の数、応答時間は1回の一括分解にかかった時間
+            _report(f'analyze_batch ({args.batch_size}件)', *run_batch(ai, args.batches, args.batch_size))
+            server.content = 'ok'
+        if 'stream' in args.scenarios:
+            first_chunk, total, wall, failures = run_stream(ai, args.requests)
+            if total:
+                _report('stream (最初の断片)', first_chunk, wall, len(total), failures)
+                _report('stream (全体)', total, wall, len(total), failures)
+            else:
+                print("stream: すべての送信が失敗しました")
+
+        metrics = ai.get_metrics()
+        print(f"送信 {metrics['calls']}回, 成功 {metrics['succeeded']}回, 失敗 {metrics['failed']}回, "
+              f"再試行 {metrics['retries']}回")
+    finally:
+        if ai is not None:
+            ai.close()
+        server.stop()
+        database.close()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+会話検索のベンチマーク
+
+役割:
+- AIConversationManager.search_conversations（FTS5の全文検索）と、以前の LIKE '%kw%' による全件の走査を、
+  会話の件数を増やしながら比較する
+
+使い方:
+- python benchmarks/bench_conversation_search.py [--sizes 10000 100000 300000] [--repeat 5] [--max-candidates 2000]
+
+注意点:
+- 一時ディレクトリにDBを作成し、終了後に削除する
+- 検索語はまれにしか現れない語と、よく現れる語の2種類（どちらも上位20件を取得する）
+- よく現れる語は、max_candidates で対象の一致の件数を限った場合も計測する
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.ai_conversation import AIConversationManager
+from src.data.database import Database
+
+WORDS = ['タスク', '集中', '休憩', 'ポモドーロ', '計画', '優先順位', '会議', '資料', 'レビュー', '締め切り',
+         'メール', '報告', '設計', 'テスト', '学習', '運動', '睡眠', '目標', '習慣', '振り返り']
+RARE_WORD = '確定申告'
+QUERIES = {'まれな語': RARE_WORD, 'よく現れる語': 'ポモドーロ'}
+
+
+def _messages(start_index: int, count: int):
+    random.seed(start_index)
+    base = datetime(2022, 1, 1)
+    for index in range(start_index, start_index + count):
+        words = random.choices(WORDS, k=random.randint(8, 30))
+        if index % 5000 == 0:
+            words.append(RARE_WORD)
+        yield ('、'.join(words) + 'について相談したいです。', 'user' if index % 2 == 0 else 'assistant',
+               base + timedelta(minutes=index))
+
+
+def _like_search(database: Database, keyword: str, limit: int):
+    return database.execute_query("SELECT * FROM ai_conversations WHERE message LIKE ? ORDER BY timestamp DESC LIMIT ?",
+                                  (f'%{keyword}%', limit))
+
+
+def _measure(func, repeat: int) -> float:
+    elapsed = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed.append((time.perf_counter() - started) * 1000)
+    return statistics.median(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="会話検索のベンチマーク")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 300_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-candidates', type=int, default=2000,
+                        help="よく現れる語を、新しい順の一致の件数を限って検索した場合も計測する")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    database = Database({'database_path': os.path.join(temp_dir, 'bench.db')})
+    try:
+        database.initialize()
+        manager = AIConversationManager(database)
+        print(f"{'件数':<10}{'検索語':<12}{'FTS5(ms)':>10}{'LIKE(ms)':>10}")
+        inserted = 0
+        for size in sorted(args.sizes):
+            database.execute_many("INSERT INTO ai_conversations (message, role, timestamp) VALUES (?, ?, ?)",
+                                  _messages(inserted, size - inserted))
+            inserted = size
+            for label, keyword in QUERIES.items():
+                fts_ms = _measure(lambda: manager.search_conversations(keyword, limit=20), args.repeat)
+                like_ms = _measure(lambda: _like_search(database, keyword, 20), args.repeat)
+                print(f"{size:<10}{label:<12}{fts_ms:>10.1f}{like_ms:>10.1f}")
+            capped_ms = _measure(lambda: manager.search_conversations(QUERIES['よく現れる語'], limit=20,
+                                                                      max_candidates=args.max_candidates), args.repeat)
+            print(f"{size:<10}{'上限 ' + str(args.max_candidates) + '件':<12}{capped_ms:>10.1f}")
+    finally:
+        database.close()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+週別・月別レポートの並列計算ベンチマーク
+
+役割:
+- DataAnalyzer.generate_period_report を、ワーカープロセス数を変えて実行し、コア数に対する伸びを比較する
+
+使い方:
+- python benchmarks/bench_report_pipeline.py [--sessions 500000] [--workers 0 1 2 4 8] [--repeat 3]
+
+注意点:
+- ワーカー数 0 はプロセスを使わず、このプロセス内で順番に計算する（基準）
+- 時間にはワーカープロセスの起動時間も含まれる
+- 一時ディレクトリにDBを作成し、終了後に削除する
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from benchmarks.bench_session_analytics import _insert
+from src.data.data_analyzer import DataAnalyzer
+from src.data.database import Database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="週別・月別レポートの並列計算ベンチマーク")
+    parser.add_argument('--sessions', type=int, default=500_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    database = Database({'database_path': os.path.join(temp_dir, 'bench.db')})
+    try:
+        database.initialize()
+        _insert(database, 0, args.sessions)
+        analyzer = DataAnalyzer(database)
+        analyzer.store.refresh()
+
+        print(f"セッション数: {args.sessions}, CPU数: {os.cpu_count()}")
+        print(f"{'ワーカー数':<10}{'最短(ms)':>12}{'対順次':>10}")
+        baseline = None
+        for workers in args.workers:
+            elapsed = []
+            for _ in range(args.repeat):
+                # 集計のキャッシュを使わずに毎回計算させる
+                analyzer.sessions.invalidate()
+                started = time.perf_counter()
+                analyzer.generate_period_report(max_workers=workers)
+                elapsed.append((time.perf_counter() - started) * 1000)
+            best = min(elapsed)
+            baseline = baseline or best
+            print(f"{workers:<10}{best:>12.1f}{baseline / best:>9.2f}x")
+    finally:
+        database.close()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
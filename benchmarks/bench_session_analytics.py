@@ -0,0 +1,83 @@
+"""
+セッション集計のベンチマーク
+
+役割:
+- 作業パターン・集中時間の統計を、SQLiteでの集計（'sql'）と、行を読み込んでのpandasでの集計（'pandas'）で比較する
+
+使い方:
+- python benchmarks/bench_session_analytics.py [--sessions 1000000] [--append 100]
+
+注意点:
+- 一時ディレクトリにDBを作成し、終了後に削除する
+- 「初回」は全件の集計、「追加後」は --append 件を追加してからの差分の集計にかかった時間
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.analytics_engine import SessionAnalytics
+from src.data.database import Database
+
+
+def _sessions(start_index: int, count: int):
+    random.seed(start_index)
+    base = datetime(2020, 1, 1)
+    for index in range(start_index, start_index + count):
+        start_time = base + timedelta(minutes=index * 30)
+        duration = random.choice((300, 900, 1500))
+        yield (start_time, start_time + timedelta(seconds=duration), duration)
+
+
+def _insert(database: Database, start_index: int, count: int):
+    database.execute_many("INSERT INTO sessions (start_time, end_time, duration) VALUES (?, ?, ?)",
+                          _sessions(start_index, count))
+
+
+def _measure(analytics: SessionAnalytics) -> float:
+    started = time.perf_counter()
+    analytics.work_patterns()
+    analytics.focus_time_statistics()
+    analytics.daily_work_time(7)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="セッション集計のベンチマーク")
+    parser.add_argument('--sessions', type=int, default=1_000_000)
+    parser.add_argument('--append', type=int, default=100, help="初回の集計後に追加するセッション数")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    database = Database({'database_path': os.path.join(temp_dir, 'bench.db')})
+    try:
+        database.initialize()
+        _insert(database, 0, args.sessions)
+        analytics = {backend: SessionAnalytics(database, backend) for backend in ('sql', 'pandas')}
+
+        print(f"セッション数: {args.sessions}, 追加: {args.append}")
+        print(f"{'方式':<8}{'初回(ms)':>12}{'変更なし(ms)':>14}{'追加後(ms)':>12}")
+        initial = {backend: _measure(engine) for backend, engine in analytics.items()}
+        unchanged = {backend: _measure(engine) for backend, engine in analytics.items()}
+        _insert(database, args.sessions, args.append)
+        appended = {backend: _measure(engine) for backend, engine in analytics.items()}
+        for backend in analytics:
+            print(f"{backend:<8}{initial[backend]:>12.1f}{unchanged[backend]:>14.2f}{appended[backend]:>12.2f}")
+
+        if analytics['sql'].work_patterns() != analytics['pandas'].work_patterns():
+            print("警告: 2つの方式で集計結果が一致しません。")
+    finally:
+        database.close()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+起動時間のベンチマーク
+
+役割:
+- 起動時に読み込むモジュールの読み込み時間（python -X importtime）と、最初の描画までの時間を計測する
+- 起動時間の予算を超えた場合や、起動時に重いライブラリを読み込んだ場合に終了コード1で終了する
+
+使い方:
+- python benchmarks/bench_startup.py [--repeat 5] [--top 15] [--import-budget-ms 150] [--paint-budget-ms 1500]
+
+注意点:
+- 各計測は新しいプロセスで行う（ディスクキャッシュは温まった状態での計測になる）
+- 最初の描画までの時間は src/main.py --startup-probe を QT_QPA_PLATFORM=offscreen で起動して計測する
+  （PySide6 がない環境では省略する）
+- 読み込み時間はPySide6の有無で変わらないよう、GUI以外の起動時のモジュール（STARTUP_MODULES）で計測する
+"""
+
+import argparse
+import importlib.util
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# main.py が起動時に読み込むGUI以外のモジュール
+STARTUP_MODULES = [
+    'src.utils.config',
+    'src.data.database',
+    'src.data.ai_conversation',
+    'src.core.timer',
+    'src.core.session_manager',
+    'src.core.task_manager',
+    'src.core.notification_manager',
+    'src.core.ai_interface',
+]
+
+# 起動時に読み込んではいけないライブラリ（レポートやAIの送信を使うときに読み込む）
+DEFERRED_MODULES = ['pandas', 'matplotlib', 'numpy', 'requests']
+
+_IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def measure_imports():
+    """(合計ミリ秒, [(累積ミリ秒, モジュール名)], 読み込まれた重いライブラリ) を返す"""
+    code = ("import sys; " + "; ".join(f"import {name}" for name in STARTUP_MODULES) +
+            f"; print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=project_root,
+                            capture_output=True, text=True, check=True)
+    total_us = 0
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match is None:
+            continue
+        cumulative_us, indent, name = int(match.group(2)), match.group(3), match.group(4)
+        if name == 'site' or name.startswith(('site.', 'sitecustomize', 'encodings')):
+            continue  # インタープリターの起動処理はアプリの読み込みに含めない
+        modules.append((cumulative_us / 1000, name))
+        if len(indent) == 1:
+            # 最上位の読み込みだけを合計する（入れ子の分は累積に含まれている）
+            total_us += cumulative_us
+    loaded = [name for name in result.stdout.strip().split(',') if name]
+    return total_us / 1000, modules, loaded
+
+
+def measure_first_paint():
+    """最初の描画までのミリ秒（プロセス起動から、アプリ内で計測した値）を返す"""
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, os.path.join('src', 'main.py'), '--startup-probe'], cwd=project_root,
+                            env=env, capture_output=True, text=True, timeout=60)
+    wall_ms = (time.perf_counter() - started) * 1000
+    match = re.search(r'first_paint_ms=([\d.]+)', result.stdout)
+    if match is None:
+        raise RuntimeError(f"最初の描画までの時間を取得できませんでした: {result.stderr.strip()[-500:]}")
+    return wall_ms, float(match.group(1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="起動時間のベンチマーク")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help="表示する読み込みの遅いモジュールの数")
+    parser.add_argument('--import-budget-ms', type=float, default=150,
+                        help="起動時のモジュールの読み込み時間の予算（中央値）")
+    parser.add_argument('--paint-budget-ms', type=float, default=1500,
+                        help="プロセス起動から最初の描画までの時間の予算（中央値）")
+    args = parser.parse_args()
+    failures = []
+
+    runs = [measure_imports() for _ in range(args.repeat)]
+    import_ms = statistics.median(total for total, _, _ in runs)
+    print(f"起動時のモジュールの読み込み: {import_ms:.1f}ms（中央値, 予算 {args.import_budget_ms:.0f}ms）")
+    for cumulative_ms, name in sorted(runs[-1][1], reverse=True)[:args.top]:
+        print(f"  {cumulative_ms:>8.1f}ms  {name}")
+    if import_ms > args.import_budget_ms:
+        failures.append("読み込み時間が予算を超えています")
+    loaded = sorted({name for _, _, names in runs for name in names})
+    if loaded:
+        failures.append(f"起動時に読み込まれたライブラリがあります: {', '.join(loaded)}")
+
+    if importlib.util.find_spec('PySide6') is None:
+        print("PySide6 がないため、最初の描画までの時間の計測を省略します。")
+    else:
+        paints = [measure_first_paint() for _ in range(args.repeat)]
+        wall_ms = statistics.median(wall for wall, _ in paints)
+        inside_ms = statistics.median(inside for _, inside in paints)
+        print(f"最初の描画まで: {wall_ms:.1f}ms（プロセス起動から, 中央値, 予算 {args.paint_budget_ms:.0f}ms）"
+              f" / {inside_ms:.1f}ms（main.py の実行開始から）")
+        if wall_ms > args.paint_budget_ms:
+            failures.append("最初の描画までの時間が予算を超えています")
+
+    for failure in failures:
+        print(f"予算超過: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
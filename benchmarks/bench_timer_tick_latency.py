@@ -0,0 +1,106 @@
+"""
+タイマーのティック遅延ベンチマーク
+
+役割:
+- スレッド方式（time.sleepのループ）とasyncio方式（loop.call_at の締め切り）で、
+  各ティックが本来の時刻からどれだけ遅れて届くかを比較する
+
+使い方:
+- python benchmarks/bench_timer_tick_latency.py [--ticks 250] [--interval 0.02] [--load 2]
+
+注意点:
+- --load を指定すると、CPUを消費するスレッドを同時に動かしてGILの競合がある状況を再現する
+- 遅延は「開始時刻 + ティック番号 × 間隔」からのずれとして計測するため、累積の遅れも含まれる
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.core.async_runtime import AsyncRuntime
+from src.core.timer import Timer
+
+
+class _SilentNotifier:
+    def notify_timer_complete(self, timer_type):
+        pass
+
+
+class _BenchConfig:
+    def __init__(self, work_time):
+        self._settings = {'work_time': work_time}
+
+    def get(self, key, default=None):
+        return self._settings.get(key, default)
+
+
+def _busy_loop(stop_event):
+    while not stop_event.is_set():
+        sum(range(1000))
+
+
+def measure(mode: str, ticks: int, interval: float):
+    runtime = None
+    if mode == 'asyncio':
+        runtime = AsyncRuntime()
+        runtime.start()
+
+    timer = Timer(_BenchConfig(ticks), _SilentNotifier(), runtime)
+    timer.tick_interval = interval
+    timer.remaining_time = ticks
+    arrivals = []
+    done = threading.Event()
+
+    def observer(state, timer_type, remaining_time):
+        arrivals.append((ticks - remaining_time, time.perf_counter()))
+        if remaining_time <= 0:
+            done.set()
+
+    timer.add_observer(observer)
+    started = time.perf_counter()
+    timer.start()
+    done.wait(ticks * interval * 5 + 5)
+    timer.remove_observer(observer)
+    if runtime is not None:
+        runtime.stop()
+
+    lateness = [(arrived - (started + index * interval)) * 1000 for index, arrived in arrivals if index > 0]
+    return lateness
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="タイマーのティック遅延ベンチマーク")
+    parser.add_argument('--ticks', type=int, default=250)
+    parser.add_argument('--interval', type=float, default=0.02, help="ティック間隔（秒）")
+    parser.add_argument('--load', type=int, default=0, help="同時に動かすCPU負荷スレッド数")
+    args = parser.parse_args()
+
+    stop_event = threading.Event()
+    load_threads = [threading.Thread(target=_busy_loop, args=(stop_event,), daemon=True) for _ in range(args.load)]
+    for thread in load_threads:
+        thread.start()
+
+    print(f"ティック数: {args.ticks}, 間隔: {args.interval * 1000:.0f}ms, 負荷スレッド: {args.load}")
+    print(f"{'方式':<8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'最大(ms)':>10}{'最終ずれ(ms)':>14}")
+    try:
+        for mode in ('threads', 'asyncio'):
+            lateness = measure(mode, args.ticks, args.interval)
+            print(f"{mode:<8}{statistics.median(lateness):>10.2f}{_percentile(lateness, 0.95):>10.2f}"
+                  f"{_percentile(lateness, 0.99):>10.2f}{max(lateness):>10.2f}{lateness[-1]:>14.2f}")
+    finally:
+        stop_event.set()
+
+
+if __name__ == "__main__":
+    main()
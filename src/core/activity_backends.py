@@ -0,0 +1,305 @@
+"""
+アクティブウィンドウ監視のバックエンド
+
+役割:
+- OSごとのアクティブウィンドウ取得方法の違いを吸収し、ActivityTrackerから差し替え可能にする
+
+主な機能:
+- WindowsActivityBackend: SetWinEventHook による前面ウィンドウ変更フック
+- X11ActivityBackend: xprop -spy による _NET_ACTIVE_WINDOW の変更監視（X11 / XWayland）
+- ReplayActivityBackend: 記録済みのイベント列を再生する（テスト用）
+- NullActivityBackend: 何もしない
+- ProcessNameCache: (PID, プロセスの作成時刻) からプロセス名へのLRUキャッシュ
+
+使用するクラス/モジュール:
+- ctypes（Windows）
+- xprop コマンド（Linux）
+- psutil
+
+注意点:
+- ポーリングではなく、前面ウィンドウが変わったときだけコールバックを呼ぶこと
+- コールバックはバックエンドのスレッドから (アプリ名, UNIX時刻) で呼ばれる
+- OS固有のライブラリやコマンドは start() の時点で読み込み・起動すること
+- 純粋なWaylandセッションでは前面ウィンドウを取得する共通APIがないため、XWayland上のアプリのみ対象となる
+- PIDは終了したプロセスのものが再利用されるため、プロセスの作成時刻もキャッシュのキーに含める
+  （Windowsは GetProcessTimes、Linuxは /proc/<pid>/stat の開始時刻）
+  （作成時刻を取得できないプロセスは、毎回プロセス名を引き直す）
+"""
+
+import logging
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional, Tuple
+
+ActivityCallback = Callable[[str, float], None]
+
+UNKNOWN_APP = "Unknown"
+
+
+class ProcessNameCache:
+    """(PID, プロセスの作成時刻) からプロセス名を引くLRUキャッシュ"""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._names = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, pid: int, created: Optional[int] = None) -> str:
+        """created にはプロセスの作成時刻を渡す（PIDを再利用した別のプロセスを、古い名前で返さないため）"""
+        key = (pid, created)
+        with self._lock:
+            name = self._names.get(key)
+            if name is not None:
+                self._names.move_to_end(key)
+                self.hits += 1
+                return name
+            self.misses += 1
+
+        import psutil
+        try:
+            name = psutil.Process(pid).name()
+        except (psutil.Error, ValueError):
+            return UNKNOWN_APP
+
+        with self._lock:
+            self._names[key] = name
+            if len(self._names) > self.maxsize:
+                self._names.popitem(last=False)
+        return name
+
+    def invalidate(self, pid: Optional[int] = None):
+        with self._lock:
+            if pid is None:
+                self._names.clear()
+            else:
+                for key in [key for key in self._names if key[0] == pid]:
+                    del self._names[key]
+
+
+class ActivityBackend:
+    name = 'base'
+
+    def __init__(self, name_cache: Optional[ProcessNameCache] = None):
+        self.name_cache = name_cache or ProcessNameCache()
+
+    def start(self, callback: ActivityCallback):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+
+class WindowsActivityBackend(ActivityBackend):
+    name = 'windows'
+
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    WM_QUIT = 0x0012
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+
+    def __init__(self, name_cache: Optional[ProcessNameCache] = None):
+        super().__init__(name_cache)
+        self._thread = None
+        self._thread_id = None
+        self._ready = threading.Event()
+
+    def start(self, callback: ActivityCallback):
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run_hook, args=(callback,), daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+
+    def stop(self):
+        if self._thread_id is not None:
+            import ctypes
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, self.WM_QUIT, 0, 0)
+        if self._thread is not None:
+            self._thread.join()
+        self._thread = None
+        self._thread_id = None
+
+    def _app_name(self, user32, kernel32, hwnd) -> str:
+        import ctypes
+        pid = ctypes.c_ulong()
+        user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+        if not pid.value:
+            return UNKNOWN_APP
+        created = self._process_created(kernel32, pid.value)
+        if created is None:
+            # PIDが再利用されたかどうかを見分けられないため、キャッシュを使わない
+            self.name_cache.invalidate(pid.value)
+        return self.name_cache.get(pid.value, created)
+
+    def _process_created(self, kernel32, pid: int) -> Optional[int]:
+        """プロセスの作成時刻（FILETIME）を返す（プロセス名の取得より軽い）"""
+        import ctypes
+        from ctypes import wintypes
+        handle = kernel32.OpenProcess(self.PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return None
+        try:
+            creation, exit_time, kernel_time, user_time = (wintypes.FILETIME() for _ in range(4))
+            if not kernel32.GetProcessTimes(handle, ctypes.byref(creation), ctypes.byref(exit_time),
+                                            ctypes.byref(kernel_time), ctypes.byref(user_time)):
+                return None
+            return (creation.dwHighDateTime << 32) | creation.dwLowDateTime
+        finally:
+            kernel32.CloseHandle(handle)
+
+    def _run_hook(self, callback: ActivityCallback):
+        import ctypes
+        from ctypes import wintypes
+
+        user32 = ctypes.windll.user32
+        kernel32 = ctypes.windll.kernel32
+        WinEventProc = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                          wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+
+        def on_event(hook, event, hwnd, id_object, id_child, event_thread, event_time):
+            if hwnd:
+                callback(self._app_name(user32, kernel32, hwnd), time.time())
+
+        # コールバックがGCで回収されないよう、フック中は参照を保持しておく
+        proc = WinEventProc(on_event)
+        hook = user32.SetWinEventHook(self.EVENT_SYSTEM_FOREGROUND, self.EVENT_SYSTEM_FOREGROUND,
+                                      0, proc, 0, 0, self.WINEVENT_OUTOFCONTEXT)
+        self._thread_id = kernel32.GetCurrentThreadId()
+        self._ready.set()
+        if not hook:
+            logging.error("前面ウィンドウのフックを登録できませんでした。")
+            return
+
+        # 開始時点の前面ウィンドウを通知してから、変更イベントを待つ
+        foreground = user32.GetForegroundWindow()
+        if foreground:
+            callback(self._app_name(user32, kernel32, foreground), time.time())
+
+        msg = wintypes.MSG()
+        try:
+            while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            user32.UnhookWinEvent(hook)
+
+
+class X11ActivityBackend(ActivityBackend):
+    name = 'x11'
+
+    _WINDOW_ID = re.compile(r'window id # (0x[0-9a-fA-F]+)')
+    _PID = re.compile(r'=\s*(\d+)')
+
+    def __init__(self, name_cache: Optional[ProcessNameCache] = None):
+        super().__init__(name_cache)
+        self._process = None
+        self._thread = None
+        self._pid_by_window = {}
+
+    def start(self, callback: ActivityCallback):
+        if shutil.which('xprop') is None or not os.environ.get('DISPLAY'):
+            raise RuntimeError("xprop またはX11ディスプレイが見つからないため、アクティブウィンドウを監視できません。")
+        # -spy は _NET_ACTIVE_WINDOW が変わるたびに1行出力する
+        self._process = subprocess.Popen(['xprop', '-root', '-spy', '_NET_ACTIVE_WINDOW'],
+                                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        self._thread = threading.Thread(target=self._read_events, args=(callback,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait()
+            self._process = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _read_events(self, callback: ActivityCallback):
+        for line in self._process.stdout:
+            match = self._WINDOW_ID.search(line)
+            if match is None:
+                continue
+            callback(self._app_name(match.group(1)), time.time())
+
+    def _app_name(self, window_id: str) -> str:
+        if int(window_id, 16) == 0:
+            return UNKNOWN_APP
+        pid = self._pid_by_window.get(window_id)
+        if pid is None:
+            result = subprocess.run(['xprop', '-id', window_id, '_NET_WM_PID'],
+                                    capture_output=True, text=True, timeout=2)
+            match = self._PID.search(result.stdout)
+            if match is None:
+                return UNKNOWN_APP
+            pid = int(match.group(1))
+            if len(self._pid_by_window) > 1024:
+                self._pid_by_window.clear()
+            self._pid_by_window[window_id] = pid
+        created = self._process_created(pid)
+        if created is None:
+            # PIDが再利用されたかどうかを見分けられないため、キャッシュを使わない
+            self.name_cache.invalidate(pid)
+        return self.name_cache.get(pid, created)
+
+    @staticmethod
+    def _process_created(pid: int) -> Optional[int]:
+        """プロセスの開始時刻（起動からのクロック数）を返す（/proc がない環境では None）"""
+        try:
+            with open(f'/proc/{pid}/stat', 'rb') as f:
+                stat = f.read()
+        except OSError:
+            return None
+        # プロセス名は空白や括弧を含みうるため、最後の ')' より後ろを分割する（開始時刻は22番目の項目）
+        fields = stat[stat.rfind(b')') + 2:].split()
+        try:
+            return int(fields[19])
+        except (IndexError, ValueError):
+            return None
+
+
+class ReplayActivityBackend(ActivityBackend):
+    name = 'replay'
+
+    def __init__(self, events: Iterable[Tuple[float, str]] = ()):
+        super().__init__()
+        self.events = list(events)
+
+    def start(self, callback: ActivityCallback):
+        # 記録済みのイベントを呼び出し元のスレッドで順番に通知する
+        for timestamp, app_name in self.events:
+            callback(app_name, timestamp)
+
+
+class NullActivityBackend(ActivityBackend):
+    name = 'null'
+
+    def start(self, callback: ActivityCallback):
+        pass
+
+
+BACKENDS = {
+    WindowsActivityBackend.name: WindowsActivityBackend,
+    X11ActivityBackend.name: X11ActivityBackend,
+    ReplayActivityBackend.name: ReplayActivityBackend,
+    NullActivityBackend.name: NullActivityBackend,
+}
+
+
+def create_activity_backend(name: str = 'auto') -> ActivityBackend:
+    if name != 'auto':
+        if name not in BACKENDS:
+            raise ValueError(f"不明なアクティビティ追跡バックエンドです: {name}")
+        return BACKENDS[name]()
+    if sys.platform == 'win32':
+        return WindowsActivityBackend()
+    if sys.platform.startswith('linux') and os.environ.get('DISPLAY') and shutil.which('xprop'):
+        return X11ActivityBackend()
+    logging.warning("この環境ではアクティブウィンドウを監視できないため、アクティビティ追跡を無効にします。")
+    return NullActivityBackend()
@@ -6,95 +6,377 @@
 - アプリケーション使用時間の記録
 
 主な機能:
-- 現在のアクティブウィンドウの取得（OS APIを使用）
+- アクティブウィンドウの変更イベントの受信（OSごとのバックエンドを使用）
 - アプリケーションごとの使用時間の集計
+- 任意の期間（日、週、ポモドーロのセッション）の生産性スコアの計算
+- セッション・タスクごとのアプリ使用時間（集中を妨げたアプリ）の集計
 
 使用するクラス/モジュール:
 - data.database.Database
 - utils.config.Config
+- core.activity_backends（Windows / X11 / 再生用 / 無効）
+- core.async_runtime.AsyncRuntime（asyncioモード時）
 
 注意点:
-- OSはWindowsのみ対応
+- 定期的なポーリングは行わず、前面ウィンドウが変わったときだけ処理すること
+- バックエンドは設定 activity_backend で選択する（既定は 'auto'）
 - プライバシーに配慮し、必要最小限の情報のみを記録すること
+- asyncioモードでは変更イベントをイベントループ上で処理し、DB書き込みはExecutorで行うこと
+- 使用時間はメモリ上で時間バケットごとに集計し、一定間隔（または停止時）にまとめて書き出すこと
+- 生産性スコアは集計テーブル（app_usage_hourly / app_usage_daily）とアプリ分類（app_categories）から
+  SQLで計算し、生データの全件走査を避けること
+- セッションとアプリ使用時間の対応は、開始時刻順に並べた両者を1回ずつ走査して求め、
+  session_app_usage に保存する（突き合わせ済みのセッションは再計算しない）
+- バケットの行には、そのアプリを最初に使い始めた時刻と最後に使い終えた時刻（span_start / span_end）も記録する。
+  突き合わせではその区間に使用時間が均等に分布しているとみなし、セッションごとの合計はセッションの長さまでに抑える
+  （区間を記録する前の行は、バケットの開始時刻から使用時間の分だけ使ったとみなす）
 """
 
-import win32gui
-import win32process
-import psutil
+import asyncio
+import math
 import time
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
 from src.data.database import Database
 from src.utils.config import config
-import threading
+from src.core.activity_backends import ActivityBackend, create_activity_backend
+
+class ActivityBuffer:
+    """アプリごとの使用時間を一定幅の時間バケットに集計するバッファ（ロックは呼び出し側で取ること）"""
+
+    def __init__(self, bucket_seconds: int = 60):
+        self.bucket_seconds = bucket_seconds
+        self._usage = {}  # (バケット開始時刻, アプリ名) -> [使用時間, 最初の開始, 最後の終了]
+
+    def __len__(self):
+        return len(self._usage)
+
+    def add(self, app_name: str, start: float, end: float):
+        # バケットの境界をまたぐ区間は、それぞれのバケットに分割して加算する
+        while start < end:
+            bucket_start = start - start % self.bucket_seconds
+            segment_end = min(end, bucket_start + self.bucket_seconds)
+            usage = self._usage.get((bucket_start, app_name))
+            if usage is None:
+                self._usage[(bucket_start, app_name)] = [segment_end - start, start, segment_end]
+            else:
+                usage[0] += segment_end - start
+                usage[1] = min(usage[1], start)
+                usage[2] = max(usage[2], segment_end)
+            start = segment_end
+
+    def drain(self) -> List[Tuple[str, float, float, float, float]]:
+        """(アプリ名, 使用時間, バケット開始時刻, 最初の開始, 最後の終了) の一覧を取り出して空にする"""
+        rows = [(app_name, duration, bucket_start, span_start, span_end)
+                for (bucket_start, app_name), (duration, span_start, span_end) in sorted(self._usage.items())]
+        self._usage.clear()
+        return rows
+
+def attribute_intervals(sessions: Iterable[Tuple[int, float, float]],
+                        samples: List[Tuple]) -> Dict[Tuple[int, str], float]:
+    """(セッションID, 開始, 終了) と (アプリ名, 開始, 終了[, 使用時間]) の重なりをセッション・アプリごとに集計する
+
+    どちらも開始時刻の昇順で渡すこと。サンプル側の走査位置はセッションをまたいで引き継ぐため、
+    重なりの少ない通常の記録では O(セッション数 + サンプル数) で終わる。
+    使用時間を指定したサンプルは、区間内に使用時間が均等に分布しているとみなして重なりを按分する。
+    その場合は区間どうしが重なりうるため、セッションごとの合計がセッションの長さを超えたら比例して縮める。
+    """
+    overlaps = defaultdict(float)
+    first = 0
+    for session_id, session_start, session_end in sessions:
+        # このセッションの開始までに終わったサンプルは、以降のセッションとも重ならない
+        while first < len(samples) and samples[first][2] <= session_start:
+            first += 1
+        index = first
+        totals = defaultdict(float)
+        while index < len(samples) and samples[index][1] < session_end:
+            app_name, sample_start, sample_end = samples[index][:3]
+            overlap = min(session_end, sample_end) - max(session_start, sample_start)
+            if overlap > 0:
+                if len(samples[index]) > 3 and sample_end > sample_start:
+                    overlap *= min(1.0, samples[index][3] / (sample_end - sample_start))
+                totals[app_name] += overlap
+            index += 1
+        total = sum(totals.values())
+        scale = (session_end - session_start) / total if total > session_end - session_start else 1.0
+        for app_name, duration in totals.items():
+            overlaps[(session_id, app_name)] += duration * scale
+    return dict(overlaps)
 
 class ActivityTracker:
-    def __init__(self, database: Database, config):
+    def __init__(self, database: Database, config, runtime=None, backend: ActivityBackend = None):
         self.database = database
         self.config = config
+        self.runtime = runtime
+        self.backend = backend
         self.is_tracking = False
-        self.tracking_thread = None
         self.current_app = ""
         self.start_time = 0
+        self.buffer = ActivityBuffer(self.config.get('activity_bucket_seconds', 60))
+        self.flush_interval = self.config.get('activity_flush_interval', 30)  # 秒
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._flush_thread = None
+        self._flush_task = None
 
     def start_tracking(self):
         if not self.is_tracking:
+            if self.backend is None:
+                self.backend = create_activity_backend(self.config.get('activity_backend', 'auto'))
+            self.sync_productive_apps()
             self.is_tracking = True
-            self.tracking_thread = threading.Thread(target=self._track_activity)
-            self.tracking_thread.start()
+            self._start_periodic_flush()
+            self.backend.start(self._on_foreground_changed)
 
     def stop_tracking(self):
+        if not self.is_tracking:
+            return
         self.is_tracking = False
-        if self.tracking_thread:
-            self.tracking_thread.join()
+        self.backend.stop()
+        self._stop_periodic_flush()
+        # 最後に前面にあったアプリの使用時間を含めて書き出す
+        self._dispatch(self._finish, time.time())
+
+    def _start_periodic_flush(self):
+        if self.runtime is not None:
+            self._flush_task = self.runtime.run_coroutine(self._flush_periodically())
+        else:
+            self._stop_event.clear()
+            self._flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flush_thread.start()
+
+    def _stop_periodic_flush(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if self._flush_thread is not None:
+            self._stop_event.set()
+            self._flush_thread.join()
+            self._flush_thread = None
 
-    def _track_activity(self):
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    async def _flush_periodically(self):
         while self.is_tracking:
-            new_app = self._get_active_window_title()
-            current_time = time.time()
+            await asyncio.sleep(self.flush_interval)
+            await asyncio.wrap_future(self.runtime.run_db(self.flush))
 
-            if new_app != self.current_app:
-                if self.current_app:
-                    duration = current_time - self.start_time
-                    self._save_activity(self.current_app, duration)
+    def _on_foreground_changed(self, app_name: str, timestamp: float):
+        # バックエンドのスレッドから呼ばれる
+        if self.is_tracking:
+            self._dispatch(self._handle_change, app_name, timestamp)
 
-                self.current_app = new_app
-                self.start_time = current_time
+    def _dispatch(self, handler, *args):
+        if self.runtime is not None:
+            self.runtime.call_soon(handler, *args)
+        else:
+            handler(*args)
 
-            time.sleep(1)  # 1秒ごとにチェック
+    def _handle_change(self, app_name: str, timestamp: float):
+        with self._lock:
+            if app_name == self.current_app:
+                return
+            if self.current_app and timestamp > self.start_time:
+                self.buffer.add(self.current_app, self.start_time, timestamp)
+            self.current_app = app_name
+            self.start_time = timestamp
 
-    def _get_active_window_title(self):
-        try:
-            window = win32gui.GetForegroundWindow()
-            _, pid = win32process.GetWindowThreadProcessId(window)
-            app_name = psutil.Process(pid).name()
-            return app_name
-        except:
-            return "Unknown"
+    def _finish(self, timestamp: float):
+        self._handle_change("", timestamp)
+        if self.runtime is not None:
+            self.runtime.run_db(self.flush, timestamp)
+        else:
+            self.flush(timestamp)
 
-    def _save_activity(self, app_name: str, duration: float):
-        query = '''
-            INSERT INTO app_usage (app_name, duration, timestamp)
-            VALUES (?, ?, ?)
+    def flush(self, now: float = None) -> int:
+        """バッファの内容を1つのトランザクションで書き出し、書き出した行数を返す"""
+        now = now or time.time()
+        with self._lock:
+            # 使用中のアプリもここまでの分を書き出し、異常終了時の欠損を1回の書き出し間隔までに抑える
+            if self.current_app and now > self.start_time:
+                self.buffer.add(self.current_app, self.start_time, now)
+                self.start_time = now
+            rows = self.buffer.drain()
+
+        if rows:
+            query = '''
+                INSERT INTO app_usage (app_name, duration, timestamp, span_start, span_end)
+                VALUES (?, ?, ?, ?, ?)
+            '''
+            self.database.execute_many(query, rows)
+        return len(rows)
+
+    # 指定した時間帯の使用時間を、1時間単位の集計と端数部分の生データから集める
+    _WINDOW_SOURCE = '''
+        SELECT app_name, duration FROM app_usage_hourly
+        WHERE hour_start >= :hour_from AND hour_start < :hour_to
+        UNION ALL
+        SELECT app_name, duration FROM app_usage
+        WHERE timestamp >= :start AND timestamp < :hour_from
+        UNION ALL
+        SELECT app_name, duration FROM app_usage
+        WHERE timestamp >= :hour_to AND timestamp < :end
+    '''
+
+    @staticmethod
+    def _window_params(start: float, end: float) -> Dict[str, float]:
+        hour_from = math.ceil(start / 3600) * 3600
+        hour_to = math.floor(end / 3600) * 3600
+        if hour_from >= hour_to:
+            # 1時間に満たない範囲は生データだけで集計する
+            hour_from = hour_to = end
+        return {'start': start, 'end': end, 'hour_from': hour_from, 'hour_to': hour_to}
+
+    def get_usage_stats(self, start: float, end: float):
+        query = f'''
+            SELECT app_name, SUM(duration) as total_duration
+            FROM ({self._WINDOW_SOURCE})
+            GROUP BY app_name
+            ORDER BY total_duration DESC
         '''
-        self.database.execute_insert(query, (app_name, duration, time.time()))
+        return self.database.execute_query(query, self._window_params(start, end))
 
     def get_daily_usage_stats(self):
+        now = time.time()
+        return self.get_usage_stats(now - 86400, now)  # 24時間前から
+
+    def sync_productive_apps(self, productive_apps: List[str] = None):
+        """設定 productive_apps の内容をアプリ分類テーブルに反映する"""
+        if productive_apps is None:
+            productive_apps = self.config.get('productive_apps', [])
+        with self.database.transaction() as conn:
+            conn.execute("DELETE FROM app_categories WHERE category = 'productive'")
+            conn.executemany(
+                "INSERT OR REPLACE INTO app_categories (app_name, category) VALUES (?, 'productive')",
+                [(app_name,) for app_name in productive_apps])
+
+    def set_app_category(self, app_name: str, category: str):
+        query = "INSERT OR REPLACE INTO app_categories (app_name, category) VALUES (?, ?)"
+        self.database.execute_insert(query, (app_name, category))
+
+    def get_productivity_score(self, start: float = None, end: float = None) -> float:
+        """指定した時間帯（既定は直近24時間）の生産的なアプリの使用割合（%）を返す"""
+        end = end if end is not None else time.time()
+        start = start if start is not None else end - 86400
+        query = f'''
+            SELECT SUM(u.duration) AS total_time,
+                   SUM(CASE WHEN c.category = 'productive' THEN u.duration ELSE 0 END) AS productive_time
+            FROM ({self._WINDOW_SOURCE}) u
+            LEFT JOIN app_categories c ON c.app_name = u.app_name
+        '''
+        result = self.database.execute_query(query, self._window_params(start, end))[0]
+        return self._score(result['productive_time'], result['total_time'])
+
+    def get_daily_productivity_scores(self, start_day: str, end_day: str) -> Dict[str, float]:
+        """日別の集計から、期間内（'YYYY-MM-DD'、両端を含む）の日ごとのスコアを返す"""
         query = '''
-            SELECT app_name, SUM(duration) as total_duration
+            SELECT d.day,
+                   SUM(d.duration) AS total_time,
+                   SUM(CASE WHEN c.category = 'productive' THEN d.duration ELSE 0 END) AS productive_time
+            FROM app_usage_daily d
+            LEFT JOIN app_categories c ON c.app_name = d.app_name
+            WHERE d.day BETWEEN ? AND ?
+            GROUP BY d.day
+            ORDER BY d.day
+        '''
+        results = self.database.execute_query(query, (start_day, end_day))
+        return {row['day']: self._score(row['productive_time'], row['total_time']) for row in results}
+
+    def attribute_sessions(self, until: Optional[float] = None, rebuild: bool = False, batch_size: int = 500) -> int:
+        """終了済みのセッションにアプリ使用時間を割り当てて保存し、処理したセッション数を返す"""
+        if self.is_tracking:
+            # 使用中のアプリの分も含めて突き合わせる
+            self.flush()
+        until = until if until is not None else time.time()
+        if rebuild:
+            with self.database.transaction() as conn:
+                conn.execute("DELETE FROM session_app_usage")
+                conn.execute("DELETE FROM session_usage_attributed")
+
+        query = '''
+            SELECT s.id, s.start_time, s.end_time
+            FROM sessions s
+            WHERE s.end_time IS NOT NULL AND s.end_time <= ?
+              AND NOT EXISTS (SELECT 1 FROM session_usage_attributed a WHERE a.session_id = s.id)
+            ORDER BY s.start_time
+            LIMIT ?
+        '''
+        processed = 0
+        while True:
+            rows = self.database.execute_query(query, (datetime.fromtimestamp(until), batch_size))
+            if not rows:
+                return processed
+            sessions = [(row['id'], self._to_timestamp(row['start_time']), self._to_timestamp(row['end_time']))
+                        for row in rows]
+            self._store_attribution(sessions)
+            processed += len(sessions)
+
+    def _store_attribution(self, sessions: List[Tuple[int, float, float]]):
+        # サンプルはバケットの開始時刻で記録されているため、1バケット分さかのぼって読み込む
+        query = '''
+            SELECT app_name, duration,
+                   COALESCE(span_start, timestamp) AS span_start,
+                   COALESCE(span_end, timestamp + duration) AS span_end
             FROM app_usage
-            WHERE timestamp > ?
-            GROUP BY app_name
-            ORDER BY total_duration DESC
+            WHERE timestamp >= ? AND timestamp < ?
+            ORDER BY span_start
+        '''
+        window = (sessions[0][1] - self.buffer.bucket_seconds, max(session[2] for session in sessions))
+        samples = [(row['app_name'], row['span_start'], row['span_end'], row['duration'])
+                   for row in self.database.execute_query(query, window)]
+        overlaps = attribute_intervals(sessions, samples)
+        with self.database.transaction() as conn:
+            conn.executemany('''
+                INSERT INTO session_app_usage (session_id, app_name, duration) VALUES (?, ?, ?)
+                ON CONFLICT (session_id, app_name) DO UPDATE SET duration = excluded.duration
+            ''', [(session_id, app_name, duration) for (session_id, app_name), duration in overlaps.items()])
+            conn.executemany("INSERT OR IGNORE INTO session_usage_attributed (session_id) VALUES (?)",
+                             [(session[0],) for session in sessions])
+
+    @staticmethod
+    def _to_timestamp(value) -> float:
+        return datetime.fromisoformat(str(value)).timestamp()
+
+    def get_session_app_usage(self, session_id: int):
+        self.attribute_sessions()
+        query = '''
+            SELECT u.app_name, u.duration, COALESCE(c.category, 'other') AS category
+            FROM session_app_usage u
+            LEFT JOIN app_categories c ON c.app_name = u.app_name
+            WHERE u.session_id = ?
+            ORDER BY u.duration DESC
         '''
-        today_start = time.time() - 86400  # 24時間前
-        return self.database.execute_query(query, (today_start,))
-
-    def get_productivity_score(self):
-        productive_apps = self.config.get('productive_apps', [])
-        daily_stats = self.get_daily_usage_stats()
-        
-        total_time = sum(stat['total_duration'] for stat in daily_stats)
-        productive_time = sum(stat['total_duration'] for stat in daily_stats if stat['app_name'] in productive_apps)
-        
-        if total_time > 0:
+        return self.database.execute_query(query, (session_id,))
+
+    def get_task_distraction_report(self, task_id: int = None):
+        """タスクごとの作業中のアプリ使用時間（生産的なアプリとそれ以外）を返す"""
+        self.attribute_sessions()
+        query = '''
+            SELECT s.task_id,
+                   SUM(u.duration) AS total_time,
+                   SUM(CASE WHEN c.category = 'productive' THEN u.duration ELSE 0 END) AS productive_time,
+                   SUM(CASE WHEN c.category = 'productive' THEN 0 ELSE u.duration END) AS distracted_time
+            FROM session_app_usage u
+            JOIN sessions s ON s.id = u.session_id
+            LEFT JOIN app_categories c ON c.app_name = u.app_name
+            WHERE ? IS NULL OR s.task_id = ?
+            GROUP BY s.task_id
+            ORDER BY distracted_time DESC
+        '''
+        return self.database.execute_query(query, (task_id, task_id))
+
+    def get_session_productivity_score(self, session_id: int) -> float:
+        usage = self.get_session_app_usage(session_id)
+        total_time = sum(row['duration'] for row in usage)
+        productive_time = sum(row['duration'] for row in usage if row['category'] == 'productive')
+        return self._score(productive_time, total_time)
+
+    @staticmethod
+    def _score(productive_time, total_time) -> float:
+        if total_time:
             return (productive_time / total_time) * 100
-        return 0
\ No newline at end of file
+        return 0
@@ -0,0 +1,132 @@
+"""
+AIに送る会話コンテキストの組み立て
+
+役割:
+- ai_conversations の直近の発言を、トークン数の予算内に収まるように並べてAPIに送るメッセージを作る
+
+主な機能:
+- ローカルでの高速なトークン数の見積もり（トークナイザーを使わない）
+- 組み立て済みのコンテキストの保持と、新しいメッセージ分だけの追加（リクエストごとの処理は新しい発言の数に比例）
+- 予算から外れた古い発言の要約（DBの ai_conversation_summary に保存し、再起動後も引き継ぐ）
+
+使用するクラス/モジュール:
+- data.ai_conversation.AIConversationManager（またはリモート版のプロキシ）
+
+注意点:
+- トークン数は見積もりのため、予算には余裕を持たせること
+  （ASCII文字は4文字で1トークン、それ以外の文字は1文字1トークン、メッセージごとに4トークンを加える）
+- 要約はAPIを呼ばずに、外れた発言の1行目を抜き出して作る（要約のためにリクエストを増やさない）
+- ai_conversations の発言が削除された場合は、invalidate() で読み込み直すこと
+"""
+
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+MESSAGE_OVERHEAD_TOKENS = 4  # ロールや区切りの分
+SUMMARY_LINE_CHARS = 80  # 要約に残す1発言あたりの文字数
+ROLE_LABELS = {'user': 'ユーザー', 'assistant': 'AI'}
+SUMMARY_HEADER = "これまでの会話の要約:\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """テキストのトークン数を見積もる"""
+    ascii_chars = len(text.encode('ascii', 'ignore'))
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+SUMMARY_OVERHEAD_TOKENS = estimate_tokens(SUMMARY_HEADER) + MESSAGE_OVERHEAD_TOKENS
+
+
+class ConversationContext:
+    def __init__(self, ai_conversation_manager, max_tokens: int = 3000, summary_tokens: int = 500,
+                 message_tokens: int = 500):
+        self.ai_conversation_manager = ai_conversation_manager
+        self.max_tokens = max_tokens  # 要約と履歴と新しいメッセージの合計
+        self.summary_tokens = summary_tokens  # 要約に使う上限
+        self.message_tokens = message_tokens  # 新しいメッセージのために空けておく分
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._turns = deque()  # (メッセージID, APIに送るメッセージ, トークン数)（古い順）
+        self._turn_tokens = 0
+        self._summary_lines = deque()  # (行, トークン数)
+        self._summary_line_tokens = 0
+        self._last_id = 0  # 読み込んだ最後のメッセージID
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded = False
+            self._turns.clear()
+            self._turn_tokens = 0
+            self._summary_lines.clear()
+            self._summary_line_tokens = 0
+            self._last_id = 0
+
+    def build(self, message: str) -> List[Dict[str, str]]:
+        """新しいメッセージの前に、要約と直近の発言を付けたメッセージの一覧を返す"""
+        user_message = {'role': 'user', 'content': message}
+        message_tokens = estimate_tokens(message) + MESSAGE_OVERHEAD_TOKENS
+        with self._lock:
+            self._sync()
+            messages = [turn for _, turn, _ in self._turns]
+            summary = self._summary_message()
+
+            # 新しいメッセージが長く予算を超える場合は、このリクエストに限って古い発言を省く
+            overflow = self._used_tokens() + message_tokens - self.max_tokens
+            skipped = 0
+            while overflow > 0 and skipped < len(messages):
+                overflow -= self._turns[skipped][2]
+                skipped += 1
+
+        prefix = [summary] if summary is not None else []
+        return prefix + messages[skipped:] + [user_message]
+
+    def _used_tokens(self) -> int:
+        if not self._summary_lines:
+            return self._turn_tokens
+        return self._turn_tokens + self._summary_line_tokens + SUMMARY_OVERHEAD_TOKENS
+
+    def _sync(self):
+        """前回以降に保存された発言だけを読み込み、予算から外れた発言を要約に移す"""
+        if not self._loaded:
+            saved = self.ai_conversation_manager.get_summary()
+            if saved:
+                self._last_id = saved['last_message_id']
+                for line in saved['summary'].split('\n'):
+                    if line:
+                        self._add_summary_line(line)
+            self._loaded = True
+
+        for conversation in self.ai_conversation_manager.get_messages_after(self._last_id):
+            turn = {'role': conversation.role, 'content': conversation.message}
+            tokens = estimate_tokens(conversation.message) + MESSAGE_OVERHEAD_TOKENS
+            self._turns.append((conversation.id, turn, tokens))
+            self._turn_tokens += tokens
+            self._last_id = conversation.id
+
+        # 1往復分（直近の発言）は必ず残す
+        history_budget = self.max_tokens - self.summary_tokens - SUMMARY_OVERHEAD_TOKENS - self.message_tokens
+        summarized_id = None
+        while self._turn_tokens > history_budget and len(self._turns) > 2:
+            message_id, turn, tokens = self._turns.popleft()
+            self._turn_tokens -= tokens
+            first_line = turn['content'].strip().split('\n', 1)[0][:SUMMARY_LINE_CHARS]
+            self._add_summary_line(f"{ROLE_LABELS.get(turn['role'], turn['role'])}: {first_line}")
+            summarized_id = message_id
+        if summarized_id is not None:
+            self.ai_conversation_manager.save_summary(
+                '\n'.join(line for line, _ in self._summary_lines), summarized_id)
+
+    def _add_summary_line(self, line: str):
+        tokens = estimate_tokens(line) + 1  # 改行の分
+        self._summary_lines.append((line, tokens))
+        self._summary_line_tokens += tokens
+        while self._summary_line_tokens > self.summary_tokens and len(self._summary_lines) > 1:
+            _, removed = self._summary_lines.popleft()
+            self._summary_line_tokens -= removed
+
+    def _summary_message(self) -> Optional[Dict[str, str]]:
+        if not self._summary_lines:
+            return None
+        lines = '\n'.join(line for line, _ in self._summary_lines)
+        return {'role': 'system', 'content': SUMMARY_HEADER + lines}
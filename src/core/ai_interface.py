@@ -8,68 +8,523 @@ AI (ChatGPT) とのインターフェース
 主な機能:
 - APIリクエストの送信と応答の受信
 - 応答のJSON解析とタスクデータへの変換
+- 接続を使い回すHTTPセッション、タイムアウト、再試行（指数バックオフ）、サーキットブレーカー
+- 応答のストリーミング受信（stream: true のSSEを断片ごとに返す）
+- 呼び出しごとの応答時間の記録
+- 過去の会話（古い発言の要約と直近の発言）をトークン数の予算内で付けて送信（core.ai_context）
+- 複数のタスク説明の並行した分解と、結果のタスクの一括登録（analyze_tasks_batch, decompose_backlog）
+- 定型の問い合わせ（タスク分解・優先順位付け・生産性のヒント）の応答キャッシュ
+  （メモリ上のLRUと、DBの隣の ai_cache.db への保存。有効期限と件数上限で削除する）
 
 使用するクラス/モジュール:
 - utils.config.Config
+- utils.secret_store.SecretStore（APIキーの復号）
 - data.ai_conversation.AIConversation
+- core.ai_context.ConversationContext
+- core.task_manager.TaskManager（decompose_backlog の登録先）
+- requests（最初の送信時に読み込む）
 
 注意点:
 - API呼び出しの頻度制限に注意
+  （429 / 5xx と接続エラー・タイムアウトは、Retry-After を優先しつつジッター付きの指数バックオフで再試行する）
+  （ai_requests_per_minute を設定すると、再試行も含めたすべての送信の間隔をその頻度以下に保つ）
 - APIキーの安全な管理（設定ファイルからの読み込み、暗号化など）
+  （APIキーは utils.secret_store から取得し、リクエストごとに復号しないこと）
 - ネットワークエラーなどの例外処理を適切に行うこと
+- 失敗が続いた場合はサーキットブレーカーを開き、一定時間は送信せずにすぐエラーを返すこと
+- APIのURLは設定 ai_api_url で変更できる（テストやベンチマークではローカルのスタブサーバーを使う）
+- requests はアプリの起動を遅くしないよう、最初のリクエスト時に読み込むこと
+- 定型の問い合わせは会話の流れに依存しないため、過去の会話を付けずに送る（キャッシュが効くようにする）
+- 応答キャッシュのキーは (モデル, メッセージ, パラメータ) のハッシュ。エラーの応答はキャッシュしないこと
 """
 
-import requests
+import hashlib
 import json
-from typing import List, Dict
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Iterator, List, Dict, Optional
 from src.utils.config import config
+from src.utils.secret_store import secret_store
 from src.data.ai_conversation import AIConversationManager
-from cryptography.fernet import Fernet
+from src.core.ai_context import ConversationContext
+from src.data.task_data import Task
+
+DEFAULT_API_URL = "https://api.openai.com/v1/chat/completions"
+DEFAULT_MODEL = "gpt-3.5-turbo"
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+ERROR_RESPONSE = "申し訳ありません。エラーが発生しました。"
+
+class CircuitBreaker:
+    """連続した失敗が上限に達すると一定時間呼び出しを止める（ロックは呼び出し側で取ること）"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False  # 半開状態で試しの呼び出しを通したか
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        # 半開状態では1回だけ試し、その結果（record_success / record_failure）で閉じるか開き直すかを決める。
+        # 結果が記録されるまでは、他の呼び出しは開いているときと同じく止める
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half_open' and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probe_in_flight or self.state == 'half_open' or self.failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+        self._probe_in_flight = False
+
+class AIRequestError(Exception):
+    pass
+
+class ResponseCache:
+    """AIの応答のキャッシュ（メモリ上のLRUと、SQLiteファイルへの保存）"""
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 256, max_disk_entries: int = 5000,
+                 ttl: float = 24 * 3600, clock: Callable[[], float] = time.time):
+        self.path = path  # None の場合はメモリ上のみ
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl  # 秒
+        self.clock = clock
+        self.hits = 0  # メモリ上のキャッシュから返した回数
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # キー -> (有効期限, 応答)（古い順）
+        self._connection = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]], params: Optional[Dict] = None) -> str:
+        key = json.dumps([model, messages, params or {}], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+            row = None
+            connection = self._connect()
+            if connection is not None:
+                try:
+                    row = connection.execute("SELECT expires_at, response FROM ai_response_cache WHERE key = ?",
+                                             (key,)).fetchone()
+                    if row is not None and row[0] > now:
+                        connection.execute("UPDATE ai_response_cache SET last_used = ? WHERE key = ?", (now, key))
+                        connection.commit()
+                    else:
+                        row = None
+                except sqlite3.Error as e:
+                    logging.warning(f"AIの応答キャッシュを読み込めませんでした: {e}")
+                    row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, row[0], row[1])
+            return row[1]
+
+    def put(self, key: str, response: str):
+        now = self.clock()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, response)
+            connection = self._connect()
+            if connection is None:
+                return
+            try:
+                connection.execute("INSERT OR REPLACE INTO ai_response_cache (key, response, expires_at, last_used) "
+                                   "VALUES (?, ?, ?, ?)", (key, response, expires_at, now))
+                # 期限切れと、件数上限を超えた分（最終利用が古い順）を削除する
+                connection.execute("DELETE FROM ai_response_cache WHERE expires_at <= ?", (now,))
+                connection.execute("DELETE FROM ai_response_cache WHERE key IN (SELECT key FROM ai_response_cache "
+                                   "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_disk_entries,))
+                connection.commit()
+            except sqlite3.Error as e:
+                logging.warning(f"AIの応答キャッシュを保存できませんでした: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            connection = self._connect()
+            if connection is not None:
+                connection.execute("DELETE FROM ai_response_cache")
+                connection.commit()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                    'entries': len(self._entries)}
+
+    def _remember(self, key: str, expires_at: float, response: str):
+        self._entries[key] = (expires_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """SQLiteファイルを最初に使うときに開く（ロックを取ってから呼ぶこと）"""
+        if self._connection is None and self.path is not None:
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                connection = sqlite3.connect(self.path, check_same_thread=False)
+                connection.execute('''
+                    CREATE TABLE IF NOT EXISTS ai_response_cache (
+                        key TEXT PRIMARY KEY,
+                        response TEXT NOT NULL,
+                        expires_at REAL NOT NULL,
+                        last_used REAL NOT NULL
+                    )
+                ''')
+                connection.execute("CREATE INDEX IF NOT EXISTS idx_ai_response_cache_last_used "
+                                   "ON ai_response_cache(last_used)")
+                connection.commit()
+            except (OSError, sqlite3.Error) as e:
+                # 保存できない場合はメモリ上のキャッシュだけで動かす
+                logging.warning(f"AIの応答キャッシュのファイルを開けませんでした: {e}")
+                self.path = None
+                return None
+            self._connection = connection
+        return self._connection
+
+class RateLimiter:
+    """1分あたりのリクエスト数を超えないよう、リクエストの間隔を空ける"""
+
+    def __init__(self, requests_per_minute: float, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.interval = 60.0 / requests_per_minute
+        self.clock = clock
+        self.sleep = sleep
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """次に送信できる時刻まで待つ（複数のスレッドから呼ばれた場合は順番に時刻を割り当てる）"""
+        with self._lock:
+            now = self.clock()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            self.sleep(slot - now)
+
+
+def _subtask_items(analysis) -> list:
+    """分解結果のJSONからサブタスクの一覧を取り出す（{"subtasks": [...]} の形式にも対応する）"""
+    if isinstance(analysis, dict):
+        for value in analysis.values():
+            if isinstance(value, list):
+                return value
+        return [analysis]
+    return analysis if isinstance(analysis, list) else []
+
+
+def _subtask_from_analysis(item) -> Task:
+    if isinstance(item, dict):
+        title = item.get('title') or item.get('name') or item.get('task') or json.dumps(item, ensure_ascii=False)
+        return Task(title=str(title), description=str(item.get('description') or ""))
+    return Task(title=str(item))
+
 
 class AIInterface:
     def __init__(self, config, ai_conversation_manager: AIConversationManager):
         self.config = config
         self.ai_conversation_manager = ai_conversation_manager
-        encryption_key = self.config.get('encryption_key')
-        if encryption_key is None:
-            # キーがない場合は新しく生成
-            encryption_key = Fernet.generate_key().decode()
-            self.config.set('encryption_key', encryption_key)
-        self.fernet = Fernet(encryption_key.encode())
-        self.encrypted_api_key = self.config.get('encrypted_openai_api_key')
-        self.api_url = "https://api.openai.com/v1/chat/completions"
+        secret_store.config_key(self.config)  # キーがない場合は新しく生成
+        self.api_url = self.config.get('ai_api_url', DEFAULT_API_URL)
+        self.model = self.config.get('ai_model', DEFAULT_MODEL)
+        self.timeout = (self.config.get('ai_connect_timeout', 5), self.config.get('ai_read_timeout', 60))  # 秒
+        self.max_retries = self.config.get('ai_max_retries', 3)
+        self.backoff_base = self.config.get('ai_backoff_base', 0.5)  # 秒
+        self.backoff_max = self.config.get('ai_backoff_max', 20)  # 秒
+        self.circuit_breaker = CircuitBreaker(self.config.get('ai_circuit_failure_threshold', 5),
+                                              self.config.get('ai_circuit_reset_timeout', 30))
+        self.batch_concurrency = self.config.get('ai_batch_concurrency', 8)
+        requests_per_minute = self.config.get('ai_requests_per_minute')
+        self.rate_limiter = RateLimiter(requests_per_minute) if requests_per_minute else None
+        self._sleep = time.sleep
+        self._session = None
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=100)  # 直近の呼び出しの応答時間（ミリ秒）
+        self._metrics = {'calls': 0, 'succeeded': 0, 'failed': 0, 'retries': 0, 'rejected': 0}
+        self.context = ConversationContext(ai_conversation_manager,
+                                           max_tokens=self.config.get('ai_context_max_tokens', 3000),
+                                           summary_tokens=self.config.get('ai_context_summary_tokens', 500),
+                                           message_tokens=self.config.get('ai_context_message_tokens', 500))
+        cache_path = self.config.get('ai_cache_path')
+        if cache_path is None:
+            db_path = self.config.get('database_path', 'data/pomodoro.db')
+            cache_path = os.path.join(os.path.dirname(db_path) or '.', 'ai_cache.db')
+        self.response_cache = ResponseCache(cache_path or None,  # 空文字の場合はメモリ上のみ
+                                            max_entries=self.config.get('ai_cache_max_entries', 256),
+                                            max_disk_entries=self.config.get('ai_cache_max_disk_entries', 5000),
+                                            ttl=self.config.get('ai_cache_ttl', 24 * 3600))
 
     def _get_decrypted_api_key(self):
-        return self.fernet.decrypt(self.encrypted_api_key.encode()).decode()
+        # 復号はプロセス内で1回だけ行い、以降はキャッシュから返す（設定が変わった場合は復号し直す）
+        api_key = secret_store.get_secret(self.config, 'openai_api_key')
+        if api_key is None:
+            raise AIRequestError("OpenAI APIキーが設定されていません")
+        return api_key
+
+    @property
+    def session(self):
+        """接続を使い回すHTTPセッション（最初の送信時に作成する）"""
+        with self._lock:
+            if self._session is None:
+                # requests は読み込みに時間がかかるため、起動時ではなく最初の送信時に読み込む
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                # 一括処理の並行数まで接続を使い回せるようにする
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(4, self.batch_concurrency))
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+        self.response_cache.close()
+
+    def get_metrics(self) -> Dict[str, float]:
+        with self._lock:
+            metrics = dict(self._metrics)
+            latencies = sorted(self._latencies)
+            metrics['circuit_state'] = self.circuit_breaker.state
+        metrics.update({f'cache_{name}': value for name, value in self.response_cache.stats().items()})
+        if latencies:
+            metrics['latency_last_ms'] = self._latencies[-1]
+            metrics['latency_p50_ms'] = latencies[len(latencies) // 2]
+            metrics['latency_p95_ms'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return metrics
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    delay = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return min(max(0.0, delay), self.backoff_max)
+        # フルジッター: 0 〜 base × 2^attempt（上限あり）の一様乱数
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _send(self, payload: Dict, stream: bool = False):
+        """APIにPOSTし、成功した応答を返す（失敗した場合は AIRequestError）"""
+        import requests
 
-    def send_message(self, message: str) -> str:
         headers = {
             "Authorization": f"Bearer {self._get_decrypted_api_key()}",
             "Content-Type": "application/json"
         }
+        with self._lock:
+            self._metrics['calls'] += 1
+            if not self.circuit_breaker.allow():
+                self._metrics['rejected'] += 1
+                raise AIRequestError("APIの呼び出しが続けて失敗したため、一時的に送信を止めています。")
+
+        started = time.perf_counter()
+        error = None
+        recorded = False  # サーキットブレーカーに結果を記録したか（すべての呼び出しで成功か失敗を記録する）
+        try:
+            for attempt in range(self.max_retries + 1):
+                retry_after = None
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire()
+                try:
+                    response = self.session.post(self.api_url, headers=headers, json=payload,
+                                                 timeout=self.timeout, stream=stream)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    error = AIRequestError(f"APIに接続できませんでした: {e}")
+                except requests.exceptions.RequestException as e:
+                    # URLの誤り（ai_api_url の設定ミスなど）は再試行しても変わらないため、すぐに失敗させる
+                    with self._lock:
+                        self.circuit_breaker.record_failure()
+                        recorded = True
+                        self._metrics['failed'] += 1
+                    raise AIRequestError(f"APIリクエストを送信できませんでした: {e}") from e
+                else:
+                    if response.status_code not in RETRYABLE_STATUS_CODES:
+                        try:
+                            response.raise_for_status()
+                        except requests.exceptions.HTTPError as e:
+                            # 4xx（認証エラーなど）は再試行しても変わらないが、APIは応答しているため
+                            # サーキットブレーカーには成功として記録する（半開状態を閉じる）
+                            response.close()
+                            with self._lock:
+                                self.circuit_breaker.record_success()
+                                recorded = True
+                                self._metrics['failed'] += 1
+                            raise AIRequestError(f"APIリクエストが失敗しました: {e}") from e
+                        with self._lock:
+                            self.circuit_breaker.record_success()
+                            recorded = True
+                            self._metrics['succeeded'] += 1
+                        return response
+                    error = AIRequestError(f"APIが一時的に利用できません（HTTP {response.status_code}）")
+                    retry_after = response.headers.get('Retry-After')
+                    response.close()
+
+                if attempt == self.max_retries:
+                    break
+                with self._lock:
+                    self._metrics['retries'] += 1
+                delay = self._retry_delay(attempt, retry_after)
+                logging.warning(f"{error} {delay:.1f}秒後に再試行します（{attempt + 1}/{self.max_retries}）。")
+                self._sleep(delay)
+
+            with self._lock:
+                self.circuit_breaker.record_failure()
+                recorded = True
+                self._metrics['failed'] += 1
+            raise error
+        finally:
+            # ストリーミングの場合は応答ヘッダーを受け取るまでの時間になる
+            with self._lock:
+                if not recorded:
+                    # 想定外の例外で抜けた場合も、半開状態の試しの呼び出しが残らないよう失敗として記録する
+                    self.circuit_breaker.record_failure()
+                self._latencies.append((time.perf_counter() - started) * 1000)
+
+    def _post(self, payload: Dict) -> Dict:
+        """APIにPOSTし、応答のJSONを返す"""
+        response = self._send(payload)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise AIRequestError(f"APIの応答を解析できませんでした: {e}") from e
+
+    def _messages(self, message: str, with_context: bool) -> List[Dict[str, str]]:
+        if with_context:
+            return self.context.build(message)
+        return [{"role": "user", "content": message}]
+
+    def send_message(self, message: str, use_cache: bool = False, with_context: bool = True,
+                     save_history: bool = True) -> str:
+        """メッセージを送信して応答を返す
+
+        with_context=True の場合は過去の会話（要約と直近の発言）を付けて送り、
+        use_cache=True の場合は同じ内容の応答をキャッシュから返す
+        """
         data = {
-            "model": "gpt-3.5-turbo",
-            "messages": [{"role": "user", "content": message}]
+            "model": self.model,
+            "messages": self._messages(message, with_context)
         }
+        cache_key = None
+        if use_cache and self.config.get('ai_cache_enabled', True):
+            cache_key = ResponseCache.make_key(self.model, data['messages'])
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                # 会話履歴には最初に送信したときに保存済み
+                return cached
 
         try:
-            response = requests.post(self.api_url, headers=headers, json=data)
-            response.raise_for_status()
-            result = response.json()
+            result = self._post(data)
             ai_response = result['choices'][0]['message']['content']
             
             # 会話履歴の保存
-            self.ai_conversation_manager.add_message(message, "user")
-            self.ai_conversation_manager.add_message(ai_response, "assistant")
+            if save_history:
+                self.ai_conversation_manager.add_message(message, "user")
+                self.ai_conversation_manager.add_message(ai_response, "assistant")
             
+            if cache_key is not None:
+                self.response_cache.put(cache_key, ai_response)
             return ai_response
-        except requests.exceptions.RequestException as e:
+        except (AIRequestError, KeyError, IndexError, TypeError) as e:
             print(f"APIリクエスト中にエラーが発生しました: {e}")
-            return "申し訳ありません。エラーが発生しました。"
+            return ERROR_RESPONSE
+
+    def stream_message(self, message: str, with_context: bool = True) -> Iterator[str]:
+        """応答を少しずつ受け取り、届いたテキストの断片を順に返す（失敗した場合は AIRequestError）"""
+        import requests
+
+        data = {
+            "model": self.model,
+            "messages": self._messages(message, with_context),
+            "stream": True
+        }
+        # 再試行するのは応答が届き始める前まで（途中で切れた場合はやり直さない）
+        response = self._send(data, stream=True)
+        chunks = []
+        try:
+            # chunk_size=None で、サーバーから届いた分だけをすぐに読む
+            for line in response.iter_lines(chunk_size=None):
+                if not line.startswith(b'data:'):
+                    continue  # 空行やコメント（": keep-alive" など）
+                event = line[5:].strip()
+                if event == b'[DONE]':
+                    break
+                try:
+                    content = json.loads(event)['choices'][0].get('delta', {}).get('content')
+                except (ValueError, KeyError, IndexError, AttributeError):
+                    logging.warning(f"解析できないイベントを読み飛ばしました: {event[:100]!r}")
+                    continue
+                if content:
+                    chunks.append(content)
+                    yield content
+        except requests.exceptions.RequestException as e:
+            raise AIRequestError(f"応答の受信中に接続が切れました: {e}") from e
+        finally:
+            response.close()
 
-    def analyze_tasks(self, task_description: str) -> List[Dict[str, str]]:
+        # 会話履歴の保存（最後まで受け取れた場合のみ）
+        ai_response = ''.join(chunks)
+        self.ai_conversation_manager.add_message(message, "user")
+        self.ai_conversation_manager.add_message(ai_response, "assistant")
+
+    def _analyze(self, task_description: str, use_cache: bool, save_history: bool = True):
         prompt = f"以下のタスク説明を個別のサブタスクに分解してください。JSON形式で返答してください：\n{task_description}"
-        response = self.send_message(prompt)
+        response = self.send_message(prompt, use_cache=use_cache, with_context=False, save_history=save_history)
         
         try:
             tasks = json.loads(response)
@@ -78,12 +533,40 @@ class AIInterface:
             print("AIの応答をJSONとして解析できませんでした。")
             return []
 
-    def get_productivity_tips(self) -> str:
+    def analyze_tasks(self, task_description: str, use_cache: bool = True) -> List[Dict[str, str]]:
+        return self._analyze(task_description, use_cache)
+
+    def analyze_tasks_batch(self, task_descriptions: List[str], max_workers: Optional[int] = None,
+                            use_cache: bool = True) -> List[List[Dict[str, str]]]:
+        """複数のタスク説明を並行して分解し、入力と同じ順序で結果を返す（失敗した項目は空のリスト）
+
+        一括の分解は会話履歴に保存しない（チャットのコンテキストを埋めないようにする）
+        """
+        if not task_descriptions:
+            return []
+        workers = min(max_workers or self.batch_concurrency, len(task_descriptions))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ai-batch') as executor:
+            return list(executor.map(lambda description: self._analyze(description, use_cache, save_history=False),
+                                     task_descriptions))
+
+    def decompose_backlog(self, task_descriptions: List[str], task_manager, max_workers: Optional[int] = None,
+                          use_cache: bool = True) -> List[int]:
+        """タスク説明ごとに親タスクを作り、分解したサブタスクを子タスクとして1回のトランザクションで登録する"""
+        analyses = self.analyze_tasks_batch(task_descriptions, max_workers, use_cache)
+        tasks = []
+        for description, analysis in zip(task_descriptions, analyses):
+            lines = description.strip().split('\n', 1)
+            task = Task(title=lines[0], description=lines[1].strip() if len(lines) > 1 else "")
+            task.subtasks = [_subtask_from_analysis(item) for item in _subtask_items(analysis)]
+            tasks.append(task)
+        return task_manager.create_tasks(tasks)
+
+    def get_productivity_tips(self, use_cache: bool = True) -> str:
         prompt = "生産性を向上させるためのヒントを3つ教えてください。"
-        return self.send_message(prompt)
+        return self.send_message(prompt, use_cache=use_cache, with_context=False)
 
-    def get_task_prioritization(self, tasks: List[str]) -> List[str]:
+    def get_task_prioritization(self, tasks: List[str], use_cache: bool = True) -> List[str]:
         task_list = "\n".join(tasks)
         prompt = f"以下のタスクリストを優先順位順に並べ替えてください：\n{task_list}"
-        response = self.send_message(prompt)
+        response = self.send_message(prompt, use_cache=use_cache, with_context=False)
         return response.split("\n")
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+asyncioベースのコアイベントループ
+
+役割:
+- タイマー、アクティビティ追跡、通知、DB書き込みを1つのスケジューラーで動かす
+
+主な機能:
+- イベントループを1本のバックグラウンドスレッドで実行（GUIから利用する場合）
+- 既に動いているイベントループへの接続（ヘッドレスデーモンから利用する場合）
+- 任意のスレッドからのコールバック・コルーチンの投入
+- DB書き込み専用の単一スレッドExecutor（書き込み順序を保証する）
+- 通知表示などのブロッキング処理用の小さなExecutor
+
+使用するクラス/モジュール:
+- asyncio
+- concurrent.futures.ThreadPoolExecutor
+
+注意点:
+- ループ上のコールバックではブロッキング処理を行わず、Executorに任せること
+- Qt側のウィジェット更新はループのスレッドから直接行わず、シグナル経由で行うこと
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+
+class AsyncRuntime:
+    def __init__(self, io_workers: int = 2):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+        self.io_executor = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix='runtime-io')
+        self._thread = None
+        self._owns_loop = False
+        self._ready = threading.Event()
+
+    def start(self):
+        """イベントループを専用スレッドで起動する"""
+        if self.loop is not None:
+            return
+        self._owns_loop = True
+        self._thread = threading.Thread(target=self._run_loop, name='async-runtime', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """既に動いているイベントループを利用する"""
+        self.loop = loop
+        self._owns_loop = False
+        self._ready.set()
+
+    def stop(self):
+        if self.loop is not None and self._owns_loop:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            if self._thread is not None and self._thread is not threading.current_thread():
+                self._thread.join()
+            self.loop = None
+        self.db_executor.shutdown(wait=True)
+        self.io_executor.shutdown(wait=False)
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def in_loop_thread(self) -> bool:
+        if self.loop is None:
+            return False
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def time(self) -> float:
+        return self.loop.time()
+
+    def call_soon(self, callback: Callable, *args):
+        """任意のスレッドからループ上でコールバックを実行する"""
+        if self.loop is None or self.loop.is_closed():
+            # 停止後はスケジュールする先がないため何もしない
+            return None
+        if self.in_loop_thread():
+            return self.loop.call_soon(callback, *args)
+        return self.loop.call_soon_threadsafe(callback, *args)
+
+    def run_coroutine(self, coro) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run_db(self, func: Callable, *args) -> Future:
+        """DB書き込みを専用スレッドで順番に実行する"""
+        future = self.db_executor.submit(func, *args)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    def run_blocking(self, func: Callable, *args) -> Future:
+        """通知表示などのブロッキング処理をループ外で実行する"""
+        future = self.io_executor.submit(func, *args)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    @staticmethod
+    def _log_failure(future: Future):
+        if not future.cancelled() and future.exception() is not None:
+            logging.error(f"バックグラウンド処理でエラーが発生しました: {future.exception()}")
@@ -0,0 +1,328 @@
+"""
+ヘッドレスデーモンのIPCクライアント
+
+役割:
+- デーモンのJSON-RPC APIをローカルオブジェクトと同じ感覚で呼び出せるようにする
+
+主な機能:
+- 同期的なRPC呼び出し（複数スレッドから同時に呼び出し可能）
+- サーバーからのプッシュ通知の受信とハンドラー呼び出し
+- Timer / SessionManager / TaskManager / AIConversationManager のリモート版プロキシ
+
+使用するクラス/モジュール:
+- socket
+- core.ipc_protocol
+- core.timer.TimerState, TimerType
+- data.task_data.Task
+- data.ai_conversation.ConversationMessage
+
+注意点:
+- 受信は専用スレッドで行うため、通知ハンドラー（タイマーのオブザーバーなど）は
+  受信スレッドから呼ばれる。GUIを更新する場合はシグナル経由で行うこと
+- 応答が一定時間返らない場合は IPCError を送出すること
+"""
+
+import itertools
+import logging
+import socket
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from src.core import ipc_protocol
+from src.core.ipc_protocol import IPCError
+from src.core.timer import TimerState, TimerType
+from src.data.task_data import Task
+from src.data.ai_conversation import ConversationMessage
+
+
+class _PendingCall:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class IPCClient:
+    def __init__(self, address: Optional[str] = None, timeout: float = 10.0):
+        self.address = address or ipc_protocol.default_address()
+        self.timeout = timeout
+        self._sock = None
+        self._send_lock = threading.Lock()
+        self._pending: Dict[int, _PendingCall] = {}
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._notification_handlers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+        self._reader_thread = None
+
+    def connect(self):
+        kind, target = ipc_protocol.parse_address(self.address)
+        if kind == 'tcp':
+            self._sock = socket.create_connection(target, timeout=self.timeout)
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.settimeout(self.timeout)
+            self._sock.connect(target)
+        # 受信スレッドは通知を待ち続けるため、ソケットはブロッキングに戻す
+        self._sock.settimeout(None)
+        self._reader_thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader_thread.start()
+        return self
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._sock.close()
+            self._sock = None
+        if self._reader_thread is not None and self._reader_thread is not threading.current_thread():
+            self._reader_thread.join(timeout=self.timeout)
+        self._fail_pending("接続が閉じられました。")
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def call(self, method: str, **params) -> Any:
+        if self._sock is None:
+            raise IPCError("デーモンに接続されていません。")
+
+        request_id = next(self._ids)
+        pending = _PendingCall()
+        with self._pending_lock:
+            self._pending[request_id] = pending
+
+        data = ipc_protocol.encode_message(ipc_protocol.make_request(request_id, method, params))
+        try:
+            with self._send_lock:
+                self._sock.sendall(data)
+        except OSError as e:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            raise IPCError(f"リクエストの送信に失敗しました: {e}")
+
+        if not pending.event.wait(self.timeout):
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+            raise IPCError(f"応答がタイムアウトしました: {method}")
+        if pending.error is not None:
+            raise IPCError(pending.error.get('message', ''), pending.error.get('code', ipc_protocol.INTERNAL_ERROR))
+        return pending.result
+
+    def on_notification(self, method: str, handler: Callable[[Dict[str, Any]], None]):
+        self._notification_handlers.setdefault(method, []).append(handler)
+
+    def _read_loop(self):
+        reader = self._sock.makefile('rb')
+        try:
+            for line in reader:
+                try:
+                    message = ipc_protocol.decode_message(line)
+                except ValueError:
+                    logging.warning("デーモンから不正なメッセージを受信しました。")
+                    continue
+                if 'id' in message and message['id'] is not None:
+                    self._resolve(message)
+                elif 'method' in message:
+                    self._dispatch_notification(message)
+        except (OSError, ValueError):
+            pass
+        finally:
+            reader.close()
+            self._fail_pending("デーモンとの接続が切断されました。")
+
+    def _resolve(self, message: Dict[str, Any]):
+        with self._pending_lock:
+            pending = self._pending.pop(message['id'], None)
+        if pending is None:
+            return
+        pending.result = message.get('result')
+        pending.error = message.get('error')
+        pending.event.set()
+
+    def _dispatch_notification(self, message: Dict[str, Any]):
+        for handler in self._notification_handlers.get(message['method'], []):
+            try:
+                handler(message.get('params') or {})
+            except Exception:
+                logging.exception(f"通知ハンドラーでエラーが発生しました: {message['method']}")
+
+    def _fail_pending(self, reason: str):
+        with self._pending_lock:
+            pending_calls = list(self._pending.values())
+            self._pending.clear()
+        for pending in pending_calls:
+            pending.error = {'code': ipc_protocol.INTERNAL_ERROR, 'message': reason}
+            pending.event.set()
+
+
+class RemoteTimer:
+    """core.timer.Timer と同じインターフェースを持つリモートプロキシ"""
+
+    def __init__(self, client: IPCClient, config):
+        self.client = client
+        self.config = config
+        self.observers = []
+        self.state = TimerState.IDLE
+        self.timer_type = TimerType.WORK
+        self.remaining_time = self.config.get('work_time', 25 * 60)
+        self.pomodoro_count = 0
+        self.client.on_notification('timer.updated', self._on_timer_updated)
+        self._apply_state(self.client.call('timer.subscribe'))
+
+    def start(self):
+        self.client.call('timer.start')
+
+    def pause(self):
+        self.client.call('timer.pause')
+
+    def resume(self):
+        self.client.call('timer.resume')
+
+    def stop(self):
+        self.client.call('timer.stop')
+
+    def add_observer(self, observer):
+        self.observers.append(observer)
+
+    def remove_observer(self, observer):
+        self.observers.remove(observer)
+
+    def update_settings(self, config):
+        self.client.call('timer.reload_settings')
+
+    def _apply_state(self, state: Dict[str, Any]):
+        self.state = TimerState[state['state']]
+        self.timer_type = TimerType[state['timer_type']]
+        self.remaining_time = state['remaining_time']
+        self.pomodoro_count = state.get('pomodoro_count', self.pomodoro_count)
+
+    def _on_timer_updated(self, params: Dict[str, Any]):
+        self._apply_state(params)
+        for observer in self.observers:
+            observer(self.state, self.timer_type, self.remaining_time)
+
+
+class RemoteSessionManager:
+    """core.session_manager.SessionManager のリモートプロキシ"""
+
+    def __init__(self, client: IPCClient):
+        self.client = client
+
+    def start_session(self, task_id: int = None):
+        self.client.call('session.start_session', task_id=task_id)
+
+    def end_session(self):
+        self.client.call('session.end_session')
+
+    def pause_session(self):
+        self.client.call('session.pause_session')
+
+    def resume_session(self, task_id: int = None):
+        self.client.call('session.resume_session', task_id=task_id)
+
+    def get_session_statistics(self, start_date, end_date):
+        return self.client.call('session.get_session_statistics', start_date=start_date, end_date=end_date)
+
+    def get_recent_sessions(self, limit: int = 10):
+        return self.client.call('session.get_recent_sessions', limit=limit)
+
+    def get_today_stats(self):
+        return self.client.call('session.get_today_stats')
+
+
+class RemoteTaskManager:
+    """core.task_manager.TaskManager のリモートプロキシ"""
+
+    def __init__(self, client: IPCClient):
+        self.client = client
+
+    def create_task(self, title: str, description: str = "", parent_id: int = None, priority: int = 0, due_date=None) -> int:
+        return self.client.call('task.create_task', title=title, description=description,
+                                parent_id=parent_id, priority=priority, due_date=due_date)
+
+    def create_tasks(self, tasks: List[Task]) -> List[int]:
+        return self.client.call('task.create_tasks', tasks=tasks)
+
+    def get_task(self, task_id: int) -> Optional[Task]:
+        result = self.client.call('task.get_task', task_id=task_id)
+        return Task.from_dict(result) if result else None
+
+    def update_task(self, task: Task) -> bool:
+        return self.client.call('task.update_task', task=task)
+
+    def delete_task(self, task_id: int) -> bool:
+        return self.client.call('task.delete_task', task_id=task_id)
+
+    def get_all_tasks(self) -> List[Task]:
+        return [Task.from_dict(task) for task in self.client.call('task.get_all_tasks')]
+
+    def get_task_tree(self) -> List[Task]:
+        return [Task.from_dict(task) for task in self.client.call('task.get_task_tree')]
+
+    def change_task_status(self, task_id: int, new_status: str) -> bool:
+        return self.client.call('task.change_task_status', task_id=task_id, new_status=new_status)
+
+    def move_task(self, task_id: int, new_parent_id: int = None) -> bool:
+        return self.client.call('task.move_task', task_id=task_id, new_parent_id=new_parent_id)
+
+    def get_task_history(self, task_id: int):
+        return self.client.call('task.get_task_history', task_id=task_id)
+
+    def get_tasks_by_priority(self) -> List[Task]:
+        return [Task.from_dict(task) for task in self.client.call('task.get_tasks_by_priority')]
+
+    def get_tasks_by_due_date(self) -> List[Task]:
+        return [Task.from_dict(task) for task in self.client.call('task.get_tasks_by_due_date')]
+
+    def get_completed_tasks_count(self) -> int:
+        return self.client.call('task.get_completed_tasks_count')
+
+
+class RemoteAIConversationManager:
+    """data.ai_conversation.AIConversationManager のリモートプロキシ"""
+
+    def __init__(self, client: IPCClient):
+        self.client = client
+
+    def on_deleted(self, callback: Callable[[], None]):
+        """デーモンが保持期間を過ぎた会話を削除するたびに callback を呼ぶ（受信スレッドから呼ばれる）"""
+        self.client.on_notification('ai_conversation.deleted', lambda params: callback())
+        self.client.call('ai_conversation.subscribe')
+
+    def add_message(self, message: str, role: str) -> int:
+        return self.client.call('ai_conversation.add_message', message=message, role=role)
+
+    def get_conversation_history(self, limit: int = 50) -> List[ConversationMessage]:
+        results = self.client.call('ai_conversation.get_conversation_history', limit=limit)
+        return [ConversationMessage(**result) for result in results]
+
+    def get_messages_after(self, message_id: int, limit: Optional[int] = None) -> List[ConversationMessage]:
+        results = self.client.call('ai_conversation.get_messages_after', message_id=message_id, limit=limit)
+        return [ConversationMessage(**result) for result in results]
+
+    def get_messages_before(self, timestamp=None, message_id: Optional[int] = None,
+                            limit: int = 50) -> List[ConversationMessage]:
+        results = self.client.call('ai_conversation.get_messages_before',
+                                   timestamp=None if timestamp is None else str(timestamp),
+                                   message_id=message_id, limit=limit)
+        return [ConversationMessage(**result) for result in results]
+
+    def get_summary(self) -> Optional[dict]:
+        return self.client.call('ai_conversation.get_summary')
+
+    def save_summary(self, summary: str, last_message_id: int):
+        self.client.call('ai_conversation.save_summary', summary=summary, last_message_id=last_message_id)
+
+    def search_conversations(self, keyword: str, limit: int = 50, offset: int = 0,
+                             max_candidates: Optional[int] = None) -> List[ConversationMessage]:
+        results = self.client.call('ai_conversation.search_conversations', keyword=keyword, limit=limit, offset=offset,
+                                   max_candidates=max_candidates)
+        return [ConversationMessage(**result) for result in results]
+
+    def get_conversation_stats(self) -> dict:
+        return self.client.call('ai_conversation.get_conversation_stats')
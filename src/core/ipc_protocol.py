@@ -0,0 +1,101 @@
+"""
+ローカルIPCのプロトコル定義
+
+役割:
+- ヘッドレスデーモンとクライアント間で共有するJSON-RPCの取り決め
+
+主な機能:
+- 接続先アドレスの解釈（Unixソケット / TCPループバック）
+- 改行区切りJSON-RPC 2.0メッセージのエンコードとデコード
+- datetime / Enum / dataclass のJSON変換
+
+注意点:
+- 1メッセージ = 1行（UTF-8のJSON + 改行）とすること
+- Windowsでは asyncio のUnixソケットが使えないため、既定でTCPループバックを使うこと
+"""
+
+import json
+import os
+import sys
+from dataclasses import asdict, is_dataclass
+from datetime import datetime, date
+from enum import Enum
+from typing import Any, Dict, Optional, Tuple
+
+JSONRPC_VERSION = "2.0"
+
+# JSON-RPC 2.0 の標準エラーコード
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+DEFAULT_SOCKET_PATH = 'data/pomodoro.sock'
+DEFAULT_TCP_ADDRESS = 'tcp://127.0.0.1:47625'
+
+
+class IPCError(Exception):
+    def __init__(self, message: str, code: int = INTERNAL_ERROR):
+        super().__init__(message)
+        self.code = code
+
+
+def default_address(config=None) -> str:
+    if config is not None and config.get('ipc_address'):
+        return config.get('ipc_address')
+    if sys.platform == 'win32':
+        return DEFAULT_TCP_ADDRESS
+    return DEFAULT_SOCKET_PATH
+
+
+def parse_address(address: str) -> Tuple[str, Any]:
+    """アドレス文字列を ('tcp', (host, port)) または ('unix', path) に変換する"""
+    if address.startswith('tcp://'):
+        host, _, port = address[len('tcp://'):].rpartition(':')
+        if not host or not port.isdigit():
+            raise ValueError(f"無効なTCPアドレスです: {address}")
+        return 'tcp', (host, int(port))
+    if address.startswith('unix://'):
+        address = address[len('unix://'):]
+    return 'unix', os.path.abspath(address)
+
+
+def to_jsonable(obj: Any) -> Any:
+    """json.dumps の default として使う変換関数"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.name
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return asdict(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"JSONに変換できない型です: {type(obj).__name__}")
+
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+    return json.dumps(message, default=to_jsonable, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+def decode_message(line: bytes) -> Dict[str, Any]:
+    return json.loads(line.decode('utf-8'))
+
+
+def make_request(request_id: Optional[int], method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    message = {'jsonrpc': JSONRPC_VERSION, 'method': method, 'params': params}
+    if request_id is not None:
+        message['id'] = request_id
+    return message
+
+
+def make_result(request_id: Any, result: Any) -> Dict[str, Any]:
+    return {'jsonrpc': JSONRPC_VERSION, 'id': request_id, 'result': result}
+
+
+def make_error(request_id: Any, code: int, message: str) -> Dict[str, Any]:
+    return {'jsonrpc': JSONRPC_VERSION, 'id': request_id, 'error': {'code': code, 'message': message}}
+
+
+def make_notification(method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    return {'jsonrpc': JSONRPC_VERSION, 'method': method, 'params': params}
@@ -0,0 +1,269 @@
+"""
+ヘッドレスデーモンのIPCサーバー
+
+役割:
+- Timer / SessionManager / TaskManager をローカルのJSON-RPC APIとして公開
+- 複数のフロントエンド（GUI、CLI、スクリプト）で1つのプロセスとDB接続を共有
+
+主な機能:
+- Unixソケット（WindowsではTCPループバック）での接続受付
+- "timer.start" のような「サービス名.メソッド名」形式の呼び出しのディスパッチ
+- タイマー状態変化の購読クライアントへのプッシュ通知（"timer.updated"）
+- 保持期間による会話の削除の購読クライアントへのプッシュ通知（"ai_conversation.deleted"）
+
+使用するクラス/モジュール:
+- asyncio
+- core.ipc_protocol
+- core.timer.Timer
+- core.session_manager.SessionManager
+- core.task_manager.TaskManager
+- data.ai_conversation.AIConversationManager
+
+注意点:
+- メソッドの呼び出しはすべてイベントループのスレッドで直列に実行されるため、
+  DB接続は1本のまま共有できる
+- タイマーの通知はタイマースレッドから、会話の削除の通知は削除を行うスレッドから届くため、
+  call_soon_threadsafe でループに渡すこと
+- 公開するメソッドは明示的に列挙し、内部メソッドを外部から呼べないようにすること
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from src.core import ipc_protocol
+from src.core.ipc_protocol import IPCError
+from src.data.task_data import Task
+
+# サービスごとに公開するメソッド
+EXPOSED_METHODS = {
+    'timer': ['start', 'pause', 'resume', 'stop'],
+    'session': [
+        'start_session', 'end_session', 'pause_session', 'resume_session',
+        'get_session_statistics', 'get_recent_sessions', 'get_today_stats',
+    ],
+    'task': [
+        'create_task', 'create_tasks', 'get_task', 'update_task', 'delete_task', 'get_all_tasks',
+        'get_task_tree', 'change_task_status', 'move_task', 'get_task_history',
+        'get_tasks_by_priority', 'get_tasks_by_due_date', 'get_completed_tasks_count',
+    ],
+    'ai_conversation': [
+        'add_message', 'get_conversation_history', 'search_conversations',
+        'get_conversation_stats', 'get_messages_after', 'get_messages_before', 'get_summary', 'save_summary',
+    ],
+}
+
+
+def _parse_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def _parse_task(value):
+    if isinstance(value, Task):
+        return value
+    return Task.from_dict(dict(value))
+
+
+# JSONでは表現できない引数の変換
+PARAM_CONVERTERS: Dict[str, Dict[str, Callable[[Any], Any]]] = {
+    'session.get_session_statistics': {'start_date': _parse_datetime, 'end_date': _parse_datetime},
+    'task.create_task': {'due_date': _parse_datetime},
+    'task.update_task': {'task': _parse_task},
+    'task.create_tasks': {'tasks': lambda values: [_parse_task(value) for value in values]},
+}
+
+
+class IPCServer:
+    def __init__(self, address: str, timer, session_manager, task_manager, ai_conversation_manager=None, config=None):
+        self.address = address
+        self.timer = timer
+        self.config = config
+        self.services = {
+            'timer': timer,
+            'session': session_manager,
+            'task': task_manager,
+        }
+        if ai_conversation_manager is not None:
+            self.services['ai_conversation'] = ai_conversation_manager
+        self.methods = self._build_method_table()
+        self.subscribers = set()
+        self.conversation_subscribers = set()  # 会話の削除の通知を受け取る接続
+        self.connection_count = 0
+        self._server = None
+        self._loop = None
+        self._closed = None
+        self.timer.add_observer(self._on_timer_update)
+
+    def _build_method_table(self) -> Dict[str, Callable]:
+        methods = {}
+        for service_name, method_names in EXPOSED_METHODS.items():
+            service = self.services.get(service_name)
+            if service is None:
+                continue
+            for method_name in method_names:
+                methods[f"{service_name}.{method_name}"] = getattr(service, method_name)
+
+        methods['timer.get_state'] = self._timer_state
+        methods['timer.reload_settings'] = self._reload_timer_settings
+        methods['server.ping'] = lambda: 'pong'
+        return methods
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._closed = asyncio.Event()
+        kind, target = ipc_protocol.parse_address(self.address)
+        if kind == 'tcp':
+            host, port = target
+            self._server = await asyncio.start_server(self._handle_client, host, port)
+        else:
+            directory = os.path.dirname(target)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if os.path.exists(target):
+                # 前回異常終了したときのソケットファイルを片付ける
+                os.remove(target)
+            self._server = await asyncio.start_unix_server(self._handle_client, target)
+        logging.info(f"IPCサーバーを起動しました: {self.address}")
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        await self._closed.wait()
+
+    def close(self):
+        """サーバーを停止する（イベントループのスレッドから呼ぶこと）"""
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for writer in list(self.subscribers | self.conversation_subscribers):
+            writer.close()
+        self.subscribers.clear()
+        self.conversation_subscribers.clear()
+        kind, target = ipc_protocol.parse_address(self.address)
+        if kind == 'unix' and os.path.exists(target):
+            os.remove(target)
+        if self._closed is not None:
+            self._closed.set()
+
+    def close_threadsafe(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self.close)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connection_count += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = self.handle_line(line, writer)
+                if response is not None:
+                    writer.write(ipc_protocol.encode_message(response))
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connection_count -= 1
+            self.subscribers.discard(writer)
+            self.conversation_subscribers.discard(writer)
+            writer.close()
+
+    def handle_line(self, line: bytes, writer: Optional[asyncio.StreamWriter] = None) -> Optional[Dict[str, Any]]:
+        try:
+            request = ipc_protocol.decode_message(line)
+        except ValueError:
+            return ipc_protocol.make_error(None, ipc_protocol.PARSE_ERROR, "JSONを解析できませんでした。")
+
+        if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+            return ipc_protocol.make_error(None, ipc_protocol.INVALID_REQUEST, "無効なリクエストです。")
+
+        request_id = request.get('id')
+        try:
+            if request['method'] == 'timer.subscribe':
+                if writer is not None:
+                    self.subscribers.add(writer)
+                result = self._timer_state()
+            elif request['method'] == 'ai_conversation.subscribe':
+                if writer is not None:
+                    self.conversation_subscribers.add(writer)
+                result = True
+            else:
+                result = self.dispatch(request['method'], request.get('params') or {})
+        except IPCError as e:
+            return ipc_protocol.make_error(request_id, e.code, str(e))
+        except Exception as e:
+            logging.exception(f"IPCメソッドの実行中にエラーが発生しました: {request['method']}")
+            return ipc_protocol.make_error(request_id, ipc_protocol.INTERNAL_ERROR, str(e))
+
+        # idのないリクエストは通知として扱い、応答を返さない
+        if request_id is None:
+            return None
+        return ipc_protocol.make_result(request_id, result)
+
+    def dispatch(self, method: str, params: Any) -> Any:
+        handler = self.methods.get(method)
+        if handler is None:
+            raise IPCError(f"メソッドが見つかりません: {method}", ipc_protocol.METHOD_NOT_FOUND)
+
+        if isinstance(params, list):
+            args, kwargs = params, {}
+        elif isinstance(params, dict):
+            converters = PARAM_CONVERTERS.get(method, {})
+            args = []
+            kwargs = {key: converters[key](value) if key in converters else value for key, value in params.items()}
+        else:
+            raise IPCError("paramsはオブジェクトか配列で指定してください。", ipc_protocol.INVALID_PARAMS)
+
+        # 引数の対応付けだけを先に確かめる（メソッドの中で起きた TypeError は内部エラーとして返す）
+        try:
+            inspect.signature(handler).bind(*args, **kwargs)
+        except TypeError as e:
+            raise IPCError(str(e), ipc_protocol.INVALID_PARAMS)
+        return handler(*args, **kwargs)
+
+    def _timer_state(self) -> Dict[str, Any]:
+        return {
+            'state': self.timer.state.name,
+            'timer_type': self.timer.timer_type.name,
+            'remaining_time': self.timer.remaining_time,
+            'pomodoro_count': self.timer.pomodoro_count,
+        }
+
+    def _reload_timer_settings(self):
+        if self.config is not None:
+            self.config.load()
+            self.timer.update_settings(self.config)
+        return self._timer_state()
+
+    def _on_timer_update(self, state, timer_type, remaining_time):
+        # タイマースレッドから呼ばれるため、送信はイベントループに任せる
+        if self._loop is None or self._loop.is_closed():
+            return
+        message = ipc_protocol.make_notification('timer.updated', {
+            'state': state.name,
+            'timer_type': timer_type.name,
+            'remaining_time': remaining_time,
+            'pomodoro_count': self.timer.pomodoro_count,
+        })
+        self._loop.call_soon_threadsafe(self._broadcast, message)
+
+    def notify_conversations_deleted(self):
+        """保持期間を過ぎた会話を削除したことを購読クライアントに知らせる（どのスレッドから呼んでもよい）"""
+        if self._loop is None or self._loop.is_closed():
+            return
+        message = ipc_protocol.make_notification('ai_conversation.deleted', {})
+        self._loop.call_soon_threadsafe(self._broadcast, message, self.conversation_subscribers)
+
+    def _broadcast(self, message: Dict[str, Any], subscribers: Optional[set] = None):
+        subscribers = self.subscribers if subscribers is None else subscribers
+        data = ipc_protocol.encode_message(message)
+        for writer in list(subscribers):
+            if writer.is_closing():
+                subscribers.discard(writer)
+                continue
+            writer.write(data)
@@ -0,0 +1,138 @@
+"""
+通知の表示先（バックエンド）
+
+役割:
+- OSごとの通知APIの違いを吸収し、NotificationManagerから差し替え可能にする
+
+主な機能:
+- WinotifyBackend: Windowsのトースト通知
+- DBusBackend: freedesktopの通知（org.freedesktop.Notifications）
+- RecordingBackend: 通知をメモリに記録する（テスト・ベンチマーク用）
+- NullBackend: 何もしない
+- create_backend: 名前（'auto' を含む）からバックエンドを生成
+
+使用するクラス/モジュール:
+- winotify（WinotifyBackend使用時のみ）
+- jeepney または notify-send（DBusBackend使用時のみ）
+
+注意点:
+- OS固有のライブラリはモジュールの読み込み時ではなく、最初の表示時に読み込むこと
+- 'auto' でOSの通知が使えない場合は、NullBackendに切り替えてアプリを止めないこと
+"""
+
+import logging
+import shutil
+import subprocess
+import sys
+import threading
+from typing import List, Tuple
+
+APP_ID = "ポモドーロタイマー"
+
+
+class NotificationBackend:
+    name = 'base'
+
+    def show(self, title: str, message: str):
+        raise NotImplementedError
+
+
+class WinotifyBackend(NotificationBackend):
+    name = 'winotify'
+
+    def __init__(self):
+        self._winotify = None
+
+    def show(self, title: str, message: str):
+        if self._winotify is None:
+            import winotify
+            self._winotify = winotify
+        toast = self._winotify.Notification(app_id=APP_ID,
+                                            title=title,
+                                            msg=message,
+                                            duration="short")
+        toast.set_audio(self._winotify.audio.Default, loop=False)
+        toast.show()
+
+
+class DBusBackend(NotificationBackend):
+    name = 'dbus'
+
+    def __init__(self, timeout_ms: int = 5000):
+        self.timeout_ms = timeout_ms
+        self._connection = None
+        self._address = None
+        self._use_notify_send = False
+
+    def _connect(self):
+        try:
+            from jeepney import DBusAddress
+            from jeepney.io.blocking import open_dbus_connection
+        except ImportError:
+            if shutil.which('notify-send') is None:
+                raise RuntimeError("jeepney も notify-send も見つからないため、D-Bus通知を使えません。")
+            self._use_notify_send = True
+            return
+        self._address = DBusAddress('/org/freedesktop/Notifications',
+                                    bus_name='org.freedesktop.Notifications',
+                                    interface='org.freedesktop.Notifications')
+        self._connection = open_dbus_connection(bus='SESSION')
+
+    def show(self, title: str, message: str):
+        if self._connection is None and not self._use_notify_send:
+            self._connect()
+        if self._use_notify_send:
+            subprocess.run(['notify-send', '--app-name', APP_ID, '--expire-time', str(self.timeout_ms), title, message],
+                           check=True, timeout=5)
+            return
+        from jeepney import new_method_call
+        call = new_method_call(self._address, 'Notify', 'susssasa{sv}i',
+                               (APP_ID, 0, '', title, message, [], {}, self.timeout_ms))
+        self._connection.send_and_get_reply(call, timeout=5)
+
+
+class RecordingBackend(NotificationBackend):
+    name = 'record'
+
+    def __init__(self):
+        self.notifications: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+
+    def show(self, title: str, message: str):
+        with self._lock:
+            self.notifications.append((title, message))
+        logging.info(f"通知: {title} - {message}")
+
+
+class NullBackend(NotificationBackend):
+    name = 'null'
+
+    def show(self, title: str, message: str):
+        pass
+
+
+BACKENDS = {
+    WinotifyBackend.name: WinotifyBackend,
+    DBusBackend.name: DBusBackend,
+    RecordingBackend.name: RecordingBackend,
+    NullBackend.name: NullBackend,
+}
+
+
+def create_backend(name: str = 'auto') -> NotificationBackend:
+    if name != 'auto':
+        if name not in BACKENDS:
+            raise ValueError(f"不明な通知バックエンドです: {name}")
+        return BACKENDS[name]()
+
+    try:
+        if sys.platform == 'win32':
+            import winotify  # noqa: F401  利用可能かどうかだけを確認する
+            return WinotifyBackend()
+        if sys.platform.startswith('linux'):
+            backend = DBusBackend()
+            backend._connect()
+            return backend
+    except Exception as e:
+        logging.warning(f"OSの通知を利用できないため、通知を無効にします: {e}")
+    return NullBackend()
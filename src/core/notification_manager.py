@@ -7,53 +7,197 @@
 主な機能:
 - タイマー完了時の通知
 - 重要なイベント（長時間の作業など）の通知
+- 通知キューによる流量制御（優先度順の送信、同一キーの統合、重複の抑制、送信数の制限）
 
 使用するクラス/モジュール:
 - utils.config.Config
-- winotify
+- core.notification_backends（winotify / D-Bus / 記録用 / 無効）
+- core.async_runtime.AsyncRuntime（asyncioモード時）
 
 注意点:
-- OSはWindowsのみ対応
+- 表示先は設定 notification_backend で選択し、最初の表示時に読み込むこと
+  （このモジュールの読み込み時にOS固有のライブラリを読み込まない）
 - ユーザー設定に基づいて通知の on/off を切り替えられるようにすること
+- 通知の表示は1本のワーカーだけで行い、通知ごとにスレッドを作らないこと
+- キューは上限付きとし、あふれた場合は優先度の低いものから捨てること
 """
 
 from src.utils.config import config
-from winotify import Notification, audio
+from src.core.notification_backends import NotificationBackend, create_backend
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Callable, Dict, List, Optional
+import heapq
+import itertools
+import logging
 import threading
+import time
+
+class NotificationPriority(IntEnum):
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+@dataclass(order=True)
+class QueuedNotification:
+    priority: int
+    sequence: int
+    key: str = field(compare=False)
+    title: str = field(compare=False)
+    message: str = field(compare=False)
+    merged_count: int = field(default=0, compare=False)
+
+class NotificationQueue:
+    """優先度付きの上限付き通知キュー（ロックは呼び出し側で取ること）"""
+
+    def __init__(self, maxsize: int = 8, dedup_window: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.dedup_window = dedup_window
+        self.clock = clock
+        self._heap: List[QueuedNotification] = []
+        self._pending: Dict[str, QueuedNotification] = {}
+        self._last_shown: Dict[str, float] = {}
+        self._sequence = itertools.count()
+        self.metrics = {'enqueued': 0, 'merged': 0, 'deduplicated': 0, 'dropped': 0}
+
+    def __len__(self):
+        return len(self._heap)
+
+    def put(self, key: str, title: str, message: str, priority: int = NotificationPriority.NORMAL) -> str:
+        """通知を追加し、結果（'enqueued' / 'merged' / 'deduplicated' / 'dropped'）を返す"""
+        last_shown = self._last_shown.get(key)
+        if last_shown is not None and self.clock() - last_shown < self.dedup_window:
+            self.metrics['deduplicated'] += 1
+            return 'deduplicated'
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            # 送信待ちの同一キーの通知は最新の内容に置き換える
+            pending.title = title
+            pending.message = message
+            pending.merged_count += 1
+            if priority < pending.priority:
+                pending.priority = priority
+                heapq.heapify(self._heap)
+            self.metrics['merged'] += 1
+            return 'merged'
+
+        item = QueuedNotification(priority, next(self._sequence), key, title, message)
+        if len(self._heap) >= self.maxsize:
+            lowest = max(self._heap)
+            if item >= lowest:
+                self.metrics['dropped'] += 1
+                return 'dropped'
+            self._heap.remove(lowest)
+            heapq.heapify(self._heap)
+            del self._pending[lowest.key]
+            self.metrics['dropped'] += 1
+
+        heapq.heappush(self._heap, item)
+        self._pending[key] = item
+        self.metrics['enqueued'] += 1
+        return 'enqueued'
+
+    def pop(self) -> Optional[QueuedNotification]:
+        if not self._heap:
+            return None
+        item = heapq.heappop(self._heap)
+        del self._pending[item.key]
+        self._last_shown[item.key] = self.clock()
+        return item
 
 class NotificationManager:
-    def __init__(self, config):
+    def __init__(self, config, runtime=None, backend: NotificationBackend = None):
         self.config = config
+        self.runtime = runtime
+        self._backend = backend
+        self.queue = NotificationQueue(
+            maxsize=self.config.get('notification_queue_size', 8),
+            dedup_window=self.config.get('notification_dedup_window', 30),
+        )
+        self.rate_limit = self.config.get('notification_rate_limit', 6)  # 1分あたりの最大表示数
+        self._shown_times = deque()
+        self._lock = threading.Lock()
+        self._worker_active = False
+        self._shown_count = 0
+        self._failed_count = 0
 
-    def send_notification(self, title: str, message: str):
+    def send_notification(self, title: str, message: str, key: str = None,
+                          priority: NotificationPriority = NotificationPriority.NORMAL):
         if self.config.get('notifications_enabled', True):
-            threading.Thread(target=self._show_notification, args=(title, message)).start()
+            with self._lock:
+                result = self.queue.put(key or title, title, message, priority)
+                start_worker = result == 'enqueued' and not self._worker_active
+                if start_worker:
+                    self._worker_active = True
+            if start_worker:
+                # ワーカーは1本だけ。キューが空になると終了し、次の通知で再開する
+                if self.runtime is not None:
+                    self.runtime.run_blocking(self._drain_queue)
+                else:
+                    threading.Thread(target=self._drain_queue, daemon=True).start()
+
+    @property
+    def backend(self) -> NotificationBackend:
+        if self._backend is None:
+            self._backend = create_backend(self.config.get('notification_backend', 'auto'))
+        return self._backend
+
+    def get_metrics(self) -> Dict[str, int]:
+        with self._lock:
+            metrics = dict(self.queue.metrics)
+            metrics['queued'] = len(self.queue)
+        metrics['shown'] = self._shown_count
+        metrics['failed'] = self._failed_count
+        return metrics
+
+    def _drain_queue(self):
+        while True:
+            self._wait_for_rate_limit()
+            with self._lock:
+                item = self.queue.pop()
+                if item is None:
+                    self._worker_active = False
+                    return
+            try:
+                self._show_notification(item.title, item.message)
+                self._shown_count += 1
+            except Exception as e:
+                self._failed_count += 1
+                logging.error(f"通知の表示に失敗しました: {e}")
+            self._shown_times.append(time.monotonic())
+
+    def _wait_for_rate_limit(self):
+        if self.rate_limit <= 0:
+            return
+        while self._shown_times and time.monotonic() - self._shown_times[0] >= 60:
+            self._shown_times.popleft()
+        if len(self._shown_times) >= self.rate_limit:
+            # 待っている間に届いた同一キーの通知はキュー内で統合される
+            time.sleep(max(0, 60 - (time.monotonic() - self._shown_times[0])))
+            self._shown_times.popleft()
 
     def _show_notification(self, title: str, message: str):
-        toast = Notification(app_id="ポモドーロタイマー",
-                             title=title,
-                             msg=message,
-                             duration="short")
-        toast.set_audio(audio.Default, loop=False)
-        toast.show()
+        self.backend.show(title, message)
 
     def notify_timer_complete(self, timer_type: str):
         title = "タイマー終了"
         message = f"{timer_type}の時間が終了しました。"
-        self.send_notification(title, message)
+        self.send_notification(title, message, key='timer_complete', priority=NotificationPriority.HIGH)
 
     def notify_long_work_session(self, duration: int):
         if duration > self.config.get('long_work_session_threshold', 120 * 60):  # デフォルト2時間
             title = "長時間作業の警告"
             message = f"{duration // 60}分間連続で作業しています。休憩を取ることをおすすめします。"
-            self.send_notification(title, message)
+            self.send_notification(title, message, key='long_work_session', priority=NotificationPriority.LOW)
 
     def notify_task_completion(self, task_title: str):
         title = "タスク完了"
         message = f"タスク「{task_title}」が完了しました。お疲れ様でした！"
-        self.send_notification(title, message)
+        self.send_notification(title, message, key=f'task_completion:{task_title}')
 
     def notify_daily_goal_achieved(self):
         title = "日次目標達成"
         message = "今日の目標を達成しました！素晴らしい成果です！"
-        self.send_notification(title, message)
\ No newline at end of file
+        self.send_notification(title, message, key='daily_goal')
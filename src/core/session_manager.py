@@ -12,10 +12,12 @@
 使用するクラス/モジュール:
 - data.database.Database
 - utils.config.Config
+- core.async_runtime.AsyncRuntime（asyncioモード時）
 
 注意点:
 - セッションデータの整合性を保つこと（途中で異常終了した場合の処理など）
 - 長期間の使用でもパフォーマンスが低下しないよう、適切なデータ管理を行うこと
+- asyncioモードではセッションの書き込みをDB用Executorで行い、呼び出し元をブロックしないこと
 """
 
 from datetime import datetime, timedelta
@@ -23,9 +25,10 @@ from src.data.database import Database
 from src.utils.config import config
 
 class SessionManager:
-    def __init__(self, database: Database, config):
+    def __init__(self, database: Database, config, runtime=None):
         self.database = database
         self.config = config
+        self.runtime = runtime
         self.current_session = None
 
     def start_session(self, task_id: int = None):
@@ -52,7 +55,10 @@ class SessionManager:
                 duration,
                 self.current_session['task_id']
             )
-            self.database.execute_insert(query, params)
+            if self.runtime is not None:
+                self.runtime.run_db(self.database.execute_insert, query, params)
+            else:
+                self.database.execute_insert(query, params)
             
             self.current_session = None
 
@@ -5,7 +5,7 @@
 - タスクの追加、編集、削除、状態管理
 
 主な機能:
-- タスクのCRUD操作
+- タスクのCRUD操作（複数のタスクの一括登録を含む）
 - タスクの階層構造（メインタスク、サブタスク）の管理
 - タスクの状態遷移（未開始→進行中→完了）
 
@@ -33,6 +33,10 @@ class TaskManager:
         task = Task(title=title, description=description, parent_id=parent_id, priority=priority, due_date=due_date)
         return self.data_task_manager.create_task(task)
 
+    def create_tasks(self, tasks: List[Task]) -> List[int]:
+        """複数のタスク（サブタスクを含む）を一括で登録する"""
+        return self.data_task_manager.create_tasks(tasks)
+
     def get_task(self, task_id: int) -> Task:
         return self.data_task_manager.get_task(task_id)
 
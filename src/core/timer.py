@@ -13,9 +13,11 @@
 使用するクラス/モジュール:
 - utils.config.Config
 - core.notification_manager.NotificationManager
+- core.async_runtime.AsyncRuntime（asyncioモード時）
 
 注意点:
 - マルチスレッド環境での正確な時間管理に注意
+- asyncioモードでは1秒ごとの締め切りを loop.call_at で予約し、累積の遅れが出ないようにすること
 - タイマー状態の変更時には適切にシグナルを発行し、GUI更新を促すこと
 """
 
@@ -36,50 +38,93 @@ class TimerType(Enum):
     LONG_BREAK = 2
 
 class Timer:
-    def __init__(self, config, notification_manager: NotificationManager):
+    def __init__(self, config, notification_manager: NotificationManager, runtime=None):
         self.config = config
         self.notification_manager = notification_manager
+        self.runtime = runtime
+        self.tick_interval = 1  # 秒
         self.state = TimerState.IDLE
         self.timer_type = TimerType.WORK
         self.remaining_time = self.config.get('work_time', 25 * 60)
         self.pomodoro_count = 0
         self.timer_thread = None
         self.observers = []
+        self._tick_handle = None
+        self._next_deadline = None
 
     def start(self):
         if self.state != TimerState.RUNNING:
             self.state = TimerState.RUNNING
-            self.timer_thread = threading.Thread(target=self._run_timer)
-            self.timer_thread.start()
+            if self.runtime is not None:
+                self.runtime.call_soon(self._schedule_ticks)
+            else:
+                self.timer_thread = threading.Thread(target=self._run_timer)
+                self.timer_thread.start()
             self._notify_observers()
 
     def pause(self):
         if self.state == TimerState.RUNNING:
             self.state = TimerState.PAUSED
+            if self.runtime is not None:
+                self.runtime.call_soon(self._cancel_ticks)
             self._notify_observers()
 
     def resume(self):
         if self.state == TimerState.PAUSED:
             self.state = TimerState.RUNNING
+            if self.runtime is not None:
+                self.runtime.call_soon(self._schedule_ticks)
             self._notify_observers()
 
     def stop(self):
         if self.state != TimerState.IDLE:
             self.state = TimerState.IDLE
+            if self.runtime is not None:
+                self.runtime.call_soon(self._cancel_ticks)
             self.remaining_time = self.config.get('work_time', 25 * 60)
             self._notify_observers()
 
     def _run_timer(self):
         while self.state == TimerState.RUNNING and self.remaining_time > 0:
-            time.sleep(1)
+            time.sleep(self.tick_interval)
             self.remaining_time -= 1
             self._notify_observers()
 
         if self.remaining_time == 0:
             self._timer_completed()
 
+    def _schedule_ticks(self):
+        # イベントループのスレッドで実行される
+        if self.state != TimerState.RUNNING or self._tick_handle is not None:
+            return
+        self._next_deadline = self.runtime.time() + self.tick_interval
+        self._tick_handle = self.runtime.loop.call_at(self._next_deadline, self._on_tick)
+
+    def _cancel_ticks(self):
+        if self._tick_handle is not None:
+            self._tick_handle.cancel()
+            self._tick_handle = None
+        self._next_deadline = None
+
+    def _on_tick(self):
+        self._tick_handle = None
+        if self.state != TimerState.RUNNING:
+            self._next_deadline = None
+            return
+
+        self.remaining_time -= 1
+        self._notify_observers()
+        if self.remaining_time <= 0:
+            self._next_deadline = None
+            self._timer_completed()
+            return
+
+        # 前回の締め切りを基準に次の締め切りを決めることで、遅れを累積させない
+        self._next_deadline += self.tick_interval
+        self._tick_handle = self.runtime.loop.call_at(self._next_deadline, self._on_tick)
+
     def _timer_completed(self):
-        self.notification_manager.send_notification("タイマー終了", f"{self.timer_type.name}の時間が終了しました。")
+        self.notification_manager.notify_timer_complete(self.timer_type.name)
         if self.timer_type == TimerType.WORK:
             self.pomodoro_count += 1
             if self.pomodoro_count % self.config.get('pomodoros_before_long_break', 4) == 0:
@@ -0,0 +1,116 @@
+"""
+ヘッドレスデーモンのエントリーポイント
+
+役割:
+- PySide6を読み込まずにタイマー、セッション、タスク管理を動かす
+- ローカルIPC（JSON-RPC）でGUI・CLI・スクリプトから共有できるようにする
+
+使用するクラス/モジュール:
+- core.ipc_server.IPCServer
+- core.timer.Timer
+- core.session_manager.SessionManager
+- core.task_manager.TaskManager
+- data.database.Database
+- data.conversation_retention.ConversationRetention（ai_retention_days 設定時）
+- utils.config.Config
+- core.async_runtime.AsyncRuntime（--event-loop asyncio 指定時）
+
+使い方:
+- python src/daemon.py [--address data/pomodoro.sock | tcp://127.0.0.1:47625] [--event-loop asyncio]
+- GUIは python src/main.py --connect [アドレス] でクライアントとして接続する
+
+注意点:
+- DB接続はこのプロセスの1本のみとし、すべてのクライアントで共有すること
+- 終了時はタイマーを止めてからDBを閉じること
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import logging
+import traceback
+# プロジェクトのルートディレクトリをパスに追加
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.core.timer import Timer
+from src.core.session_manager import SessionManager
+from src.core.task_manager import TaskManager
+from src.core.notification_manager import NotificationManager
+from src.core.ipc_protocol import default_address
+from src.core.ipc_server import IPCServer
+from src.core.async_runtime import AsyncRuntime
+from src.data.database import Database
+from src.data.ai_conversation import AIConversationManager
+from src.data.conversation_retention import ConversationRetention
+from src.utils.config import config
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ポモドーロタイマーのヘッドレスデーモン")
+    parser.add_argument('--address', help="待ち受けアドレス（Unixソケットのパス、または tcp://host:port）")
+    parser.add_argument('--event-loop', choices=['threads', 'asyncio'], default=None,
+                        help="コアのイベントループ方式（省略時は設定の event_loop）")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    # 設定の初期化
+    config.load()
+    address = args.address or default_address(config)
+
+    # データベースの初期化
+    db = Database(config)
+    db.initialize()
+
+    # asyncioモードでは、IPCサーバーと同じイベントループでタイマーを動かす
+    runtime = None
+    if (args.event_loop or config.get('event_loop', 'threads')) == 'asyncio':
+        runtime = AsyncRuntime()
+
+    # 各コアモジュールの初期化
+    notification_manager = NotificationManager(config, runtime)
+    timer = Timer(config, notification_manager, runtime)
+    session_manager = SessionManager(db, config, runtime)
+    task_manager = TaskManager(db, config)
+    ai_conversation_manager = AIConversationManager(db)
+
+    server = IPCServer(address, timer, session_manager, task_manager, ai_conversation_manager, config)
+
+    # 保持期間を過ぎた会話をバックグラウンドで少しずつ削除する
+    # （クライアントが会話のコンテキストを読み込み直せるよう、削除のたびに通知する）
+    retention = None
+    if config.get('ai_retention_days'):
+        retention = ConversationRetention(db, config.get('ai_retention_days'),
+                                          archive_dir=config.get('ai_retention_archive_dir'),
+                                          on_deleted=server.notify_conversations_deleted)
+        retention.start(config.get('ai_retention_interval_hours', 24))
+
+    async def serve():
+        if runtime is not None:
+            runtime.attach(asyncio.get_running_loop())
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if retention is not None:
+            retention.stop()
+        timer.stop()
+        session_manager.end_session()
+        if runtime is not None:
+            runtime.stop()
+        db.close()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        print(f"予期せぬエラーが発生しました: {e}")
+        print("詳細:")
+        traceback.print_exc()
+        sys.exit(1)
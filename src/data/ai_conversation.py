@@ -6,20 +6,26 @@ AI会話履歴の管理
 
 主な機能:
 - 会話メッセージの保存
-- 会話コンテキストの維持
-- 過去の会話の検索
+- 会話コンテキストの維持（指定したID以降のメッセージの取得、古い発言の要約の保存）
+- 会話履歴の表示用のページ単位の取得（(timestamp, id) によるキーセット方式）
+- 過去の会話の検索（FTS5の全文検索インデックスによる関連度順の検索、一致箇所の抜粋、ページ分割）
 
 使用するクラス/モジュール:
 - data.database.Database
 
 注意点:
 - 長期間の使用で会話履歴が肥大化しないよう、適切なデータ管理を行うこと
+  （定期的な削除と書き出しは data.conversation_retention.ConversationRetention で行う）
+- 関連度順の並べ替えは既定ではすべての一致が対象（よく現れる語では一致の数に比例して遅くなる）。
+  max_candidates を指定すると新しい順にその件数までの一致に限る（それより古い一致は検索結果に出ない）
+- 全文検索インデックスは trigram のため、3文字未満の語を含む検索は LIKE による全件の走査になる
 """
 
 from dataclasses import dataclass
 from datetime import datetime
 from typing import List, Optional
 import logging
+import re
 
 @dataclass
 class ConversationMessage:
@@ -27,6 +33,23 @@ class ConversationMessage:
     message: str
     role: str
     timestamp: datetime = datetime.now()
+    snippet: Optional[str] = None  # 検索結果の抜粋
+
+HIGHLIGHT = ('[', ']')  # 検索結果の抜粋で一致した箇所を囲む文字
+SNIPPET_CONTEXT_CHARS = 16
+
+
+def _make_snippet(message: str, term: str) -> str:
+    """FTS5の snippet() と同じ形式の抜粋を作る（全文検索の索引を使わない場合）"""
+    position = message.lower().find(term.lower())
+    if position < 0:
+        return message[:SNIPPET_CONTEXT_CHARS * 2]
+    start = max(0, position - SNIPPET_CONTEXT_CHARS)
+    end = min(len(message), position + len(term) + SNIPPET_CONTEXT_CHARS)
+    return ('…' if start > 0 else '') + message[start:position] + HIGHLIGHT[0] + \
+        message[position:position + len(term)] + HIGHLIGHT[1] + \
+        message[position + len(term):end] + ('…' if end < len(message) else '')
+
 
 class AIConversationManager:
     def __init__(self, database):
@@ -49,22 +72,115 @@ class AIConversationManager:
         results = self.database.execute_query(query, (limit,))
         return [ConversationMessage(**result) for result in results]
 
-    def search_conversations(self, keyword: str) -> List[ConversationMessage]:
+    def get_messages_after(self, message_id: int, limit: Optional[int] = None) -> List[ConversationMessage]:
+        """指定したIDより後のメッセージを古い順に返す"""
         query = '''
             SELECT * FROM ai_conversations
-            WHERE message LIKE ?
-            ORDER BY timestamp DESC
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
         '''
-        results = self.database.execute_query(query, (f'%{keyword}%',))
+        results = self.database.execute_query(query, (message_id, -1 if limit is None else limit))
         return [ConversationMessage(**result) for result in results]
 
-    def clear_old_conversations(self, days: int = 30):
+    def get_messages_before(self, timestamp=None, message_id: Optional[int] = None,
+                            limit: int = 50) -> List[ConversationMessage]:
+        """(timestamp, id) が指定した位置より前のメッセージを新しい順に返す（位置を省略した場合は最新から）
+
+        OFFSET を使わないキーセット方式のため、どのページも timestamp の索引から limit 件を読むだけで済む
+        """
+        if timestamp is None:
+            query = '''
+                SELECT * FROM ai_conversations
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ?
+            '''
+            results = self.database.execute_query(query, (limit,))
+        else:
+            query = '''
+                SELECT * FROM ai_conversations
+                WHERE (timestamp, id) < (?, ?)
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ?
+            '''
+            # timestamp は保存時と同じ文字列で比較する（datetime の場合も同じ形式に変換する）
+            results = self.database.execute_query(query, (str(timestamp), message_id, limit))
+        return [ConversationMessage(**result) for result in results]
+
+    def get_summary(self) -> Optional[dict]:
+        """コンテキストから外れた発言の要約と、要約に含めた最後のメッセージIDを返す"""
+        results = self.database.execute_query(
+            "SELECT summary, last_message_id FROM ai_conversation_summary WHERE id = 1")
+        return results[0] if results else None
+
+    def save_summary(self, summary: str, last_message_id: int):
         query = '''
-            DELETE FROM ai_conversations
-            WHERE timestamp < datetime('now', '-' || ? || ' days')
+            INSERT OR REPLACE INTO ai_conversation_summary (id, summary, last_message_id, updated_at)
+            VALUES (1, ?, ?, ?)
         '''
-        deleted_count = self.database.execute_update(query, (days,))
-        logging.info(f"{deleted_count}件の古い会話が削除されました。")
+        self.database.execute_update(query, (summary, last_message_id, datetime.now()))
+
+    def search_conversations(self, keyword: str, limit: int = 50, offset: int = 0,
+                             max_candidates: Optional[int] = None) -> List[ConversationMessage]:
+        """キーワード（空白区切りで複数指定するとすべてを含む）で検索し、関連度の高い順に返す
+
+        各メッセージの snippet に、一致した箇所を HIGHLIGHT で囲んだ抜粋を設定する。
+        max_candidates を指定した場合は、新しい順にその件数までの一致だけを関連度順に並べる
+        """
+        terms = keyword.split()
+        if not terms:
+            return []
+        if not self.database.has_search_index or any(len(term) < 3 for term in terms):
+            # trigram の索引は3文字未満の語を検索できないため、その場合は全件を走査する
+            return self._search_with_like(terms, limit, offset)
+
+        # 抜粋の作成は重いため、すべての一致に順位を付けたうえで、返すページの行だけで作る
+        candidates = '''
+            SELECT rowid, rank FROM ai_conversations_fts
+            WHERE ai_conversations_fts MATCH ?
+        '''
+        if max_candidates is not None:
+            candidates += ' ORDER BY rowid DESC LIMIT ?'
+        query = f'''
+            WITH page AS (
+                SELECT rowid AS id, rank FROM ({candidates})
+                ORDER BY rank
+                LIMIT ? OFFSET ?
+            )
+            SELECT c.id, c.message, c.role, c.timestamp,
+                   snippet(ai_conversations_fts, 0, ?, ?, '…', 32) AS snippet
+            FROM page
+            JOIN ai_conversations_fts ON ai_conversations_fts.rowid = page.id
+            JOIN ai_conversations c ON c.id = page.id
+            WHERE ai_conversations_fts MATCH ?
+            ORDER BY page.rank
+        '''
+        # 記号などがFTS5の構文として解釈されないよう、語ごとにフレーズとして囲む
+        match = ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+        cap = () if max_candidates is None else (max_candidates,)
+        params = (match, *cap, limit, offset, *HIGHLIGHT, match)
+        results = self.database.execute_query(query, params)
+        return [ConversationMessage(**result) for result in results]
+
+    def _search_with_like(self, terms: List[str], limit: int, offset: int) -> List[ConversationMessage]:
+        conditions = ' AND '.join("message LIKE ? ESCAPE '\\'" for _ in terms)
+        query = f'''
+            SELECT * FROM ai_conversations
+            WHERE {conditions}
+            ORDER BY timestamp DESC
+            LIMIT ? OFFSET ?
+        '''
+        patterns = ['%' + re.sub(r'([\\%_])', r'\\\1', term) + '%' for term in terms]
+        results = self.database.execute_query(query, (*patterns, limit, offset))
+        messages = [ConversationMessage(**result) for result in results]
+        for message in messages:
+            message.snippet = _make_snippet(message.message, terms[0])
+        return messages
+
+    def clear_old_conversations(self, days: int = 30) -> int:
+        """保持期間を過ぎた会話を、timestamp の索引で古い順に選んだ一定数ずつ、IDを指定した小さなトランザクションで削除する"""
+        from src.data.conversation_retention import ConversationRetention
+        return ConversationRetention(self.database, days).run_once().deleted
 
     def get_conversation_stats(self) -> dict:
         query = '''
@@ -0,0 +1,189 @@
+"""
+セッションデータの増分集計
+
+役割:
+- DataAnalyzer が使う集計値を、セッションテーブルの差分だけを読んで更新する
+
+主な機能:
+- 変更回数（table_changes をトリガーで更新）による変更検知
+- 前回以降に追加されたセッションだけの集計
+- 時間帯別・曜日別・日別の作業時間と、集中時間の統計の増分更新
+- 集計方法の選択（'sql': SQLiteのGROUP BYで集計 / 'pandas': 行を読み込んでpandasで集計）
+
+使用するクラス/モジュール:
+- data.database.Database
+- pandas（'pandas' バックエンド使用時のみ）
+
+注意点:
+- 既定の 'sql' バックエンドでは行をPythonに読み込まず、集計結果だけを受け取ること
+- 変更の確認は件数を数えずに table_changes の1行だけを読むこと
+- セッションの削除（古いデータの整理など）があった場合は全件を読み直すこと
+- セッションは追記のみを前提とする。既存の行を書き換えた場合は invalidate() を呼ぶこと
+- 集計値は合計と件数で保持し、平均は取り出すときに計算すること
+- 曜日はpandasに合わせて月曜日を0とする
+- 複数のスレッドから呼ばれてもよいよう、更新はロックで直列化すること
+"""
+
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.data.database import Database
+
+
+@dataclass
+class SessionAggregates:
+    hourly: Dict[int, List[float]] = field(default_factory=lambda: defaultdict(lambda: [0.0, 0]))   # 時 -> [合計, 件数]
+    weekday: Dict[int, List[float]] = field(default_factory=lambda: defaultdict(lambda: [0.0, 0]))  # 曜日 -> [合計, 件数]
+    daily: Dict[str, float] = field(default_factory=lambda: defaultdict(float))                     # 'YYYY-MM-DD' -> 合計
+    total: float = 0.0
+    count: int = 0
+    max: Optional[float] = None
+
+    def merge(self, other: 'SessionAggregates'):
+        for target, source in ((self.hourly, other.hourly), (self.weekday, other.weekday)):
+            for key, (total, count) in source.items():
+                target[key][0] += total
+                target[key][1] += count
+        for day, total in other.daily.items():
+            self.daily[day] += total
+        self.total += other.total
+        self.count += other.count
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+
+def aggregate_sql(database: Database, after_id: int, until_id: int) -> SessionAggregates:
+    """id が after_id より大きく until_id 以下のセッションを SQLite で集計する"""
+    aggregates = SessionAggregates()
+    where = "WHERE id > ? AND id <= ? AND duration IS NOT NULL"
+    params = (after_id, until_id)
+
+    query = f'''
+        SELECT CAST(strftime('%H', start_time) AS INTEGER) AS hour, SUM(duration) AS total, COUNT(*) AS n
+        FROM sessions {where} GROUP BY hour
+    '''
+    for row in database.execute_query(query, params):
+        aggregates.hourly[row['hour']] = [row['total'], row['n']]
+
+    # 曜日別の値と全体の統計は、日別の集計（日数分の行）から求めてテーブルの走査を1回減らす
+    query = f'''
+        SELECT date(start_time) AS day, SUM(duration) AS total, COUNT(*) AS n, MAX(duration) AS longest
+        FROM sessions {where} GROUP BY day
+    '''
+    for row in database.execute_query(query, params):
+        aggregates.daily[row['day']] = row['total']
+        weekday = aggregates.weekday[date.fromisoformat(row['day']).weekday()]
+        weekday[0] += row['total']
+        weekday[1] += row['n']
+        aggregates.total += row['total']
+        aggregates.count += row['n']
+        aggregates.max = row['longest'] if aggregates.max is None else max(aggregates.max, row['longest'])
+    return aggregates
+
+
+def aggregate_pandas(database: Database, after_id: int, until_id: int) -> SessionAggregates:
+    """id が after_id より大きく until_id 以下のセッションを読み込み、pandas で集計する"""
+    import pandas as pd
+
+    aggregates = SessionAggregates()
+    query = "SELECT start_time, duration FROM sessions WHERE id > ? AND id <= ? AND duration IS NOT NULL"
+    rows = database.execute_query(query, (after_id, until_id))
+    if not rows:
+        return aggregates
+    df = pd.DataFrame(rows)
+    df['start_time'] = pd.to_datetime(df['start_time'], format='mixed')
+    for name, key in (('hourly', df['start_time'].dt.hour), ('weekday', df['start_time'].dt.dayofweek)):
+        target = getattr(aggregates, name)
+        for bucket, row in df.groupby(key)['duration'].agg(['sum', 'count']).iterrows():
+            target[int(bucket)] = [float(row['sum']), int(row['count'])]
+    for day, total in df.groupby(df['start_time'].dt.strftime('%Y-%m-%d'))['duration'].sum().items():
+        aggregates.daily[day] = float(total)
+    aggregates.total = float(df['duration'].sum())
+    aggregates.count = int(df['duration'].count())
+    aggregates.max = float(df['duration'].max())
+    return aggregates
+
+
+AGGREGATORS = {
+    'sql': aggregate_sql,
+    'pandas': aggregate_pandas,
+}
+
+
+class SessionAnalytics:
+    def __init__(self, database: Database, backend: str = 'sql'):
+        if backend not in AGGREGATORS:
+            raise ValueError(f"不明な集計バックエンドです: {backend}")
+        self.database = database
+        self.aggregate = AGGREGATORS[backend]
+        self._lock = threading.Lock()
+        self._version: Optional[Tuple[int, int]] = None  # (追加回数, 削除回数)
+        self._last_id = 0
+        self._aggregates = SessionAggregates()
+        self.full_loads = 0
+        self.incremental_loads = 0
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+
+    def refresh(self) -> bool:
+        """前回から変更があれば集計値を更新し、更新したかどうかを返す"""
+        with self._lock:
+            # 変更回数と最大IDは1つの文で読み、同じ時点の値にする
+            results = self.database.execute_query('''
+                SELECT inserts, deletes, (SELECT MAX(id) FROM sessions) AS max_id
+                FROM table_changes WHERE table_name = 'sessions'
+            ''')
+            version = (results[0]['inserts'], results[0]['deletes']) if results else None
+            if version is not None and version == self._version:
+                return False
+
+            max_id = results[0]['max_id'] if results else None
+            if self._version is None or version is None or version[1] != self._version[1]:
+                # 初回や削除があった場合は、集計をやり直す
+                self._aggregates = SessionAggregates()
+                self._last_id = 0
+                self.full_loads += 1
+            else:
+                # 削除がなければ、追加された行は前回の最大IDより後ろにある
+                self.incremental_loads += 1
+
+            if max_id is not None and max_id > self._last_id:
+                self._aggregates.merge(self.aggregate(self.database, self._last_id, max_id))
+                self._last_id = max_id
+            self._version = version
+            return True
+
+    def work_patterns(self) -> Dict[str, Dict[int, float]]:
+        self.refresh()
+        with self._lock:
+            return {
+                'hourly_pattern': self._means(self._aggregates.hourly),
+                'daily_pattern': self._means(self._aggregates.weekday),
+            }
+
+    @staticmethod
+    def _means(buckets: Dict[int, List[float]]) -> Dict[int, float]:
+        return {key: total / count for key, (total, count) in sorted(buckets.items()) if count}
+
+    def daily_work_time(self, days: int = None) -> Dict[str, float]:
+        self.refresh()
+        with self._lock:
+            daily = sorted(self._aggregates.daily.items())
+            if days is not None:
+                daily = daily[-days:]
+            return dict(daily)
+
+    def focus_time_statistics(self) -> Dict[str, Any]:
+        self.refresh()
+        with self._lock:
+            aggregates = self._aggregates
+            return {
+                'total_focus_time': aggregates.total,
+                'avg_focus_time': aggregates.total / aggregates.count if aggregates.count else 0,
+                'max_focus_time': aggregates.max or 0,
+            }
@@ -0,0 +1,199 @@
+"""
+レポート用グラフの描画とキャッシュ
+
+役割:
+- レポートのグラフを画面に表示せずに（Aggバックエンドで）PNG / SVG の画像データとして描画する
+- 描画した画像をディスクにキャッシュし、同じグラフをすぐに返す
+
+主な機能:
+- グラフの種類ごとの描画（作業パターン、日別・週別・月別の作業時間、曜日×時間帯のヒートマップ）
+- (グラフの種類, 引数, 形式, データのバージョン) をキーにしたディスクキャッシュと、件数上限によるLRUの削除
+- 専用のワーカースレッドでの描画（render_async）
+
+使用するクラス/モジュール:
+- data.data_analyzer.DataAnalyzer
+- matplotlib（Figure と Agg / SVG のキャンバスのみを使い、pyplot は使わない）
+
+注意点:
+- pyplot はグローバルな状態を持ちウィンドウを開くため使わないこと
+- データのバージョンには table_changes のセッションの追加・削除回数を使い、セッションが変わると別のキーになる
+- キャッシュの最終利用時刻はファイルの更新時刻で管理する（アプリを再起動してもLRUの順序が保たれる）
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+FORMATS = ('png', 'svg')
+
+
+def _bar_chart(figure, data: Dict[Any, float], title: str, xlabel: str, ylabel: str):
+    axes = figure.add_subplot(1, 1, 1)
+    axes.bar([str(key) for key in data], list(data.values()))
+    axes.set_title(title)
+    axes.set_xlabel(xlabel)
+    axes.set_ylabel(ylabel)
+    axes.tick_params(axis='x', labelrotation=45)
+
+
+def _draw_work_patterns(figure, analyzer):
+    patterns = analyzer.analyze_work_patterns()
+    figure.set_size_inches(10, 12)
+    ax1, ax2 = figure.subplots(2, 1)
+
+    ax1.bar(list(patterns['hourly_pattern'].keys()), list(patterns['hourly_pattern'].values()))
+    ax1.set_title('Hourly Work Pattern')
+    ax1.set_xlabel('Hour of the Day')
+    ax1.set_ylabel('Average Duration (seconds)')
+
+    ax2.bar(list(patterns['daily_pattern'].keys()), list(patterns['daily_pattern'].values()))
+    ax2.set_title('Daily Work Pattern')
+    ax2.set_xlabel('Day of the Week')
+    ax2.set_ylabel('Average Duration (seconds)')
+
+
+def _draw_daily_work_time(figure, analyzer, days: int = 7):
+    _bar_chart(figure, analyzer.get_daily_work_time(days), 'Daily Work Time', 'Day', 'Duration (seconds)')
+
+
+def _draw_weekly_work_time(figure, analyzer, weeks: int = 12):
+    _bar_chart(figure, analyzer.get_weekly_work_time(weeks), 'Weekly Work Time', 'Week', 'Duration (seconds)')
+
+
+def _draw_monthly_work_time(figure, analyzer, months: int = 12):
+    _bar_chart(figure, analyzer.get_monthly_work_time(months), 'Monthly Work Time', 'Month', 'Duration (seconds)')
+
+
+def _draw_hour_weekday_heatmap(figure, analyzer):
+    heatmap = analyzer.get_hour_weekday_heatmap()
+    axes = figure.add_subplot(1, 1, 1)
+    image = axes.imshow(heatmap / 3600, aspect='auto', cmap='viridis')
+    axes.set_title('Focus Time by Weekday and Hour')
+    axes.set_xlabel('Hour of the Day')
+    axes.set_ylabel('Day of the Week')
+    axes.set_yticks(range(7), ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'])
+    figure.colorbar(image, ax=axes, label='Hours')
+
+
+CHARTS: Dict[str, Callable] = {
+    'work_patterns': _draw_work_patterns,
+    'daily_work_time': _draw_daily_work_time,
+    'weekly_work_time': _draw_weekly_work_time,
+    'monthly_work_time': _draw_monthly_work_time,
+    'hour_weekday_heatmap': _draw_hour_weekday_heatmap,
+}
+
+
+class ChartRenderer:
+    def __init__(self, analyzer, cache_dir: Optional[str] = None, max_entries: int = 64):
+        self.analyzer = analyzer
+        if cache_dir is None:
+            db_path = analyzer.database.config.get('database_path', 'data/pomodoro.db')
+            cache_dir = os.path.join(os.path.dirname(db_path) or '.', 'chart_cache')
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Optional[OrderedDict] = None  # ファイル名 -> None（古い順）
+        self._executor = None
+        self.hits = 0
+        self.renders = 0
+
+    def render(self, chart: str, fmt: str = 'png', **params) -> bytes:
+        """グラフを描画して画像データを返す（キャッシュがあればそれを返す）"""
+        if chart not in CHARTS:
+            raise ValueError(f"不明なグラフの種類です: {chart}")
+        if fmt not in FORMATS:
+            raise ValueError(f"対応していない画像形式です: {fmt}")
+
+        filename = f"{self._cache_key(chart, fmt, params)}.{fmt}"
+        cached = self._read_cache(filename)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        data = self._draw(chart, fmt, params)
+        self.renders += 1
+        self._write_cache(filename, data)
+        return data
+
+    def render_async(self, chart: str, fmt: str = 'png', **params) -> Future:
+        """ワーカースレッドで描画し、画像データを結果とする Future を返す"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chart-renderer')
+        return self._executor.submit(self.render, chart, fmt, **params)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _cache_key(self, chart: str, fmt: str, params: Dict[str, Any]) -> str:
+        key = json.dumps([chart, fmt, params, self.analyzer.data_version()], sort_keys=True, default=str)
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+    def _draw(self, chart: str, fmt: str, params: Dict[str, Any]) -> bytes:
+        from matplotlib.figure import Figure
+
+        figure = Figure(figsize=(10, 6))
+        CHARTS[chart](figure, self.analyzer, **params)
+        figure.tight_layout()
+        buffer = io.BytesIO()
+        # Figure.savefig は形式に合ったキャンバス（png は Agg）で描画し、画面のバックエンドを使わない
+        figure.savefig(buffer, format=fmt)
+        return buffer.getvalue()
+
+    def _load_entries(self):
+        if self._entries is not None:
+            return
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.rsplit('.', 1)[-1] in FORMATS:
+                    entries.append((os.path.getmtime(os.path.join(self.cache_dir, name)), name))
+        self._entries = OrderedDict((name, None) for _, name in sorted(entries))
+
+    def _read_cache(self, filename: str) -> Optional[bytes]:
+        with self._lock:
+            self._load_entries()
+            if filename not in self._entries:
+                return None
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                os.utime(path)
+            except OSError:
+                del self._entries[filename]
+                return None
+            self._entries.move_to_end(filename)
+            return data
+
+    def _write_cache(self, filename: str, data: bytes):
+        with self._lock:
+            self._load_entries()
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                # 書き込み途中のファイルを読まないよう、一時ファイルに書いてから置き換える
+                path = os.path.join(self.cache_dir, filename)
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(data)
+                os.replace(path + '.tmp', path)
+            except OSError as e:
+                logging.warning(f"グラフのキャッシュを保存できませんでした: {e}")
+                return
+            self._entries[filename] = None
+            self._entries.move_to_end(filename)
+            while len(self._entries) > self.max_entries:
+                oldest, _ = self._entries.popitem(last=False)
+                try:
+                    os.remove(os.path.join(self.cache_dir, oldest))
+                except OSError:
+                    pass
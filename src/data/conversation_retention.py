@@ -0,0 +1,166 @@
+"""
+AI会話履歴の保持期間の管理
+
+役割:
+- 保持期間を過ぎた ai_conversations の行を、バックグラウンドで少しずつ削除する
+
+主な機能:
+- 小さなトランザクションに分けた削除（timestamp の索引で古い順に一定数ずつ選び、IDを指定して削除する。
+  1回の削除にかかる時間が目標に近づくよう、件数を調整する）
+- 削除前の圧縮JSONL（.jsonl.gz）への書き出し（任意）
+- 進捗の通知と、行を削除したことの通知（on_deleted。会話のコンテキストの読み込み直しなどに使う）
+- 一定間隔での定期実行（専用のバックグラウンドスレッド）
+
+使用するクラス/モジュール:
+- data.database.Database
+- gzip, json
+
+注意点:
+- 削除中もGUIスレッドなど他の処理がDBを使えるよう、DBのロックを持つのは1回分の読み込みと削除の間だけにすること
+  （書き出し用の読み込みとファイルへの書き込みはロックの外で行う）
+- 基準日時は Python 側で計算して渡すこと（timestamp は sqlite3 の既定の変換でローカル時刻の文字列として保存されており、
+  SQLite の datetime('now') はUTCのため比較がずれる）
+- IDの範囲では削除しないこと（時計の変更などでIDと timestamp の順序が入れ替わると、期限切れの行が残る）
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+
+def _parse_timestamp(value) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+def _fraction(first: datetime, current, cutoff: datetime) -> float:
+    """削除が進んだ割合を、削除した行の timestamp の位置から見積もる（件数を数えずに済ませる）"""
+    total = (cutoff - first).total_seconds()
+    if total <= 0:
+        return 1.0
+    return min(1.0, max(0.0, (_parse_timestamp(current) - first).total_seconds() / total))
+
+
+@dataclass
+class RetentionResult:
+    deleted: int = 0
+    archived: int = 0
+    chunks: int = 0
+    max_chunk_ms: float = 0.0  # DBのロックを持っていた最長の時間
+    archive_path: Optional[str] = None
+
+
+class ConversationRetention:
+    def __init__(self, database, days: int = 30, archive_dir: Optional[str] = None,
+                 target_chunk_ms: float = 5.0, pause: float = 0.01,
+                 on_deleted: Optional[Callable[[], None]] = None):
+        self.database = database
+        self.days = days
+        self.archive_dir = archive_dir  # None の場合は書き出さずに削除する
+        self.target_chunk_ms = target_chunk_ms
+        self.pause = pause  # 1回分の削除ごとに空ける秒数（他の処理に書き込みの機会を渡す）
+        self.chunk_size = 200  # 1回に削除する件数（実行中に調整する）
+        self.on_deleted = on_deleted  # 1件以上削除した実行の後に呼ぶ（削除を実行したスレッドから呼ばれる）
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self, progress: Optional[Callable[[int, float], None]] = None,
+                 now: Optional[datetime] = None) -> RetentionResult:
+        """期限切れの会話を削除する（progress には削除した件数と、進み具合（0〜1）を渡す）"""
+        cutoff = (now or datetime.now()) - timedelta(days=self.days)
+        result = RetentionResult()
+        oldest = self.database.execute_query(
+            "SELECT timestamp FROM ai_conversations WHERE timestamp < ? ORDER BY timestamp LIMIT 1", (cutoff,))
+        if not oldest:
+            return result
+        first = _parse_timestamp(oldest[0]['timestamp'])
+
+        archive = None
+        if self.archive_dir is not None:
+            os.makedirs(self.archive_dir, exist_ok=True)
+            result.archive_path = os.path.join(self.archive_dir,
+                                               f"ai_conversations_{datetime.now():%Y%m%d_%H%M%S}.jsonl.gz")
+            archive = gzip.open(result.archive_path, 'at', encoding='utf-8')
+
+        columns = 'id, message, role, timestamp' if archive is not None else 'id, timestamp'
+        try:
+            while not self._stop.is_set():
+                # 削除済みの行は索引から消えているため、毎回最も古い行から読めばよい
+                requested = self.chunk_size
+                rows = self.database.execute_query(
+                    f"SELECT {columns} FROM ai_conversations WHERE timestamp < ? ORDER BY timestamp LIMIT ?",
+                    (cutoff, requested))
+                if not rows:
+                    # 前回がちょうど指定した件数だった場合は、ここで完了を通知する
+                    if progress is not None and result.chunks:
+                        progress(result.deleted, 1.0)
+                    break
+                if archive is not None:
+                    for row in rows:
+                        archive.write(json.dumps(row, ensure_ascii=False, default=str) + '\n')
+                    # 削除より先に書き出しが確実にファイルへ渡るようにする
+                    archive.flush()
+                    result.archived += len(rows)
+
+                ids = [row['id'] for row in rows]
+                started = time.perf_counter()
+                deleted = self.database.execute_update(
+                    f"DELETE FROM ai_conversations WHERE id IN ({','.join('?' * len(ids))})", tuple(ids))
+                elapsed_ms = (time.perf_counter() - started) * 1000
+
+                result.deleted += deleted
+                result.chunks += 1
+                result.max_chunk_ms = max(result.max_chunk_ms, elapsed_ms)
+                self._adjust_chunk_size(len(ids), elapsed_ms)
+                done = len(rows) < requested
+                if progress is not None:
+                    progress(result.deleted, 1.0 if done else _fraction(first, rows[-1]['timestamp'], cutoff))
+                if done:
+                    break
+                time.sleep(self.pause)
+        finally:
+            if archive is not None:
+                archive.close()
+            # 途中で止めた場合やエラーの場合も、削除済みの行を参照しているキャッシュを破棄させる
+            if result.deleted and self.on_deleted is not None:
+                self.on_deleted()
+
+        logging.info(f"{result.deleted}件の古い会話が削除されました（{result.chunks}回に分割, "
+                     f"最長 {result.max_chunk_ms:.1f}ms）。")
+        return result
+
+    def start(self, interval_hours: float = 24):
+        """定期実行を開始する（最初の実行は開始直後）"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run_periodically, args=(interval_hours * 3600,),
+                                        name='conversation-retention', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """定期実行を止める（削除の途中の場合は、実行中の削除を終えたところで止まる）"""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _run_periodically(self, interval: float):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"古い会話の削除中にエラーが発生しました: {e}")
+            self._stop.wait(interval)
+
+    def _adjust_chunk_size(self, size: int, elapsed_ms: float):
+        if elapsed_ms <= 0:
+            return
+        scaled = int(size * self.target_chunk_ms / elapsed_ms)
+        # 急に大きくしすぎないよう、1回で2倍までにする
+        self.chunk_size = max(50, min(scaled, self.chunk_size * 2, 20000))
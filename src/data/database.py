@@ -15,10 +15,17 @@
 注意点:
 - SQLインジェクション攻撃を防ぐため、パラメータ化クエリを使用すること
 - 大量のデータを扱う場合はインデックスの適切な設定を行うこと
+- ai_conversations の全文検索インデックス（FTS5）はトリガーで同期する。作成できない場合は has_search_index が False になる
 - トランザクション処理を適切に行い、データの一貫性を保つこと
+- 接続はDB書き込み用スレッドなど複数のスレッドから使われるため、ロックで直列化すること
+- 読み取り専用で開いた場合（initialize(read_only=True)）は、テーブルの作成や移行を行わないこと
 """
 
+import os
 import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
 from src.utils.config import config
 from typing import List, Dict, Any
 import logging
@@ -27,13 +34,28 @@ class Database:
     def __init__(self, config):
         self.config = config
         self.conn = None
+        self.read_only = False
+        self.has_search_index = False  # ai_conversations の全文検索インデックスがあるか
+        self._lock = threading.RLock()
 
-    def initialize(self):
+    def initialize(self, read_only: bool = False):
         db_path = self.config.get('database_path', 'data/pomodoro.db')
-        self.conn = sqlite3.connect(db_path)
+        self.read_only = read_only
+        if read_only:
+            # 集計用のワーカーなどが読み取り専用で開く場合は、テーブルの作成や移行を行わない
+            path = os.path.abspath(db_path).replace(os.sep, '/')
+            if not path.startswith('/'):
+                path = '/' + path  # Windowsのドライブ名（file:/C:/...）
+            self.conn = sqlite3.connect(f"file:{quote(path)}?mode=ro", uri=True, check_same_thread=False)
+            self._detect_search_index()
+            return
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
         self.conn.execute("PRAGMA foreign_keys = ON")
         self.create_tables()
         self.create_indexes()
+        self.create_search_index()
+        self._detect_search_index()
+        self.run_migrations()
 
     def create_tables(self):
         with self.conn:
@@ -44,6 +66,8 @@ class Database:
                     description TEXT,
                     status TEXT,
                     parent_id INTEGER,
+                    priority INTEGER DEFAULT 0,
+                    due_date TIMESTAMP,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (parent_id) REFERENCES tasks (id)
@@ -65,6 +89,14 @@ class Database:
                     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 );
 
+                -- 会話のコンテキストから外れた古い発言の要約（1行のみ）
+                CREATE TABLE IF NOT EXISTS ai_conversation_summary (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    summary TEXT NOT NULL,
+                    last_message_id INTEGER NOT NULL,
+                    updated_at TIMESTAMP
+                );
+
                 CREATE TABLE IF NOT EXISTS task_history (
                     id INTEGER PRIMARY KEY,
                     task_id INTEGER,
@@ -72,6 +104,81 @@ class Database:
                     changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (task_id) REFERENCES tasks (id)
                 );
+
+                CREATE TABLE IF NOT EXISTS app_usage (
+                    id INTEGER PRIMARY KEY,
+                    app_name TEXT NOT NULL,
+                    duration REAL,
+                    timestamp REAL,
+                    -- バケット内で最初に使い始めた時刻と、最後に使い終えた時刻（セッションとの突き合わせ用）
+                    span_start REAL,
+                    span_end REAL
+                );
+
+                -- app_usage の時間別・日別の集計（トリガーで挿入のたびに加算する）
+                CREATE TABLE IF NOT EXISTS app_usage_hourly (
+                    hour_start INTEGER NOT NULL,
+                    app_name TEXT NOT NULL,
+                    duration REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (hour_start, app_name)
+                ) WITHOUT ROWID;
+
+                CREATE TABLE IF NOT EXISTS app_usage_daily (
+                    day TEXT NOT NULL,
+                    app_name TEXT NOT NULL,
+                    duration REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, app_name)
+                ) WITHOUT ROWID;
+
+                CREATE TABLE IF NOT EXISTS app_categories (
+                    app_name TEXT PRIMARY KEY,
+                    category TEXT NOT NULL
+                );
+
+                -- セッションごとのアプリ使用時間（ActivityTracker が区間の突き合わせ結果を書き込む）
+                CREATE TABLE IF NOT EXISTS session_app_usage (
+                    session_id INTEGER NOT NULL,
+                    app_name TEXT NOT NULL,
+                    duration REAL NOT NULL,
+                    PRIMARY KEY (session_id, app_name),
+                    FOREIGN KEY (session_id) REFERENCES sessions (id) ON DELETE CASCADE
+                ) WITHOUT ROWID;
+
+                CREATE TABLE IF NOT EXISTS session_usage_attributed (
+                    session_id INTEGER PRIMARY KEY,
+                    FOREIGN KEY (session_id) REFERENCES sessions (id) ON DELETE CASCADE
+                );
+
+                -- 集計のキャッシュが変更を安く検知できるよう、表ごとの追加・削除の回数を数える
+                CREATE TABLE IF NOT EXISTS table_changes (
+                    table_name TEXT PRIMARY KEY,
+                    inserts INTEGER NOT NULL DEFAULT 0,
+                    deletes INTEGER NOT NULL DEFAULT 0
+                ) WITHOUT ROWID;
+
+                CREATE TRIGGER IF NOT EXISTS trg_sessions_count_insert
+                AFTER INSERT ON sessions
+                BEGIN
+                    UPDATE table_changes SET inserts = inserts + 1 WHERE table_name = 'sessions';
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS trg_sessions_count_delete
+                AFTER DELETE ON sessions
+                BEGIN
+                    UPDATE table_changes SET deletes = deletes + 1 WHERE table_name = 'sessions';
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS trg_app_usage_rollup
+                AFTER INSERT ON app_usage
+                BEGIN
+                    INSERT INTO app_usage_hourly (hour_start, app_name, duration)
+                    VALUES (CAST(NEW.timestamp / 3600 AS INTEGER) * 3600, NEW.app_name, NEW.duration)
+                    ON CONFLICT (hour_start, app_name) DO UPDATE SET duration = duration + excluded.duration;
+
+                    INSERT INTO app_usage_daily (day, app_name, duration)
+                    VALUES (date(NEW.timestamp, 'unixepoch', 'localtime'), NEW.app_name, NEW.duration)
+                    ON CONFLICT (day, app_name) DO UPDATE SET duration = duration + excluded.duration;
+                END;
             ''')
 
     def create_indexes(self):
@@ -81,11 +188,99 @@ class Database:
                 CREATE INDEX IF NOT EXISTS idx_sessions_task_id ON sessions (task_id);
                 CREATE INDEX IF NOT EXISTS idx_ai_conversations_timestamp ON ai_conversations (timestamp);
                 CREATE INDEX IF NOT EXISTS idx_task_history_task_id ON task_history (task_id);
+                CREATE INDEX IF NOT EXISTS idx_app_usage_timestamp ON app_usage (timestamp);
+                -- セッションの集計・突き合わせで表本体を読まずに済むよう、使う列をすべて含める
+                CREATE INDEX IF NOT EXISTS idx_sessions_start_covering ON sessions (start_time, end_time, duration);
             ''')
 
-    def execute_query(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+    def create_search_index(self):
+        """ai_conversations の全文検索用のFTS5テーブルと、同期用のトリガーを作成する"""
         try:
             with self.conn:
+                # trigram は日本語を単語に区切らずに部分一致で検索できる（3文字未満の語は検索できない）
+                self.conn.executescript('''
+                    CREATE VIRTUAL TABLE IF NOT EXISTS ai_conversations_fts USING fts5 (
+                        message, content='ai_conversations', content_rowid='id', tokenize='trigram'
+                    );
+
+                    CREATE TRIGGER IF NOT EXISTS trg_ai_conversations_fts_insert
+                    AFTER INSERT ON ai_conversations
+                    BEGIN
+                        INSERT INTO ai_conversations_fts (rowid, message) VALUES (NEW.id, NEW.message);
+                    END;
+
+                    CREATE TRIGGER IF NOT EXISTS trg_ai_conversations_fts_delete
+                    AFTER DELETE ON ai_conversations
+                    BEGIN
+                        INSERT INTO ai_conversations_fts (ai_conversations_fts, rowid, message)
+                        VALUES ('delete', OLD.id, OLD.message);
+                    END;
+
+                    CREATE TRIGGER IF NOT EXISTS trg_ai_conversations_fts_update
+                    AFTER UPDATE OF message ON ai_conversations
+                    BEGIN
+                        INSERT INTO ai_conversations_fts (ai_conversations_fts, rowid, message)
+                        VALUES ('delete', OLD.id, OLD.message);
+                        INSERT INTO ai_conversations_fts (rowid, message) VALUES (NEW.id, NEW.message);
+                    END;
+                ''')
+        except sqlite3.OperationalError as e:
+            # FTS5（trigram）に対応していないSQLiteでは、LIKEによる検索を使う
+            logging.warning(f"会話の全文検索インデックスを作成できませんでした: {e}")
+
+    def _detect_search_index(self):
+        self.has_search_index = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'ai_conversations_fts'").fetchone() is not None
+
+    def run_migrations(self):
+        """既存のデータベースに対して、後から追加した列とテーブルの初期データを用意する"""
+        with self._lock, self.conn:
+            # 後から追加した列がない表に列を追加する（app_usage の既存の行の区間は NULL のまま）
+            added_columns = {
+                'tasks': (('priority', 'INTEGER DEFAULT 0'), ('due_date', 'TIMESTAMP')),
+                'app_usage': (('span_start', 'REAL'), ('span_end', 'REAL')),
+            }
+            for table, columns in added_columns.items():
+                existing = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+                for column, definition in columns:
+                    if column not in existing:
+                        self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                        logging.info(f"{table} に {column} 列を追加しました。")
+
+            # 集計テーブル追加前に記録された app_usage を集計に反映する
+            rollups = {
+                'app_usage_hourly': "SELECT CAST(timestamp / 3600 AS INTEGER) * 3600, app_name, SUM(duration) FROM app_usage GROUP BY 1, 2",
+                'app_usage_daily': "SELECT date(timestamp, 'unixepoch', 'localtime'), app_name, SUM(duration) FROM app_usage GROUP BY 1, 2",
+            }
+            has_usage = self.conn.execute("SELECT 1 FROM app_usage LIMIT 1").fetchone()
+            for table, select in rollups.items():
+                if has_usage and not self.conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                    self.conn.execute(f"INSERT INTO {table} {select}")
+                    logging.info(f"{table} に既存の app_usage を集計しました。")
+
+            self.conn.execute("INSERT OR IGNORE INTO table_changes (table_name) VALUES ('sessions')")
+
+            # 全文検索インデックス追加前に保存された会話を索引に登録する
+            if (self.has_search_index
+                    and self.conn.execute("SELECT 1 FROM ai_conversations LIMIT 1").fetchone()
+                    and not self.conn.execute("SELECT 1 FROM ai_conversations_fts_docsize LIMIT 1").fetchone()):
+                self.conn.execute("INSERT INTO ai_conversations_fts (ai_conversations_fts) VALUES ('rebuild')")
+                logging.info("既存の会話を全文検索インデックスに登録しました。")
+
+    @contextmanager
+    def transaction(self):
+        """複数の文を1つのトランザクションで実行するための接続を返す"""
+        with self._lock:
+            try:
+                with self.conn:
+                    yield self.conn
+            except sqlite3.Error as e:
+                logging.error(f"トランザクションの実行中にエラーが発生しました: {e}")
+                raise
+
+    def execute_query(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        try:
+            with self._lock, self.conn:
                 cursor = self.conn.execute(query, params)
                 columns = [column[0] for column in cursor.description]
                 return [dict(zip(columns, row)) for row in cursor.fetchall()]
@@ -95,7 +290,7 @@ class Database:
 
     def execute_insert(self, query: str, params: tuple = ()) -> int:
         try:
-            with self.conn:
+            with self._lock, self.conn:
                 cursor = self.conn.execute(query, params)
                 return cursor.lastrowid
         except sqlite3.Error as e:
@@ -104,13 +299,24 @@ class Database:
 
     def execute_update(self, query: str, params: tuple = ()) -> int:
         try:
-            with self.conn:
+            with self._lock, self.conn:
                 cursor = self.conn.execute(query, params)
                 return cursor.rowcount
         except sqlite3.Error as e:
             logging.error(f"データの更新中にエラーが発生しました: {e}")
             raise
 
+    def execute_many(self, query: str, params_list: List[tuple]) -> int:
+        """複数行の書き込みを1つのトランザクションで行う"""
+        try:
+            with self._lock, self.conn:
+                cursor = self.conn.executemany(query, params_list)
+                return cursor.rowcount
+        except sqlite3.Error as e:
+            logging.error(f"データの一括書き込み中にエラーが発生しました: {e}")
+            raise
+
     def close(self):
-        if self.conn:
-            self.conn.close()
\ No newline at end of file
+        with self._lock:
+            if self.conn:
+                self.conn.close()
\ No newline at end of file
@@ -0,0 +1,203 @@
+"""
+セッションの列指向ストア
+
+役割:
+- SQLでは表現しにくい分析（連続日数、移動平均、時間帯×曜日のヒートマップ、パーセンタイルなど）のために、
+  セッションをNumPy配列として保持する
+
+主な機能:
+- 開始時刻（int64）・時間（float32）・タスクID（int32）の連続した配列
+- DBと同じ場所への .npy キャッシュの保存と、メモリマップでの読み込み
+- 前回以降に追加されたセッションだけのキャッシュへの追記
+
+使用するクラス/モジュール:
+- data.database.Database
+- numpy
+
+注意点:
+- 開始時刻はDBに記録されたローカル時刻をUTCとみなしたUNIX秒とする
+  （86400で割ると日、その余りを3600で割ると時になり、夏時間でも日・時の区切りがずれない）
+- タスクなしのセッションのタスクIDは -1、時間が未記録のセッションの時間は NaN とする
+- 追記は「データ → .npy のヘッダー → メタ情報」の順に書き、途中で止まっても次回の読み込みで検知して作り直せるようにする
+- 追記の前にこのストアが持つメモリマップを外す。返した配列（メモリマップ）を refresh をまたいで保持しないこと
+- セッションの削除を検知した場合（table_changes の削除回数が変わった場合）はキャッシュを作り直すこと
+- DBを読み取り専用で開いている場合（集計用のワーカープロセスなど）はキャッシュを書き換えず、
+  キャッシュより新しい分はメモリ上の配列に追加する
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from src.data.database import Database
+
+COLUMNS = {
+    'id': np.dtype('<i8'),
+    'start': np.dtype('<i8'),
+    'duration': np.dtype('<f4'),
+    'task_id': np.dtype('<i4'),
+}
+
+# 追記でshapeの桁数が増えてもヘッダーの長さが変わらないよう、ヘッダーを固定長にする
+_HEADER_SIZE = 128
+
+
+def _write_header(file, dtype: np.dtype, length: int):
+    header = repr({'descr': dtype.str, 'fortran_order': False, 'shape': (length,)})
+    preamble = b'\x93NUMPY\x01\x00'
+    body_size = _HEADER_SIZE - len(preamble) - 2
+    body = header.encode('latin1').ljust(body_size - 1) + b'\n'
+    file.seek(0)
+    file.write(preamble + body_size.to_bytes(2, 'little') + body)
+
+
+def _append_npy(path: str, dtype: np.dtype, values: np.ndarray):
+    """固定長ヘッダーの .npy ファイルに値を追記する（ファイルがなければ作成する）"""
+    values = np.ascontiguousarray(values, dtype=dtype)
+    if not os.path.exists(path):
+        with open(path, 'wb') as file:
+            _write_header(file, dtype, 0)
+    with open(path, 'r+b') as file:
+        # ヘッダーに記録された長さより後ろは、書き込み途中で止まった分として上書きする
+        np.lib.format.read_magic(file)
+        (length,), _, _ = np.lib.format.read_array_header_1_0(file)
+        file.seek(_HEADER_SIZE + length * dtype.itemsize)
+        file.write(values.tobytes())
+        file.truncate()
+        _write_header(file, dtype, length + len(values))
+
+
+class SessionColumnStore:
+    def __init__(self, database: Database, cache_path: Optional[str] = None):
+        self.database = database
+        if cache_path is None:
+            db_path = database.config.get('database_path', 'data/pomodoro.db')
+            cache_path = os.path.splitext(db_path)[0] + '.sessions'
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._columns: Dict[str, np.ndarray] = self._empty_columns()
+        self._meta = None
+        self.rebuilds = 0
+
+    def _column_path(self, name: str) -> str:
+        return f"{self.cache_path}.{name}.npy"
+
+    @property
+    def _meta_path(self) -> str:
+        return f"{self.cache_path}.json"
+
+    def __len__(self):
+        return len(self._columns['id'])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        self.refresh()
+        return self._columns[name]
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        self.refresh()
+        return dict(self._columns)
+
+    def refresh(self) -> int:
+        """DBの変更をキャッシュに反映し、追記した行数を返す"""
+        with self._lock:
+            results = self.database.execute_query('''
+                SELECT inserts, deletes, (SELECT MAX(id) FROM sessions) AS max_id
+                FROM table_changes WHERE table_name = 'sessions'
+            ''')
+            if not results:
+                return 0
+            version = (results[0]['inserts'], results[0]['deletes'])
+            max_id = results[0]['max_id'] or 0
+
+            if self._meta is None:
+                self._load()
+            if self._meta is not None and tuple(self._meta['version']) == version:
+                return 0
+            if self._meta is None or self._meta['version'][1] != version[1]:
+                self._reset()
+
+            appended = self._append_rows(self._meta['last_id'], max_id)
+            self._meta = {'version': list(version), 'last_id': max(max_id, self._meta['last_id']), 'rows': len(self)}
+            if not self.database.read_only:
+                with open(self._meta_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._meta, f)
+            return appended
+
+    def _load(self):
+        if not os.path.exists(self._meta_path):
+            return
+        try:
+            with open(self._meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            columns = self._open_columns() if meta['rows'] else self._empty_columns()
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"セッションのキャッシュを読み込めないため、作り直します: {e}")
+            return
+        if any(len(column) != meta['rows'] for column in columns.values()):
+            logging.warning("セッションのキャッシュの長さが一致しないため、作り直します。")
+            return
+        self._columns = columns
+        self._meta = meta
+
+    def _open_columns(self) -> Dict[str, np.ndarray]:
+        return {name: np.load(self._column_path(name), mmap_mode='r') for name in COLUMNS}
+
+    @staticmethod
+    def _empty_columns() -> Dict[str, np.ndarray]:
+        return {name: np.empty(0, dtype) for name, dtype in COLUMNS.items()}
+
+    def _reset(self):
+        # Windowsではメモリマップ中のファイルを削除できないため、先に参照を外す
+        self._columns = self._empty_columns()
+        for name in COLUMNS:
+            if os.path.exists(self._column_path(name)) and not self.database.read_only:
+                os.remove(self._column_path(name))
+        self._meta = {'version': [0, 0], 'last_id': 0, 'rows': 0}
+        self.rebuilds += 1
+
+    def _append_rows(self, after_id: int, until_id: int) -> int:
+        if until_id <= after_id:
+            return 0
+        query = '''
+            SELECT id, CAST(strftime('%s', start_time) AS INTEGER) AS start, duration, COALESCE(task_id, -1) AS task_id
+            FROM sessions
+            WHERE id > ? AND id <= ? AND start_time IS NOT NULL
+            ORDER BY id
+        '''
+        rows = self.database.execute_query(query, (after_id, until_id))
+        if not rows:
+            return 0
+        new_columns = {
+            name: np.fromiter((np.nan if row[name] is None else row[name] for row in rows), dtype, count=len(rows))
+            for name, dtype in COLUMNS.items()
+        }
+        if self.database.read_only:
+            self._columns = {name: np.concatenate((self._columns[name], new_columns[name])) for name in COLUMNS}
+            return len(rows)
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Windowsではメモリマップ中のファイルの大きさを変えられず、POSIXでも切り詰めたファイルのマップを読むと
+        # SIGBUS になるため、追記の前にマップを外し、追記後に開き直す（_reset と同じ順序）
+        self._columns = self._empty_columns()
+        try:
+            for name, dtype in COLUMNS.items():
+                _append_npy(self._column_path(name), dtype, new_columns[name])
+        except Exception:
+            # 一部の列だけに追記された可能性があるため、次回はキャッシュの長さを確かめてから使う
+            self._meta = None
+            raise
+        self._columns = self._open_columns()
+        return len(rows)
+
+    def day_totals(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(日の番号, その日の合計時間) を日の昇順で返す。日の番号はUNIX秒 // 86400"""
+        self.refresh()
+        days = self._columns['start'] // 86400
+        durations = np.nan_to_num(self._columns['duration'].astype(np.float64))
+        unique_days, inverse = np.unique(days, return_inverse=True)
+        return unique_days, np.bincount(inverse, weights=durations, minlength=len(unique_days))
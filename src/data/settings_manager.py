@@ -8,36 +8,39 @@
 - 設定のシリアライズ/デシリアライズ
 - デフォルト設定の提供
 - 設定変更の通知
+- 設定ファイルの暗号化キーの更新（rotate_encryption_key）
 
 注意点:
 - 設定ファイルの破損に備えて、バックアップと復元機能を実装すること
 - 機密情報（APIキーなど）は暗号化して保存すること
+- 暗号化キーは utils.secret_store から取得し、プロセス内で1回だけファイルから読み込む
+- キーの更新中に中断した場合に備えて、更新が終わるまで古いキーを <キーのファイル>.old に残す
+  （読み込み時は新しいキーと古いキーの両方で復号を試す）
 """
 
 import json
 import os
 from typing import Any, Dict
 import logging
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
+from src.utils.secret_store import secret_store
 
 class SettingsManager:
-    def __init__(self):
-        self.settings_file = 'data/settings.json'
-        self.encryption_key = self._get_or_create_encryption_key()
-        self.fernet = Fernet(self.encryption_key)
+    def __init__(self, settings_file: str = 'data/settings.json', key_file: str = 'data/encryption_key.key'):
+        self.settings_file = settings_file
+        self.key_file = key_file
+        self.encryption_key = secret_store.file_key(key_file)
+        self.fernet = self._create_fernet()
 
-    def _get_or_create_encryption_key(self):
-        key_file = 'data/encryption_key.key'
-        if not os.path.exists('data'):
-            os.makedirs('data')
-        if not os.path.exists(key_file):
-            key = Fernet.generate_key()
-            with open(key_file, 'wb') as f:
-                f.write(key)
-        else:
-            with open(key_file, 'rb') as f:
-                key = f.read()
-        return key
+    def _create_fernet(self):
+        fernet = secret_store.fernet(self.encryption_key)
+        old_key_file = f"{self.key_file}.old"
+        if not os.path.exists(old_key_file):
+            return fernet
+        # 前回のキーの更新が途中で終わった場合は、古いキーで暗号化された設定も読めるようにする
+        with open(old_key_file, 'rb') as f:
+            old_fernet = secret_store.fernet(f.read())
+        return MultiFernet([fernet, old_fernet])
 
     def load(self) -> Dict[str, Any]:
         if os.path.exists(self.settings_file):
@@ -53,11 +56,27 @@ class SettingsManager:
     def save(self, settings: Dict[str, Any]):
         try:
             encrypted_data = self.fernet.encrypt(json.dumps(settings).encode()).decode()
-            with open(self.settings_file, 'w') as f:
-                f.write(encrypted_data)
+            _write_atomic(self.settings_file, encrypted_data.encode())
         except Exception as e:
             logging.error(f"設定ファイルの保存に失敗しました: {e}")
 
+    def rotate_encryption_key(self, settings: Dict[str, Any]):
+        """設定ファイルの暗号化キーを新しくし、settings を新しいキーで保存し直す"""
+        old_key_file = f"{self.key_file}.old"
+        _write_atomic(old_key_file, self.encryption_key)
+        new_key = Fernet.generate_key()
+        _write_atomic(self.key_file, new_key)
+        secret_store.set_file_key(self.key_file, new_key)
+        self.encryption_key = new_key
+        self.fernet = self._create_fernet()
+
+        encrypted_data = self.fernet.encrypt(json.dumps(settings).encode()).decode()
+        _write_atomic(self.settings_file, encrypted_data.encode())
+        # 新しいキーで保存できたので、古いキーは不要になる
+        os.remove(old_key_file)
+        self.fernet = secret_store.fernet(new_key)
+        logging.info("設定ファイルの暗号化キーを更新しました。")
+
     def get_default_settings(self) -> Dict[str, Any]:
         return {
             'work_time': 25 * 60,
@@ -90,4 +109,17 @@ class SettingsManager:
             except Exception as e:
                 logging.error(f"バックアップの復元に失敗しました: {e}")
         else:
-            logging.warning("バックアップファイルが見つかりません。")
\ No newline at end of file
+            logging.warning("バックアップファイルが見つかりません。")
+
+
+def _write_atomic(path: str, data: bytes):
+    """一時ファイルに書き込んでから置き換える（書き込みの途中で中断しても元のファイルを壊さない）"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
@@ -0,0 +1,216 @@
+"""
+大量の履歴向けの分割集計によるレポート生成
+
+役割:
+- セッションを一定件数ずつ読み込み、メモリ使用量を件数によらず一定に保ったまま生産性レポートを作成する
+
+主な機能:
+- RunningStats: 件数・合計・最小・最大・平均・分散の結合可能な集計
+- TDigest: 近似パーセンタイルの結合可能な集計（t-digest）
+- StreamingReport: id順に一定件数ずつ読み込んでの、生産性レポートのセッション部分の作成
+
+使用するクラス/モジュール:
+- data.database.Database
+- numpy
+
+注意点:
+- 読み込みは「前回の最後のid より後ろ」を LIMIT 付きで取得し、OFFSET は使わないこと（後半ほど遅くなるため）
+- 時・曜日はSQLで求め、Python側で日時文字列を解析しないこと（曜日は月曜日を0とする）
+- TDigest のパーセンタイルは近似値である（圧縮率を上げるほど正確になり、メモリを使う）
+"""
+
+import math
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+
+from src.data.database import Database
+
+
+class RunningStats:
+    """結合可能な件数・合計・最小・最大・平均・分散（Chanらの方法で結合する）"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.mean = 0.0
+        self._m2 = 0.0  # 平均からの偏差の二乗和
+
+    @classmethod
+    def from_array(cls, values: np.ndarray) -> 'RunningStats':
+        stats = cls()
+        if len(values):
+            stats.count = len(values)
+            stats.total = float(values.sum())
+            stats.minimum = float(values.min())
+            stats.maximum = float(values.max())
+            stats.mean = stats.total / stats.count
+            stats._m2 = float(((values - stats.mean) ** 2).sum())
+        return stats
+
+    def merge(self, other: 'RunningStats'):
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    @property
+    def variance(self) -> float:
+        """母分散（pandas の var(ddof=0) と同じ）"""
+        return self._m2 / self.count if self.count else 0.0
+
+
+class TDigest:
+    """近似パーセンタイルのための t-digest（結合可能）"""
+
+    def __init__(self, compression: float = 100):
+        self.compression = compression
+        self._means = np.empty(0)
+        self._weights = np.empty(0)
+        self._buffer = []
+        self._buffered = 0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    @property
+    def count(self) -> float:
+        return float(self._weights.sum()) + self._buffered
+
+    def add_array(self, values: np.ndarray):
+        if len(values) == 0:
+            return
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+        self._buffer.append((np.asarray(values, dtype=np.float64), np.ones(len(values))))
+        self._buffered += len(values)
+        if self._buffered > self.compression * 10:
+            self._compress()
+
+    def merge(self, other: 'TDigest'):
+        other._compress()
+        if len(other._means) == 0:
+            return
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self._buffer.append((other._means, other._weights))
+        self._buffered += float(other._weights.sum())
+        self._compress()
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        means = np.concatenate([self._means] + [values for values, _ in self._buffer])
+        weights = np.concatenate([self._weights] + [counts for _, counts in self._buffer])
+        self._buffer = []
+        self._buffered = 0
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+
+        # 両端ほど小さな重心になるよう、q(1-q) に比例した上限まで隣り合う値をまとめる
+        total = weights.sum()
+        merged_means = []
+        merged_weights = []
+        current_mean, current_weight = means[0], weights[0]
+        cumulative = 0.0
+        for mean, weight in zip(means[1:], weights[1:]):
+            q = (cumulative + current_weight + weight / 2) / total
+            limit = max(1.0, 4 * total * q * (1 - q) / self.compression)
+            if current_weight + weight <= limit:
+                current_mean += (mean - current_mean) * weight / (current_weight + weight)
+                current_weight += weight
+            else:
+                merged_means.append(current_mean)
+                merged_weights.append(current_weight)
+                cumulative += current_weight
+                current_mean, current_weight = mean, weight
+        merged_means.append(current_mean)
+        merged_weights.append(current_weight)
+        self._means = np.array(merged_means)
+        self._weights = np.array(merged_weights)
+
+    def quantile(self, q: float) -> Optional[float]:
+        self._compress()
+        if len(self._means) == 0:
+            return None
+        if len(self._means) == 1:
+            return float(self._means[0])
+        # 各重心の中心の累積重みの間を線形補間し、両端は最小値・最大値につなぐ
+        centers = np.cumsum(self._weights) - self._weights / 2
+        positions = np.concatenate(([0.0], centers, [self._weights.sum()]))
+        values = np.concatenate(([self.minimum], self._means, [self.maximum]))
+        return float(np.interp(q * self._weights.sum(), positions, values))
+
+
+class StreamingReport:
+    def __init__(self, database: Database, chunk_size: int = 10000, compression: float = 100):
+        self.database = database
+        self.chunk_size = chunk_size
+        self.compression = compression
+        self.chunks_read = 0
+
+    def iter_chunks(self) -> Iterator[Dict[str, np.ndarray]]:
+        """セッションを chunk_size 件ずつ、列ごとの配列として返す"""
+        query = '''
+            SELECT id,
+                   CAST(strftime('%H', start_time) AS INTEGER) AS hour,
+                   (CAST(strftime('%w', start_time) AS INTEGER) + 6) % 7 AS weekday,
+                   duration
+            FROM sessions
+            WHERE id > ? AND duration IS NOT NULL AND start_time IS NOT NULL
+            ORDER BY id
+            LIMIT ?
+        '''
+        last_id = 0
+        while True:
+            rows = self.database.execute_query(query, (last_id, self.chunk_size))
+            if not rows:
+                return
+            last_id = rows[-1]['id']
+            self.chunks_read += 1
+            yield {
+                'hour': np.fromiter((row['hour'] for row in rows), np.int64, count=len(rows)),
+                'weekday': np.fromiter((row['weekday'] for row in rows), np.int64, count=len(rows)),
+                'duration': np.fromiter((row['duration'] for row in rows), np.float64, count=len(rows)),
+            }
+
+    def generate(self, percentiles=(50, 75, 90, 99)) -> Dict[str, Any]:
+        """作業パターン・集中時間の統計・集中時間の分布を返す（キーは DataAnalyzer のレポートと同じ）"""
+        overall = RunningStats()
+        digest = TDigest(self.compression)
+        hourly: Dict[int, RunningStats] = {}
+        weekday: Dict[int, RunningStats] = {}
+
+        for chunk in self.iter_chunks():
+            durations = chunk['duration']
+            overall.merge(RunningStats.from_array(durations))
+            digest.add_array(durations)
+            for buckets, keys in ((hourly, chunk['hour']), (weekday, chunk['weekday'])):
+                for key in np.unique(keys):
+                    buckets.setdefault(int(key), RunningStats()).merge(RunningStats.from_array(durations[keys == key]))
+
+        return {
+            'work_patterns': {
+                'hourly_pattern': {key: stats.mean for key, stats in sorted(hourly.items())},
+                'daily_pattern': {key: stats.mean for key, stats in sorted(weekday.items())},
+            },
+            'focus_time_stats': {
+                'total_focus_time': overall.total,
+                'avg_focus_time': overall.mean,
+                'max_focus_time': overall.maximum if overall.count else 0,
+            },
+            'focus_time_distribution': {
+                'count': overall.count,
+                'min_focus_time': overall.minimum if overall.count else 0,
+                'variance': overall.variance,
+                'percentiles': {p: digest.quantile(p / 100) for p in percentiles} if overall.count else {},
+            },
+        }
+
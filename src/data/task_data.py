@@ -5,7 +5,7 @@
 - タスクデータの定義と管理
 
 主な機能:
-- タスクオブジェクトの定義（ID、タイトル、説明、状態、親タスクIDなど）
+- タスクオブジェクトの定義（ID、タイトル、説明、状態、親タスクID、優先度、期限など）
 - タスクデータのシリアライズ/デシリアライズ
 
 使用するクラス/モジュール:
@@ -28,6 +28,8 @@ class Task:
     description: str = ""
     status: str = "未着手"
     parent_id: Optional[int] = None
+    priority: int = 0
+    due_date: Optional[datetime] = None
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
     subtasks: List['Task'] = field(default_factory=list)
@@ -40,6 +42,9 @@ class Task:
     @classmethod
     def from_dict(cls, data):
         subtasks = data.pop('subtasks', [])
+        if isinstance(data.get('due_date'), str):
+            # DBやJSONからは文字列で届くため、期限順の並べ替えに使えるよう datetime に戻す
+            data['due_date'] = datetime.fromisoformat(data['due_date'])
         task = cls(**data)
         task.subtasks = [cls.from_dict(subtask) for subtask in subtasks]
         return task
@@ -50,15 +55,33 @@ class TaskManager:
 
     def create_task(self, task: Task) -> int:
         query = '''
-            INSERT INTO tasks (title, description, status, parent_id, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?)
+            INSERT INTO tasks (title, description, status, parent_id, priority, due_date, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         '''
-        params = (task.title, task.description, task.status, task.parent_id,
+        params = (task.title, task.description, task.status, task.parent_id, task.priority, task.due_date,
                   task.created_at, task.updated_at)
         task_id = self.database.execute_insert(query, params)
         self._add_task_history(task_id, task.status)
         return task_id
 
+    def create_tasks(self, tasks: List[Task]) -> List[int]:
+        """タスクとそのサブタスク（task.subtasks）を1回のトランザクションで登録し、最上位のタスクのIDを返す"""
+        with self.database.transaction() as conn:
+            return [self._insert_task_tree(conn, task, task.parent_id) for task in tasks]
+
+    def _insert_task_tree(self, conn, task: Task, parent_id: Optional[int]) -> int:
+        query = '''
+            INSERT INTO tasks (title, description, status, parent_id, priority, due_date, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        '''
+        cursor = conn.execute(query, (task.title, task.description, task.status, parent_id, task.priority,
+                                      task.due_date, task.created_at, task.updated_at))
+        task_id = cursor.lastrowid
+        conn.execute("INSERT INTO task_history (task_id, status) VALUES (?, ?)", (task_id, task.status))
+        for subtask in task.subtasks:
+            self._insert_task_tree(conn, subtask, task_id)
+        return task_id
+
     def get_task(self, task_id: int) -> Optional[Task]:
         query = "SELECT * FROM tasks WHERE id = ?"
         result = self.database.execute_query(query, (task_id,))
@@ -70,10 +93,10 @@ class TaskManager:
         old_task = self.get_task(task.id)
         query = '''
             UPDATE tasks
-            SET title = ?, description = ?, status = ?, parent_id = ?, updated_at = ?
+            SET title = ?, description = ?, status = ?, parent_id = ?, priority = ?, due_date = ?, updated_at = ?
             WHERE id = ?
         '''
-        params = (task.title, task.description, task.status, task.parent_id,
+        params = (task.title, task.description, task.status, task.parent_id, task.priority, task.due_date,
                   datetime.now(), task.id)
         updated = self.database.execute_update(query, params) > 0
         if updated and old_task and old_task.status != task.status:
@@ -6,12 +6,13 @@ AI会話パネル
 - AIからの提案をタスクリストに追加する機能
 
 主な機能:
-- メッセージの送受信
-- 会話履歴の表示
+- メッセージの送受信（応答はワーカースレッドでストリーミング受信し、届いた分から表示する）
+- 会話履歴の表示（DBの履歴を上端までスクロールしたときにページ単位で読み込む。gui.chat_history_model）
 - 「タスクに追加」ボタンの実装
 
 使用するクラス/モジュール:
 - gui.slide_panel.SlidePanel
+- gui.chat_history_model.ChatHistoryModel, ChatHistoryView
 - core.ai_interface.AIInterface
 - core.task_manager.TaskManager
 - data.ai_conversation.AIConversation
@@ -19,29 +20,43 @@ AI会話パネル
 
 注意点:
 - 長文の応答や処理時間が長い場合の UI のレスポンシブ性に注意
+  （APIとの通信はワーカースレッドで行い、ウィジェットの更新はシグナル経由でGUIスレッドから行う）
 - APIキーが設定されていない場合の適切なエラーハンドリング
 """
 
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QPushButton, QListWidget, QListWidgetItem
+import logging
+import threading
+
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QPushButton
 from PySide6.QtCore import Qt, Signal
 from src.utils.ui_helpers import create_button
-from src.core.ai_interface import AIInterface
+from src.core.ai_interface import AIInterface, AIRequestError, ERROR_RESPONSE
 from src.core.task_manager import TaskManager
+from src.gui.chat_history_model import ChatHistoryModel, ChatHistoryView, MESSAGE_ROLE
 
 class AIChatPanel(QWidget):
     task_added = Signal(str)  # タスクが追加されたときに発行するシグナル
+    # ワーカースレッドからの通知をGUIスレッドへ渡す
+    _chunk_received = Signal(str)
+    _response_finished = Signal(str)  # エラーの場合は表示するメッセージ、成功した場合は空文字
 
     def __init__(self, ai_interface: AIInterface, task_manager: TaskManager):
         super().__init__()
         self.ai_interface = ai_interface
         self.task_manager = task_manager
+        self._response_key = None  # 受信中の応答の行のキー
+        self._response_text = ""
+        self._chunk_received.connect(self._append_response_chunk)
+        self._response_finished.connect(self._finish_response)
         self.setup_ui()
 
     def setup_ui(self):
         layout = QVBoxLayout(self)
 
-        # チャット履歴表示エリア
-        self.chat_history = QListWidget()
+        # チャット履歴表示エリア（行ごとのウィジェットは作らず、モデルとデリゲートで描く）
+        self.history_model = ChatHistoryModel(self.ai_interface.ai_conversation_manager, parent=self)
+        self.chat_history = ChatHistoryView()
+        self.chat_history.setModel(self.history_model)
         layout.addWidget(self.chat_history)
 
         # メッセージ入力エリア
@@ -61,22 +76,54 @@ class AIChatPanel(QWidget):
 
     def send_message(self):
         message = self.message_input.toPlainText().strip()
-        if message:
-            self.add_message_to_history("You", message)
+        if message and self._response_key is None:
+            self.add_message_to_history("user", message)
             self.message_input.clear()
 
-            # AIの応答を取得（非同期で行うべきですが、簡略化のため同期的に実装）
-            response = self.ai_interface.send_message(message)
-            self.add_message_to_history("AI", response)
+            # AIの応答はワーカースレッドで受信し、届いた分から表示する
+            self._response_text = ""
+            self._response_key = self.add_message_to_history("assistant", "")
+            self.send_button.setEnabled(False)
+            threading.Thread(target=self._receive_response, args=(message,), daemon=True).start()
+
+    def _receive_response(self, message):
+        """ワーカースレッドで実行する（ウィジェットには触れないこと）"""
+        error = ERROR_RESPONSE
+        try:
+            for chunk in self.ai_interface.stream_message(message):
+                self._chunk_received.emit(chunk)
+            error = ""
+        except AIRequestError as e:
+            logging.error(f"APIリクエスト中にエラーが発生しました: {e}")
+        except Exception:
+            # 履歴の保存の失敗など、想定外のエラーでも送信ボタンが使えるように戻す
+            logging.exception("AIの応答の受信中に予期しないエラーが発生しました")
+        finally:
+            self._response_finished.emit(error)
+
+    def _append_response_chunk(self, chunk):
+        if self._response_key is None:
+            return
+        self._response_text += chunk
+        # 最下部を表示している場合は、ビューが最下部の表示を保つ
+        self.history_model.update_message(self._response_key, self._response_text)
+
+    def _finish_response(self, error):
+        if self._response_key is not None and error:
+            # 途中まで表示した応答は残し、エラーを付け加える
+            text = f"{self._response_text}\n{error}" if self._response_text else error
+            self.history_model.update_message(self._response_key, text)
+        self._response_key = None
+        self.send_button.setEnabled(True)
 
-    def add_message_to_history(self, sender, message):
-        item = QListWidgetItem(f"{sender}: {message}")
-        self.chat_history.addItem(item)
+    def add_message_to_history(self, role, message):
+        key = self.history_model.append_message(role, message)
         self.chat_history.scrollToBottom()
+        return key
 
     def add_task(self):
-        selected_items = self.chat_history.selectedItems()
-        if selected_items:
-            task_description = selected_items[0].text().split(": ", 1)[1]
+        selected_indexes = self.chat_history.selectionModel().selectedIndexes()
+        if selected_indexes:
+            task_description = selected_indexes[0].data(MESSAGE_ROLE)
             self.task_manager.create_task(task_description)
             self.task_added.emit(task_description)
\ No newline at end of file
@@ -0,0 +1,317 @@
+"""
+AI会話履歴の表示モデル
+
+役割:
+- AI会話パネルの履歴を、ウィジェットを行ごとに作らずに表示する（モデル / デリゲート / ビュー）
+
+主な機能:
+- ChatHistoryModel: DBの会話履歴を、上端までスクロールしたときにページ単位で読み込むリストモデル
+  （canFetchMore / fetchMore。(timestamp, id) によるキーセット方式で、OFFSET を使わない）
+- ChatHistoryModel: 送受信中の発言の追加と、ストリーミング受信中の本文の更新
+- ChatHistoryModel: 読み込んだ行が max_rows を超えた分の、古いページの破棄（trim_oldest）
+- ChatMessageDelegate: 折り返したテキストのレイアウト（QTextLayout）と、読み込んだ行ごとの高さのキャッシュ
+- ChatHistoryView: 上端での古い履歴の読み込み（表示位置を保つ）と、最下部の表示の維持
+- ChatHistoryView: 最下部に戻ったときの古いページの破棄と、破棄した行の高さのキャッシュの削除
+
+使用するクラス/モジュール:
+- data.ai_conversation.AIConversationManager（またはリモート版のプロキシ）
+- PySide6.QtCore.QAbstractListModel
+- PySide6.QtWidgets.QStyledItemDelegate, QListView
+
+注意点:
+- QAbstractItemView は最下部で fetchMore を呼ぶが、チャットでは古い履歴は上端にあるため、
+  ビューが上端を表示している間だけ canFetchMore が True になるようにしている（fetch_enabled）
+- 読み込んだ行は (キー, ロール, 本文, timestamp) のタプルだけを保持する。描画用のレイアウトはデリゲートが件数の上限付きで保持する
+- 行の高さは読み込んだ行の分だけ保持し、行の配置をやり直すたびにレイアウトを作り直さないようにする
+  （行が削除・リセットされたときに、ビューがその行の高さを破棄する）
+- 最下部を表示しているときは、max_rows を超えた古いページを破棄する（上端までスクロールすると読み込み直す）。
+  古い履歴を表示している間は破棄しないため、その間に読み込んだ分だけ一時的に増える
+- DBの発言が削除された場合（保持期間による削除など）は reload() で読み込み直すこと
+- フォントの変更はレイアウトのキャッシュのキーに含まれるため、テーマの変更後に破棄する必要はない
+"""
+
+import logging
+import math
+from collections import OrderedDict
+
+from PySide6.QtCore import QAbstractListModel, QModelIndex, QPointF, QSize, Qt, QTimer
+from PySide6.QtGui import QPalette, QTextLayout, QTextOption
+from PySide6.QtWidgets import (QAbstractItemView, QApplication, QListView, QStyle, QStyledItemDelegate,
+                               QStyleOptionViewItem)
+
+SENDER_LABELS = {'user': 'You', 'assistant': 'AI'}
+MESSAGE_ROLE = int(Qt.ItemDataRole.UserRole) + 1  # 発言の本文
+LAYOUT_KEY_ROLE = int(Qt.ItemDataRole.UserRole) + 2  # 描画結果のキャッシュのキー（発言が変わると変わる）
+ITEM_MARGIN = 6  # 行の上下左右の余白（ピクセル）
+
+
+class ChatHistoryModel(QAbstractListModel):
+    def __init__(self, ai_conversation_manager, page_size: int = 100, max_rows: int = 2000, parent=None):
+        super().__init__(parent)
+        self.ai_conversation_manager = ai_conversation_manager
+        self.page_size = page_size
+        self.max_rows = max_rows  # 最下部を表示しているときに残す行数（これを超えた古いページは破棄する）
+        self.fetch_enabled = True  # ビューが上端を表示している間だけ古い履歴を読み込む
+        # (キー, ロール, 本文, timestamp)（古い順）。キーはDBのIDか、送受信中の発言の負の数（timestamp は None）
+        self._rows = []
+        self._oldest = None  # 読み込んだ最も古い発言の (timestamp, id)
+        self._has_more = True
+        self._next_local_key = -1
+        # 最新のページは最初に読み込む（後から読み込むと、その前に追加して保存済みになった発言と重複する）
+        self.fetchMore()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        key, sender, message, _ = self._rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"{SENDER_LABELS.get(sender, sender)}: {message}"
+        if role == MESSAGE_ROLE:
+            return message
+        if role == LAYOUT_KEY_ROLE:
+            return key, len(message)
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._has_more and self.fetch_enabled
+
+    def fetchMore(self, parent=QModelIndex()):
+        """最も古い行より前の発言を1ページ分読み込み、先頭に追加する"""
+        if parent.isValid() or not self._has_more:
+            return
+        timestamp, message_id = self._oldest if self._oldest is not None else (None, None)
+        try:
+            messages = self.ai_conversation_manager.get_messages_before(timestamp, message_id, limit=self.page_size)
+        except Exception as e:
+            # 読み込みを繰り返し失敗しないよう、reload() されるまで止める
+            logging.error(f"会話履歴の読み込み中にエラーが発生しました: {e}")
+            self._has_more = False
+            return
+        if len(messages) < self.page_size:
+            self._has_more = False
+        if not messages:
+            return
+        self._oldest = (messages[-1].timestamp, messages[-1].id)
+        self.beginInsertRows(QModelIndex(), 0, len(messages) - 1)
+        self._rows[0:0] = [(message.id, message.role, message.message, message.timestamp)
+                           for message in reversed(messages)]
+        self.endInsertRows()
+
+    def trim_oldest(self) -> int:
+        """max_rows を超えた古い行をページ単位で破棄し、破棄した行数を返す（上端までスクロールすると読み込み直す）"""
+        excess = len(self._rows) - self.max_rows
+        if excess <= 0:
+            return 0
+        count = min(math.ceil(excess / self.page_size) * self.page_size, len(self._rows) - 1)
+        oldest_key, _, _, oldest_timestamp = self._rows[count]
+        if oldest_timestamp is None:
+            # 残す先頭の行が未保存の発言の場合は、読み込み直す位置が決まらないため破棄しない
+            return 0
+        self.beginRemoveRows(QModelIndex(), 0, count - 1)
+        del self._rows[:count]
+        self.endRemoveRows()
+        self._oldest = (oldest_timestamp, oldest_key)
+        self._has_more = True
+        return count
+
+    def append_message(self, role: str, message: str) -> int:
+        """末尾に発言を追加し、update_message に渡すキーを返す（DBへの保存は呼び出し側で行う）"""
+        key = self._next_local_key
+        self._next_local_key -= 1
+        row = len(self._rows)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._rows.append((key, role, message, None))
+        self.endInsertRows()
+        return key
+
+    def update_message(self, key: int, message: str):
+        # 追加した発言は末尾にあるため、後ろから探す（古い履歴を読み込むと行番号は変わる）
+        for row in range(len(self._rows) - 1, -1, -1):
+            if self._rows[row][0] == key:
+                self._rows[row] = (key, self._rows[row][1], message, self._rows[row][3])
+                index = self.index(row)
+                self.dataChanged.emit(index, index)
+                return
+
+    def reload(self):
+        """読み込んだ行を破棄し、最新の発言から読み込み直す"""
+        self.beginResetModel()
+        self._rows = []
+        self._oldest = None
+        self._has_more = True
+        self.endResetModel()
+        self.fetchMore()
+
+
+class ChatMessageDelegate(QStyledItemDelegate):
+    def __init__(self, parent=None, max_layouts: int = 500):
+        super().__init__(parent)
+        self.max_layouts = max_layouts
+        self._layouts = OrderedDict()  # (行のキー, 幅, フォント) -> QTextLayout（表示中の行の分）
+        # 行のキー -> ((行のキー, 幅, フォント), 高さ)。配置の計算で全行分を使うため、読み込んだ行の分だけ保持する
+        self._heights = {}
+
+    def sizeHint(self, option, index):
+        width = self._text_width(option)
+        layout_key = index.data(LAYOUT_KEY_ROLE)
+        cache_key = (layout_key, width, option.font.key())
+        cached = self._heights.get(layout_key[0])
+        if cached is not None and cached[0] == cache_key:
+            height = cached[1]
+        else:
+            # 高さだけが必要な行のレイアウトは、描画用のキャッシュに入れない（表示中の行のレイアウトを追い出さない）
+            layout = self._layouts.get(cache_key)
+            if layout is None:
+                layout = self._build_layout(index, option.font, width)
+            height = math.ceil(layout.boundingRect().height())
+            self._heights[layout_key[0]] = (cache_key, height)
+        return QSize(width + ITEM_MARGIN * 2, height + ITEM_MARGIN * 2)
+
+    def forget_rows(self, keys):
+        """モデルから削除された行の高さを破棄する"""
+        for key in keys:
+            self._heights.pop(key, None)
+
+    def clear(self):
+        self._heights.clear()
+        self._layouts.clear()
+
+    def paint(self, painter, option, index):
+        widget = option.widget
+        style = widget.style() if widget is not None else QApplication.style()
+        background = QStyleOptionViewItem(option)
+        self.initStyleOption(background, index)
+        background.text = ""  # 本文は下でレイアウトを使って描く（背景と選択状態だけをスタイルに描かせる）
+        style.drawControl(QStyle.ControlElement.CE_ItemViewItem, background, painter, widget)
+
+        width = self._text_width(option)
+        layout = self._layout((index.data(LAYOUT_KEY_ROLE), width, option.font.key()), index, option.font, width)
+        selected = bool(option.state & QStyle.StateFlag.State_Selected)
+        painter.save()
+        painter.setPen(option.palette.color(QPalette.ColorRole.HighlightedText if selected
+                                            else QPalette.ColorRole.Text))
+        layout.draw(painter, QPointF(option.rect.left() + ITEM_MARGIN, option.rect.top() + ITEM_MARGIN))
+        painter.restore()
+
+    def _text_width(self, option) -> int:
+        widget = option.widget
+        width = widget.viewport().width() if widget is not None else option.rect.width()
+        return max(1, width - ITEM_MARGIN * 2)
+
+    def _layout(self, cache_key, index, font, width) -> QTextLayout:
+        layout = self._layouts.get(cache_key)
+        if layout is not None:
+            self._layouts.move_to_end(cache_key)
+            return layout
+
+        layout = self._build_layout(index, font, width)
+        self._layouts[cache_key] = layout
+        if len(self._layouts) > self.max_layouts:
+            self._layouts.popitem(last=False)
+        return layout
+
+    @staticmethod
+    def _build_layout(index, font, width) -> QTextLayout:
+        # QTextLayout は '\n' で改行しないため、行区切り文字に置き換える
+        layout = QTextLayout((index.data(Qt.ItemDataRole.DisplayRole) or "").replace('\n', '\u2028'), font)
+        text_option = QTextOption()
+        text_option.setWrapMode(QTextOption.WrapMode.WrapAtWordBoundaryOrAnywhere)
+        layout.setTextOption(text_option)
+        layout.beginLayout()
+        y = 0.0
+        while True:
+            line = layout.createLine()
+            if not line.isValid():
+                break
+            line.setLineWidth(width)
+            line.setPosition(QPointF(0, y))
+            y += line.height()
+        layout.endLayout()
+        return layout
+
+
+class ChatHistoryView(QListView):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.message_delegate = ChatMessageDelegate(self)
+        self.setItemDelegate(self.message_delegate)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.setResizeMode(QListView.ResizeMode.Adjust)  # 幅が変わったら折り返しを計算し直す
+        # 行の配置を少しずつ計算し、読み込んだ行が多くてもGUIを止めない
+        self.setLayoutMode(QListView.LayoutMode.Batched)
+        self.setBatchSize(200)
+        self._stick_to_bottom = True  # 最下部を表示している間は、行が増えても最下部を表示し続ける
+        self._anchor = None  # 古い履歴を読み込んだときの、下端からの距離（表示位置を保つ）
+        self._adjusting = False
+        self.verticalScrollBar().rangeChanged.connect(self._on_range_changed)
+
+    def setModel(self, model):
+        previous = self.model()
+        if previous is not None:
+            previous.rowsAboutToBeRemoved.disconnect(self._forget_rows)
+            previous.modelReset.disconnect(self.message_delegate.clear)
+        super().setModel(model)
+        self.message_delegate.clear()
+        if model is not None:
+            model.rowsAboutToBeRemoved.connect(self._forget_rows)
+            model.modelReset.connect(self.message_delegate.clear)
+        self._update_fetch_gate()
+
+    def scrollToBottom(self):
+        self._stick_to_bottom = True
+        self._anchor = None
+        super().scrollToBottom()
+        self._schedule_trim()
+
+    def _forget_rows(self, parent, first, last):
+        model = self.model()
+        self.message_delegate.forget_rows(model.index(row).data(LAYOUT_KEY_ROLE)[0] for row in range(first, last + 1))
+
+    def _schedule_trim(self):
+        # 行の配置の途中で行を削除しないよう、イベントループに戻ってから破棄する
+        if isinstance(self.model(), ChatHistoryModel):
+            QTimer.singleShot(0, self._trim_model)
+
+    def _trim_model(self):
+        model = self.model()
+        # 古い履歴を表示している間は破棄しない（最下部を表示していれば、破棄する行は画面の外にある）
+        if isinstance(model, ChatHistoryModel) and self._stick_to_bottom:
+            model.trim_oldest()
+
+    def verticalScrollbarValueChanged(self, value):
+        # 既定の処理（最下部に達したら fetchMore を呼ぶ）は使わず、上端に達したときに古い履歴を読み込む
+        bar = self.verticalScrollBar()
+        if not self._adjusting:
+            was_at_bottom = self._stick_to_bottom
+            self._stick_to_bottom = value >= bar.maximum()
+            self._anchor = None
+            if self._stick_to_bottom and not was_at_bottom:
+                self._schedule_trim()
+        self._update_fetch_gate()
+        model = self.model()
+        if value <= bar.minimum() < bar.maximum() and model is not None and model.canFetchMore(QModelIndex()):
+            self._anchor = bar.maximum() - value
+            model.fetchMore(QModelIndex())
+
+    def _on_range_changed(self, minimum, maximum):
+        bar = self.verticalScrollBar()
+        self._adjusting = True
+        try:
+            if self._stick_to_bottom:
+                bar.setValue(maximum)
+            elif self._anchor is not None:
+                bar.setValue(maximum - self._anchor)
+        finally:
+            self._adjusting = False
+        self._update_fetch_gate()
+
+    def _update_fetch_gate(self):
+        model = self.model()
+        if isinstance(model, ChatHistoryModel):
+            # 全体が表示に収まる場合も上端を表示しているとみなし、表示が埋まるまで読み込ませる
+            bar = self.verticalScrollBar()
+            model.fetch_enabled = bar.value() <= bar.minimum()
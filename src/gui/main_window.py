@@ -38,7 +38,6 @@ from src.gui.slide_panel import SlidePanel
 from src.gui.task_panel import TaskPanel
 from src.gui.ai_chat_panel import AIChatPanel
 from src.gui.settings_dialog import SettingsDialog
-from src.gui.report_window import ReportWindow
 from src.utils.ui_helpers import create_button, load_stylesheet
 
 class MainWindow(QMainWindow):
@@ -96,6 +95,8 @@ class MainWindow(QMainWindow):
             pass
 
     def show_report_window(self):
+        # レポート画面（QtCharts・分析モジュール）はアプリの起動を遅くしないよう、開くときに読み込む
+        from src.gui.report_window import ReportWindow
         report_window = ReportWindow(self.session_manager, self.task_manager, self)
         report_window.show()
 
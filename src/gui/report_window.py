@@ -15,14 +15,44 @@
 
 注意点:
 - 大量のデータを扱う場合のパフォーマンスに注意
+  （週別・月別レポートの指標は QThreadPool のワーカーで計算し、できあがったらシグナル経由でGUIスレッドからタブを作る。
+  計算中にウィンドウを閉じた場合は、結果を捨てる）
 - グラフ描画にはmatplotlibやPyQtChartを使用し、見やすい視覚化を心がけること
 """
 
+import logging
+
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QTabWidget, QLabel
 from PySide6.QtCharts import QChart, QChartView, QBarSeries, QBarSet, QValueAxis, QBarCategoryAxis
 from PySide6.QtGui import QPainter
 from src.data.data_analyzer import DataAnalyzer
-from PySide6.QtCore import Qt
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Qt, Signal
+
+
+class _PeriodReportSignals(QObject):
+    # ワーカーからの通知をGUIスレッドへ渡す（計算に失敗した場合は None）
+    finished = Signal(object)
+
+
+class _PeriodReportTask(QRunnable):
+    """週別・月別レポートの指標を QThreadPool のスレッドで計算する（ウィジェットには触れないこと）"""
+
+    def __init__(self, data_analyzer: DataAnalyzer):
+        super().__init__()
+        self.data_analyzer = data_analyzer
+        # シグナルを持つオブジェクトはGUIスレッドで作り、受け取り側への通知をキュー経由にする
+        self.signals = _PeriodReportSignals()
+        self.cancelled = False
+
+    def run(self):
+        report = None
+        try:
+            report = self.data_analyzer.generate_period_report()
+        except Exception:
+            logging.exception("週別・月別レポートの集計中にエラーが発生しました")
+        if not self.cancelled:
+            self.signals.finished.emit(report)
+
 
 class ReportWindow(QWidget):
     def __init__(self, data_analyzer: DataAnalyzer):
@@ -35,12 +65,42 @@ class ReportWindow(QWidget):
         self.setWindowTitle("生産性レポート")
         self.setMinimumSize(800, 600)
 
-        tab_widget = QTabWidget()
-        tab_widget.addTab(self.create_daily_report(), "日別レポート")
-        tab_widget.addTab(self.create_weekly_report(), "週別レポート")
-        tab_widget.addTab(self.create_monthly_report(), "月別レポート")
-
-        layout.addWidget(tab_widget)
+        self.period_report = None
+        self.tab_widget = QTabWidget()
+        self.tab_widget.addTab(self.create_daily_report(), "日別レポート")
+        self.tab_widget.addTab(QLabel("集計中..."), "週別レポート")
+        self.tab_widget.addTab(QLabel("集計中..."), "月別レポート")
+
+        layout.addWidget(self.tab_widget)
+
+        # 週別・月別レポートの指標は時間がかかるため、ウィンドウを表示してからワーカーで計算する
+        self._report_task = _PeriodReportTask(self.data_analyzer)
+        self._report_task.signals.finished.connect(self._show_period_report)
+        QThreadPool.globalInstance().start(self._report_task)
+
+    def closeEvent(self, event):
+        # 計算中のワーカーは止められないため、閉じたウィンドウに結果を渡さないようにする
+        if self._report_task is not None:
+            self._report_task.cancelled = True
+            self._report_task.signals.finished.disconnect(self._show_period_report)
+            self._report_task = None
+        super().closeEvent(event)
+
+    def _show_period_report(self, report):
+        if self._report_task is None:
+            # 閉じる前にキューに入っていた通知は使わない
+            return
+        self._report_task = None
+        self.period_report = report
+        current = self.tab_widget.currentIndex()
+        tabs = ((1, "週別レポート", self.create_weekly_report), (2, "月別レポート", self.create_monthly_report))
+        for index, title, create_report in tabs:
+            widget = create_report() if report is not None else QLabel("レポートを集計できませんでした")
+            placeholder = self.tab_widget.widget(index)
+            self.tab_widget.removeTab(index)
+            self.tab_widget.insertTab(index, widget, title)
+            placeholder.deleteLater()
+        self.tab_widget.setCurrentIndex(current)
 
     def create_daily_report(self):
         widget = QWidget()
@@ -64,12 +124,38 @@ class ReportWindow(QWidget):
         return widget
 
     def create_weekly_report(self):
-        # 週別レポートの実装（日別レポートと同様の構造）
-        pass
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+
+        # 週別の作業時間グラフ
+        chart = self.create_bar_chart("週別作業時間", self.period_report['weekly_work_time'])
+        chart_view = QChartView(chart)
+        chart_view.setRenderHint(QPainter.Antialiasing)
+        layout.addWidget(chart_view)
+
+        # 連続日数
+        streaks = self.period_report['focus_streaks']
+        layout.addWidget(QLabel(f"連続作業日数: {streaks['current_streak']}日（最長 {streaks['longest_streak']}日）"))
+
+        return widget
 
     def create_monthly_report(self):
-        # 月別レポートの実装（日別レポートと同様の構造）
-        pass
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+
+        # 月別の作業時間グラフ
+        chart = self.create_bar_chart("月別作業時間", self.period_report['monthly_work_time'])
+        chart_view = QChartView(chart)
+        chart_view.setRenderHint(QPainter.Antialiasing)
+        layout.addWidget(chart_view)
+
+        # タスク完了率と集中時間の分布
+        layout.addWidget(QLabel(f"タスク完了率: {self.period_report['task_completion_rate']:.2f}%"))
+        percentiles = self.period_report['focus_time_distribution']['percentiles']
+        if percentiles:
+            layout.addWidget(QLabel(f"集中時間の中央値: {percentiles[50] / 60:.2f}分"))
+
+        return widget
 
     def create_bar_chart(self, title, data):
         chart = QChart()
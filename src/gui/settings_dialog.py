@@ -12,6 +12,7 @@
 
 使用するクラス/モジュール:
 - utils.config.Config
+- utils.secret_store.SecretStore
 - utils.ui_helpers
 
 注意点:
@@ -21,6 +22,7 @@
 
 from PySide6.QtWidgets import QDialog, QVBoxLayout, QFormLayout, QSpinBox, QCheckBox, QComboBox, QLineEdit, QPushButton
 from src.utils.config import config
+from src.utils.secret_store import secret_store
 from src.utils.ui_helpers import create_button
 
 class SettingsDialog(QDialog):
@@ -66,7 +68,7 @@ class SettingsDialog(QDialog):
 
         # APIキー設定
         self.api_key_input = QLineEdit()
-        self.api_key_input.setText(self.config.get('openai_api_key', ''))
+        self.api_key_input.setText(secret_store.get_secret(self.config, 'openai_api_key') or '')
         self.api_key_input.setEchoMode(QLineEdit.Password)
         form_layout.addRow("OpenAI APIキー:", self.api_key_input)
 
@@ -86,7 +88,8 @@ class SettingsDialog(QDialog):
         self.config.set('long_break', self.long_break_spinbox.value() * 60)
         self.config.set('notifications_enabled', self.notification_checkbox.isChecked())
         self.config.set('theme', new_theme)
-        self.config.set('openai_api_key', self.api_key_input.text())
+        # APIキーは平文では保存せず、暗号化して encrypted_openai_api_key に保存する
+        secret_store.set_secret(self.config, 'openai_api_key', self.api_key_input.text())
         
         self.config.save()
 
@@ -13,6 +13,10 @@
 使用するクラス/モジュール:
 - core.timer.Timer
 - utils.ui_helpers
+
+注意点:
+- タイマーの通知はタイマースレッドやasyncioループのスレッドから届くため、
+  シグナルを経由してGUIスレッドで表示を更新すること
 """
 
 from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel
@@ -23,13 +27,15 @@ from src.core.timer import TimerType
 
 class TimerWidget(QWidget):
     timer_updated = Signal(str, str, int)  # 状態, タイマータイプ, 残り時間
+    _timer_changed = Signal(object, object, int)  # 別スレッドからの通知をGUIスレッドへ渡す
 
     def __init__(self, timer):
         super().__init__()
         self.timer = timer
         self.progress = 0
         self.setup_ui()
-        self.timer.add_observer(self.update_timer)
+        self._timer_changed.connect(self.update_timer)
+        self.timer.add_observer(self._timer_changed.emit)
         self.setFixedSize(200, 200)  # ウィジェットのサイズを固定
 
     def setup_ui(self):
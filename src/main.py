@@ -14,22 +14,33 @@
 - core.ai_interface.AIInterface
 - data.database.Database
 - utils.config.Config
+- core.ipc_client（--connect 指定時）
+- core.async_runtime.AsyncRuntime（--event-loop asyncio 指定時）
+- data.conversation_retention.ConversationRetention（ai_retention_days 設定時）
 
 注意点:
 - アプリケーション全体の設定（Config）を最初に読み込み、各モジュールに渡すこと
 - 例外処理を適切に行い、予期せぬエラーでアプリケーションが終了しないようにすること
+- --connect を指定した場合は、ヘッドレスデーモン（src/daemon.py）のクライアントとして動作し、
+  タイマー・セッション・タスクはデーモン側のものを共有する
+- asyncioモードではイベントループを1本のバックグラウンドスレッドで動かし、
+  GUIへの反映はQtのシグナル（キュー接続）で行う
+- 起動を速くするため、pandas / matplotlib / requests やレポート画面は起動時に読み込まず、
+  使うときに読み込むこと（benchmarks/bench_startup.py で起動時間を計測する）
 """
 
+import time
+_started = time.perf_counter()
+
 import sys
 import os
+import argparse
 import traceback
 # プロジェクトのルートディレクトリをパスに追加
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
-import matplotlib
-matplotlib.use('QtAgg')
-
+from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QApplication
 from src.gui.main_window import MainWindow
 from src.core.timer import Timer
@@ -42,7 +53,20 @@ from src.core.notification_manager import NotificationManager
 from src.data.ai_conversation import AIConversationManager  # この行を修正
 from src.utils.ui_helpers import load_stylesheet
 
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Pomodoro AI Assistant")
+    parser.add_argument('--connect', nargs='?', const='', default=None, metavar='ADDRESS',
+                        help="ヘッドレスデーモンに接続する（アドレス省略時は既定のアドレス）")
+    parser.add_argument('--event-loop', choices=['threads', 'asyncio'], default=None,
+                        help="コアのイベントループ方式（省略時は設定の event_loop）")
+    parser.add_argument('--startup-probe', action='store_true',
+                        help="最初の描画までの時間を表示して終了する（起動時間の計測用）")
+    # Qt固有の引数はQApplicationに任せる
+    args, _ = parser.parse_known_args(argv)
+    return args
+
 def main():
+    args = parse_args(sys.argv[1:])
     app = QApplication(sys.argv)
 
     # 設定の初期化
@@ -60,22 +84,60 @@ def main():
     else:
         print(f"警告: {theme}モードのスタイルシートが空です。")
 
-    # データベースの初期化
-    db = Database(config)
-    db.initialize()
+    if args.connect is not None:
+        # デーモンのクライアントとして動作する（DB接続はデーモン側の1本を共有）
+        from src.core.ipc_protocol import default_address
+        from src.core.ipc_client import (IPCClient, RemoteTimer, RemoteSessionManager,
+                                         RemoteTaskManager, RemoteAIConversationManager)
+        client = IPCClient(args.connect or default_address(config)).connect()
+        timer = RemoteTimer(client, config)
+        session_manager = RemoteSessionManager(client)
+        task_manager = RemoteTaskManager(client)
+        ai_conversation_manager = RemoteAIConversationManager(client)
+    else:
+        # asyncioモードでは、タイマー・通知・DB書き込みを1つのイベントループで扱う
+        runtime = None
+        if (args.event_loop or config.get('event_loop', 'threads')) == 'asyncio':
+            from src.core.async_runtime import AsyncRuntime
+            runtime = AsyncRuntime()
+            runtime.start()
+            app.aboutToQuit.connect(runtime.stop)
 
-    # 各コアモジュールの初期化
-    notification_manager = NotificationManager(config)
-    timer = Timer(config, notification_manager)
-    session_manager = SessionManager(db, config)
-    task_manager = TaskManager(db, config)
-    ai_conversation_manager = AIConversationManager(db)
+        # データベースの初期化
+        db = Database(config)
+        db.initialize()
+
+        # 各コアモジュールの初期化
+        notification_manager = NotificationManager(config, runtime)
+        timer = Timer(config, notification_manager, runtime)
+        session_manager = SessionManager(db, config, runtime)
+        task_manager = TaskManager(db, config)
+        ai_conversation_manager = AIConversationManager(db)
     ai_interface = AIInterface(config, ai_conversation_manager)
+    if args.connect is not None:
+        # デーモンが保持期間を過ぎた会話を削除したら、削除済みの発言をAPIに送らないよう読み込み直す
+        ai_conversation_manager.on_deleted(ai_interface.context.invalidate)
+
+    # 保持期間を過ぎた会話をバックグラウンドで少しずつ削除する（デーモンに接続する場合はデーモン側で行う）
+    if args.connect is None and config.get('ai_retention_days'):
+        from src.data.conversation_retention import ConversationRetention
+        retention = ConversationRetention(db, config.get('ai_retention_days'),
+                                          archive_dir=config.get('ai_retention_archive_dir'),
+                                          on_deleted=ai_interface.context.invalidate)
+        retention.start(config.get('ai_retention_interval_hours', 24))
+        app.aboutToQuit.connect(retention.stop)
 
     # メインウィンドウの作成と表示
     main_window = MainWindow(timer, session_manager, task_manager, ai_interface, config)
     main_window.show()
 
+    if args.startup_probe:
+        # show() のあとにイベントループが最初に空いた時点を、最初の描画とみなす
+        def report_first_paint():
+            print(f"first_paint_ms={(time.perf_counter() - _started) * 1000:.1f}", flush=True)
+            app.quit()
+        QTimer.singleShot(0, report_first_paint)
+
     # アプリケーションの実行
     sys.exit(app.exec())
 
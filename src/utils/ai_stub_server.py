@@ -0,0 +1,199 @@
+"""
+OpenAI互換APIのローカルスタブサーバー
+
+役割:
+- chat completions のエンドポイントを真似た応答を返し、実際のAPIを使わずに AIInterface や AIChatPanel を動かす
+  （テスト、ベンチマーク、オフラインでの動作確認に使う）
+
+主な機能:
+- 通常の応答と、stream: true のSSE（チャンク転送）による応答
+- 応答までの遅延（固定値とジッター）と、ストリーミングの断片の間隔の設定
+- エラーの注入（一定の割合で 429 / 5xx を返す、ストリーミングの途中で接続を切る）
+- 順番に返す応答（状態コード, ヘッダー, 遅延）の指定と、受け取ったリクエストの記録
+- コマンドラインからの起動（python -m src.utils.ai_stub_server --port 8000 --latency-ms 300）
+
+使用するクラス/モジュール:
+- http.server.ThreadingHTTPServer
+
+注意点:
+- 接続の使い回しを確かめられるよう、HTTP/1.1 の keep-alive で応答する
+  （TCP_NODELAY を設定し、スタブ自体の遅れが計測に入らないようにする）
+- アプリから使う場合は、設定 ai_api_url を url の値にすること（APIキーは確認しない）
+- エラーの注入は seed を指定すると再現できる
+- ローカルでの確認用のため、127.0.0.1 以外では待ち受けないこと
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+CHAT_COMPLETIONS_PATH = '/v1/chat/completions'
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # ヘッダーと本文を別に書き込むため、Nagle を止めないと遅延ACKと重なって1回ごとに約40ms遅れる
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        server = self.server
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        server.client_ports.append(self.client_address[1])
+        server.requests.append(request)
+
+        status, headers, delay = server.next_response()
+        if delay:
+            time.sleep(delay)
+        if status == 200 and request.get('stream'):
+            self._send_stream(request)
+            return
+        if status == 200:
+            body = json.dumps(server.completion(request), ensure_ascii=False).encode()
+        else:
+            body = json.dumps({'error': {'message': f"injected error {status}", 'type': 'stub_error'}}).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, request):
+        server = self.server
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        events = [{'choices': [{'index': 0, 'delta': {'role': 'assistant'}}]}]
+        events += [{'choices': [{'index': 0, 'delta': {'content': text}}]} for text in server.stream_chunks]
+        lines = [f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode() for event in events]
+        lines.append(b"data: [DONE]\n\n")
+        abort_at = len(lines) // 2 if server.should_abort_stream() else None
+        for i, line in enumerate(lines):
+            if i == abort_at:
+                # 終端のチャンクを送らずに接続を切る（受信途中の切断を再現する）
+                self.close_connection = True
+                return
+            if i > 1:
+                time.sleep(server.stream_interval)
+            self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubChatServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, content: str = 'ok', stream_chunks: Optional[List[str]] = None,
+                 latency: float = 0.0, latency_jitter: float = 0.0, stream_interval: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 503, retry_after: Optional[float] = None,
+                 stream_abort_rate: float = 0.0, seed: Optional[int] = None):
+        super().__init__(('127.0.0.1', port), _StubHandler)
+        self.content = content
+        self.stream_chunks = stream_chunks if stream_chunks is not None else ['こん', 'にちは', '!']
+        self.latency = latency  # 応答を返すまでの秒数
+        self.latency_jitter = latency_jitter  # latency に加える 0〜この秒数の乱数
+        self.stream_interval = stream_interval  # ストリーミングの断片の間隔（秒）
+        self.error_rate = error_rate  # エラーを返す割合（0〜1）
+        self.error_status = error_status
+        self.retry_after = retry_after  # エラーに付ける Retry-After（秒）
+        self.stream_abort_rate = stream_abort_rate  # ストリーミングの途中で接続を切る割合（0〜1）
+        self.responses: List[Tuple[int, Dict[str, str], float]] = []  # 先に返す応答（指定がなくなると通常の動作）
+        self.requests: List[Dict] = []
+        self.client_ports: List[int] = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{CHAT_COMPLETIONS_PATH}"
+
+    def start(self) -> 'StubChatServer':
+        self._thread = threading.Thread(target=self.serve_forever, name='ai-stub-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def handle_error(self, request, client_address):
+        # クライアントが使い回していた接続を閉じた場合などは、エラーとして表示しない
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+    def next_response(self) -> Tuple[int, Dict[str, str], float]:
+        """次に返す (状態コード, ヘッダー, 遅延) を決める"""
+        with self._lock:
+            if self.responses:
+                return self.responses.pop(0)
+            delay = self.latency + (self._random.uniform(0, self.latency_jitter) if self.latency_jitter else 0)
+            if self.error_rate and self._random.random() < self.error_rate:
+                headers = {'Retry-After': str(self.retry_after)} if self.retry_after is not None else {}
+                return self.error_status, headers, delay
+            return 200, {}, delay
+
+    def should_abort_stream(self) -> bool:
+        with self._lock:
+            return bool(self.stream_abort_rate) and self._random.random() < self.stream_abort_rate
+
+    def completion(self, request: Dict) -> Dict:
+        prompt_chars = sum(len(message.get('content') or '') for message in request.get('messages', []))
+        return {
+            'id': f"chatcmpl-stub-{len(self.requests)}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'stub'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': self.content},
+                         'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_chars // 4, 'completion_tokens': len(self.content) // 4},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI互換APIのローカルスタブサーバー")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--content', default='ok', help="通常の応答の本文")
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--stream-interval-ms', type=float, default=50)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--stream-abort-rate', type=float, default=0)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    server = StubChatServer(args.port, content=args.content, latency=args.latency_ms / 1000,
+                            latency_jitter=args.jitter_ms / 1000, stream_interval=args.stream_interval_ms / 1000,
+                            error_rate=args.error_rate, error_status=args.error_status,
+                            stream_abort_rate=args.stream_abort_rate, seed=args.seed)
+    print(f"スタブサーバーを起動しました: {server.url}（設定 ai_api_url に指定してください）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,14 +5,16 @@
 - アプリケーション全体の設定を一元管理
 
 主な機能:
-- 設定値の取得と設定
+- 設定値の取得と設定（複数の値をまとめて設定して1回で保存する update を含む）
 - 設定変更の通知（Observer パターンの実装）
+- 暗号化キーの更新（設定ファイルのキーと、設定に保存した機密情報のキー）
 
 注意点:
 - スレッドセーフな実装を心がけること
 - 設定変更時は関連するモジュールに適切に通知すること
+- SettingsManager はプロセスで1つだけ作り、保存のたびに暗号化キーのファイルを読み直さないこと
 """
-from typing import Any, Callable
+from typing import Any, Callable, Dict
 import threading
 from cryptography.fernet import Fernet
 
@@ -30,6 +32,7 @@ class Config:
     def _initialize(self):
         self._settings = {}
         self._observers = {}
+        self._settings_manager = None
 
     def get(self, key: str, default: Any = None) -> Any:
         return self._settings.get(key, default)
@@ -39,6 +42,16 @@ class Config:
         self.save()  # 設定を変更したら即座に保存
         self._notify_observers(key, value)
 
+    def items(self):
+        return list(self._settings.items())
+
+    def update(self, values: Dict[str, Any]):
+        """複数の値をまとめて設定し、1回で保存する"""
+        self._settings.update(values)
+        self.save()
+        for key, value in values.items():
+            self._notify_observers(key, value)
+
     def register_observer(self, key: str, callback: Callable[[str, Any], None]):
         if key not in self._observers:
             self._observers[key] = set()
@@ -53,17 +66,28 @@ class Config:
             for callback in self._observers[key]:
                 callback(key, value)
 
+    def _get_settings_manager(self):
+        if self._settings_manager is None:
+            from src.data.settings_manager import SettingsManager
+            self._settings_manager = SettingsManager()
+        return self._settings_manager
+
     def load(self):
         """設定をファイルから読み込む"""
-        from src.data.settings_manager import SettingsManager
-        settings_manager = SettingsManager()
-        self._settings = settings_manager.load()
+        from src.utils.secret_store import secret_store
+        self._settings = self._get_settings_manager().load()
+        secret_store.invalidate()  # 読み込み前の設定で復号した値を使わない
 
     def save(self):
         """現在の設定をファイルに保存する"""
-        from src.data.settings_manager import SettingsManager
-        settings_manager = SettingsManager()
-        settings_manager.save(self._settings)
+        self._get_settings_manager().save(self._settings)
+
+    def rotate_encryption_keys(self) -> int:
+        """設定に保存した機密情報のキーと、設定ファイルのキーを新しくする（再暗号化した機密情報の件数を返す）"""
+        from src.utils.secret_store import secret_store
+        rotated = secret_store.rotate(self)
+        self._get_settings_manager().rotate_encryption_key(self._settings)
+        return rotated
 
     DEFAULT_CONFIG = {
         'encryption_key': Fernet.generate_key().decode(),
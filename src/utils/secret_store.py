@@ -0,0 +1,135 @@
+"""
+機密情報の保管
+
+役割:
+- 暗号化して保存したAPIキーなどを、プロセス内で一度だけ復号して保持する
+- 暗号化キーの読み込みと Fernet の生成を、プロセス全体で使い回す
+
+主な機能:
+- 設定の encrypted_<名前> に保存した機密情報の取得（復号結果のキャッシュ）と保存
+- 暗号化キーのファイルの読み込み（パスごとに1回）と、キーごとの Fernet のキャッシュ
+- 暗号化キーの更新と、保存済みの機密情報の再暗号化（rotate）
+- キャッシュの明示的な破棄（invalidate）
+
+使用するクラス/モジュール:
+- cryptography.fernet
+- utils.config.Config
+
+注意点:
+- 復号結果のキャッシュは、設定の暗号文とキーが変わっていないことを確認してから返す
+  （設定が変わった場合は次の取得で復号し直す）
+- 復号した値はメモリ上にのみ保持し、ログなどに出力しないこと
+- 暗号化キーのファイルを外部で書き換えた場合は invalidate() を呼ぶこと
+"""
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from cryptography.fernet import Fernet
+
+ENCRYPTED_PREFIX = 'encrypted_'
+
+
+class SecretStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fernets: Dict[bytes, Fernet] = {}
+        self._key_files: Dict[str, bytes] = {}
+        self._secrets: Dict[str, Tuple[str, str, str]] = {}  # 名前 -> (暗号文, キー, 平文)
+        self.decryptions = 0  # 実際に復号した回数
+
+    def fernet(self, key) -> Fernet:
+        key = key.encode() if isinstance(key, str) else key
+        with self._lock:
+            fernet = self._fernets.get(key)
+            if fernet is None:
+                fernet = self._fernets[key] = Fernet(key)
+            return fernet
+
+    def file_key(self, path: str) -> bytes:
+        """暗号化キーのファイルを読み込む（ない場合は作成する）"""
+        path = os.path.abspath(path)
+        with self._lock:
+            key = self._key_files.get(path)
+            if key is None:
+                if os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        key = f.read()
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    key = Fernet.generate_key()
+                    with open(path, 'wb') as f:
+                        f.write(key)
+                self._key_files[path] = key
+            return key
+
+    def set_file_key(self, path: str, key: bytes):
+        """暗号化キーのファイルを書き換えたことを記録する"""
+        with self._lock:
+            self._key_files[os.path.abspath(path)] = key
+
+    def config_key(self, config) -> str:
+        """設定に保存した機密情報用の暗号化キー（ない場合は作成して保存する）"""
+        key = config.get('encryption_key')
+        if key is None:
+            key = Fernet.generate_key().decode()
+            config.set('encryption_key', key)
+        return key
+
+    def get_secret(self, config, name: str) -> Optional[str]:
+        """設定の encrypted_<name> を復号して返す（2回目以降はキャッシュから返す）"""
+        encrypted = config.get(ENCRYPTED_PREFIX + name)
+        if not encrypted:
+            return None
+        key = self.config_key(config)
+        cached = self._secrets.get(name)
+        if cached is not None and cached[0] == encrypted and cached[1] == key:
+            return cached[2]
+
+        value = self.fernet(key).decrypt(encrypted.encode()).decode()
+        with self._lock:
+            self.decryptions += 1
+            self._secrets[name] = (encrypted, key, value)
+        return value
+
+    def set_secret(self, config, name: str, value: str):
+        """value を暗号化して設定の encrypted_<name> に保存する（空の場合は削除する）"""
+        if not value:
+            self.invalidate(name)
+            config.set(ENCRYPTED_PREFIX + name, None)
+            return
+        key = self.config_key(config)
+        encrypted = self.fernet(key).encrypt(value.encode()).decode()
+        with self._lock:
+            self._secrets[name] = (encrypted, key, value)
+        config.set(ENCRYPTED_PREFIX + name, encrypted)
+
+    def invalidate(self, name: Optional[str] = None):
+        """復号結果のキャッシュを破棄する（name を省略した場合は、キーのファイルの読み込み結果も破棄する）"""
+        with self._lock:
+            if name is not None:
+                self._secrets.pop(name, None)
+                return
+            self._secrets.clear()
+            self._key_files.clear()
+
+    def rotate(self, config) -> int:
+        """設定の暗号化キーを新しくし、encrypted_ で始まる値をすべて再暗号化する（再暗号化した件数を返す）"""
+        old_fernet = self.fernet(self.config_key(config))
+        new_key = Fernet.generate_key().decode()
+        new_fernet = self.fernet(new_key)
+
+        updates = {'encryption_key': new_key}
+        for name, encrypted in list(config.items()):
+            if name.startswith(ENCRYPTED_PREFIX) and encrypted:
+                value = old_fernet.decrypt(encrypted.encode())
+                updates[name] = new_fernet.encrypt(value).decode()
+                with self._lock:
+                    self._secrets[name[len(ENCRYPTED_PREFIX):]] = (updates[name], new_key, value.decode())
+        # キーと再暗号化した値を1回で保存する（途中の状態を保存しない）
+        config.update(updates)
+        return len(updates) - 1
+
+
+secret_store = SecretStore()
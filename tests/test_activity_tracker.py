@@ -0,0 +1,252 @@
+"""
+アプリケーション使用状況追跡のユニットテスト
+
+役割:
+- イベント駆動のアクティビティ追跡が正しく使用時間を記録することを確認
+
+主な内容:
+- 再生用バックエンドによる前面ウィンドウ変更の時間バケットごとの集計
+- 書き出し時・停止時の使用中アプリの記録
+- 集計テーブルの更新と、生産性スコアの計算
+- セッションとアプリ使用時間の突き合わせ
+- PIDからプロセス名へのキャッシュ
+
+使用するクラス/モジュール:
+- unittest
+
+注意点:
+- OSのAPIには依存せず、ReplayActivityBackendで変更イベントを与えること
+- テストごとに一時ディレクトリのDBを使い、終了後に削除すること
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from src.core.activity_backends import ProcessNameCache, ReplayActivityBackend, X11ActivityBackend
+from src.core.activity_tracker import ActivityTracker, attribute_intervals
+from src.data.database import Database
+
+
+class TestActivityTracker(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config = {'database_path': os.path.join(self.temp_dir, 'test.db')}
+        self.database = Database(self.config)
+        self.database.initialize()
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _usage(self):
+        rows = self.database.execute_query("SELECT app_name, duration, timestamp FROM app_usage ORDER BY id")
+        return [(row['app_name'], row['duration'], row['timestamp']) for row in rows]
+
+    def test_switches_are_aggregated_per_bucket(self):
+        backend = ReplayActivityBackend([
+            (1020.0, "code.exe"),
+            (1020.0, "code.exe"),
+            (1050.0, "chrome.exe"),
+            (1060.0, "code.exe"),
+            (1110.0, "chrome.exe"),
+            (1115.0, "code.exe"),
+        ])
+        tracker = ActivityTracker(self.database, self.config, backend=backend)
+        tracker.start_tracking()
+        # 書き出しまではDBに書き込まない
+        self.assertEqual(self._usage(), [])
+
+        with patch('src.core.activity_tracker.time.time', return_value=1130.0):
+            tracker.stop_tracking()
+        self.assertEqual(self._usage(), [
+            ("chrome.exe", 10.0, 1020.0),
+            ("code.exe", 50.0, 1020.0),
+            ("chrome.exe", 5.0, 1080.0),
+            ("code.exe", 45.0, 1080.0),
+        ])
+
+    def test_flush_includes_current_app(self):
+        tracker = ActivityTracker(self.database, self.config, backend=ReplayActivityBackend([(1080.0, "code.exe")]))
+        tracker.start_tracking()
+        self.assertEqual(tracker.flush(now=1110.0), 1)
+        self.assertEqual(tracker.flush(now=1130.0), 1)
+        self.assertEqual(self._usage(), [("code.exe", 30.0, 1080.0), ("code.exe", 20.0, 1080.0)])
+        with patch('src.core.activity_tracker.time.time', return_value=1130.0):
+            tracker.stop_tracking()
+
+
+class TestProductivityScore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config = {'database_path': os.path.join(self.temp_dir, 'test.db'), 'productive_apps': ["code.exe"]}
+        self.database = Database(self.config)
+        self.database.initialize()
+        self.tracker = ActivityTracker(self.database, self.config, backend=ReplayActivityBackend())
+        self.tracker.sync_productive_apps()
+        # 7200〜10800秒の1時間と、その前後の端数
+        self.samples = [
+            ("code.exe", 60.0, 7140.0),
+            ("chrome.exe", 60.0, 7200.0),
+            ("code.exe", 60.0, 7260.0),
+            ("code.exe", 30.0, 9000.0),
+            ("chrome.exe", 60.0, 10800.0),
+        ]
+        self.database.execute_many("INSERT INTO app_usage (app_name, duration, timestamp) VALUES (?, ?, ?)",
+                                   self.samples)
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _expected(self, start, end):
+        in_window = [sample for sample in self.samples if start <= sample[2] < end]
+        total = sum(sample[1] for sample in in_window)
+        productive = sum(sample[1] for sample in in_window if sample[0] == "code.exe")
+        return productive / total * 100 if total else 0
+
+    def test_rollups_are_maintained_by_trigger(self):
+        rows = self.database.execute_query(
+            "SELECT app_name, duration FROM app_usage_hourly WHERE hour_start = 7200 ORDER BY app_name")
+        self.assertEqual([(row['app_name'], row['duration']) for row in rows],
+                         [("chrome.exe", 60.0), ("code.exe", 90.0)])
+
+    def test_score_matches_raw_samples(self):
+        for start, end in [(7000, 11000), (7200, 10800), (7250, 9100), (0, 20000)]:
+            self.assertAlmostEqual(self.tracker.get_productivity_score(start, end), self._expected(start, end))
+
+    def test_migration_backfills_rollups(self):
+        self.database.execute_update("DELETE FROM app_usage_hourly")
+        self.database.run_migrations()
+        self.assertAlmostEqual(self.tracker.get_productivity_score(7200, 10800), self._expected(7200, 10800))
+
+
+class TestSessionAttribution(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config = {'database_path': os.path.join(self.temp_dir, 'test.db'), 'productive_apps': ["code.exe"]}
+        self.database = Database(self.config)
+        self.database.initialize()
+        self.tracker = ActivityTracker(self.database, self.config, backend=ReplayActivityBackend())
+        self.tracker.sync_productive_apps()
+        self.base = datetime(2024, 1, 1, 9, 0).timestamp()
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _add_session(self, start, end, task_id):
+        self.database.execute_insert("INSERT OR IGNORE INTO tasks (id, title) VALUES (?, ?)", (task_id, f"タスク{task_id}"))
+        return self.database.execute_insert(
+            "INSERT INTO sessions (start_time, end_time, duration, task_id) VALUES (?, ?, ?, ?)",
+            (datetime.fromtimestamp(self.base + start), datetime.fromtimestamp(self.base + end), end - start, task_id))
+
+    def test_sweep_line_overlaps(self):
+        sessions = [(1, 0, 100), (2, 90, 200)]
+        samples = [("a", 0, 60), ("b", 60, 120), ("a", 120, 180), ("a", 300, 360)]
+        self.assertEqual(attribute_intervals(sessions, samples),
+                         {(1, "a"): 60, (1, "b"): 40, (2, "b"): 30, (2, "a"): 60})
+
+    def test_sessions_are_materialized_once(self):
+        first = self._add_session(0, 1500, task_id=1)
+        second = self._add_session(1800, 3300, task_id=2)
+        self.database.execute_many("INSERT INTO app_usage (app_name, duration, timestamp) VALUES (?, ?, ?)", [
+            ("code.exe", 60.0, self.base + 1440),
+            ("chrome.exe", 60.0, self.base + 1500),
+            ("chrome.exe", 30.0, self.base + 1800),
+            ("code.exe", 30.0, self.base + 1830),
+        ])
+        self.assertEqual(self.tracker.attribute_sessions(), 2)
+        self.assertEqual(self.tracker.attribute_sessions(), 0)
+
+        usage = self.tracker.get_session_app_usage(first)
+        self.assertEqual([(row['app_name'], row['duration'], row['category']) for row in usage],
+                         [("code.exe", 60.0, 'productive')])
+        self.assertAlmostEqual(self.tracker.get_session_productivity_score(second), 50)
+        report = {row['task_id']: row for row in self.tracker.get_task_distraction_report()}
+        self.assertEqual(report[2]['distracted_time'], 30.0)
+        self.assertEqual(report[1]['distracted_time'], 0)
+
+        # セッションを削除すると、突き合わせ結果も削除される
+        self.database.execute_update("DELETE FROM sessions WHERE id = ?", (first,))
+        self.assertEqual(self.database.execute_query("SELECT COUNT(*) AS n FROM session_app_usage")[0]['n'], 2)
+
+
+    def _record(self, events, stop):
+        tracker = ActivityTracker(self.database, self.config,
+                                  backend=ReplayActivityBackend([(self.base + at, app) for at, app in events]))
+        tracker.start_tracking()
+        with patch('src.core.activity_tracker.time.time', return_value=self.base + stop):
+            tracker.stop_tracking()
+        return tracker
+
+    def _session_usage(self, session_id):
+        return {row['app_name']: row['duration'] for row in self.tracker.get_session_app_usage(session_id)}
+
+    def test_session_boundary_inside_bucket(self):
+        # 1分のバケットの途中でセッションが切り替わる
+        first = self._add_session(0, 30, task_id=1)
+        second = self._add_session(30, 60, task_id=2)
+        self._record([(0, "code.exe"), (30, "chrome.exe")], stop=60)
+
+        self.assertEqual(self.tracker.attribute_sessions(), 2)
+        self.assertEqual(self._session_usage(first), {"code.exe": 30.0})
+        self.assertEqual(self._session_usage(second), {"chrome.exe": 30.0})
+
+    def test_alternating_apps_do_not_exceed_session(self):
+        # code.exe の区間（0〜60秒）と chrome.exe の区間（10〜20秒）は重なる
+        session = self._add_session(0, 20, task_id=1)
+        self._record([(0, "code.exe"), (10, "chrome.exe"), (20, "code.exe")], stop=60)
+
+        self.tracker.attribute_sessions()
+        usage = self._session_usage(session)
+        self.assertAlmostEqual(sum(usage.values()), 20.0)
+        self.assertGreater(usage["code.exe"], usage["chrome.exe"])
+
+
+class TestProcessNameCache(unittest.TestCase):
+    def test_lookup_is_cached(self):
+        cache = ProcessNameCache(maxsize=2)
+        name = cache.get(os.getpid())
+        self.assertEqual(cache.get(os.getpid()), name)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_reused_pid_is_looked_up_again(self):
+        cache = ProcessNameCache()
+        with patch('psutil.Process') as process:
+            process.return_value.name.return_value = "old.exe"
+            self.assertEqual(cache.get(1234, created=1), "old.exe")
+            # 同じPIDでも作成時刻が違えば別のプロセスとして引き直す
+            process.return_value.name.return_value = "new.exe"
+            self.assertEqual(cache.get(1234, created=2), "new.exe")
+            self.assertEqual(cache.get(1234, created=2), "new.exe")
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+        cache.invalidate(1234)
+        self.assertEqual(len(cache._names), 0)
+
+    def test_x11_reused_pid_is_looked_up_again(self):
+        backend = X11ActivityBackend()
+        backend._pid_by_window['0x1'] = 1234
+        with patch('psutil.Process') as process, \
+                patch.object(X11ActivityBackend, '_process_created', side_effect=[100, 100, 200]):
+            process.return_value.name.return_value = "old"
+            self.assertEqual(backend._app_name('0x1'), "old")
+            self.assertEqual(backend._app_name('0x1'), "old")
+            # 同じウィンドウのPIDが、開始時刻の違う別のプロセスに再利用された
+            process.return_value.name.return_value = "new"
+            self.assertEqual(backend._app_name('0x1'), "new")
+        self.assertEqual((backend.name_cache.hits, backend.name_cache.misses), (1, 2))
+
+    @unittest.skipUnless(os.path.exists('/proc/self/stat'), "/proc がない環境")
+    def test_process_start_time_from_proc(self):
+        created = X11ActivityBackend._process_created(os.getpid())
+        self.assertIsInstance(created, int)
+        self.assertEqual(X11ActivityBackend._process_created(os.getpid()), created)
+
+
+if __name__ == '__main__':
+    unittest.main()
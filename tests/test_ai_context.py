@@ -0,0 +1,106 @@
+"""
+AIに送る会話コンテキストの組み立てのユニットテスト
+
+役割:
+- 会話の履歴がトークン数の予算内で組み立てられ、古い発言が要約に移ることを確認
+
+主な内容:
+- トークン数の見積もり
+- 予算内の直近の発言と要約の組み立て、要約のDBへの保存と再起動後の読み込み
+- 2回目以降は新しいメッセージだけを読み込むこと
+
+使用するクラス/モジュール:
+- unittest
+
+注意点:
+- テストごとに一時ディレクトリのDBを使い、終了後に削除すること
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.core.ai_context import ConversationContext, estimate_tokens
+from src.data.ai_conversation import AIConversationManager
+from src.data.database import Database
+
+
+class TestConversationContext(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.database = Database({'database_path': os.path.join(self.temp_dir, 'test.db')})
+        self.database.initialize()
+        self.manager = AIConversationManager(self.database)
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _add_turns(self, count, text='x' * 40):
+        for i in range(count):
+            self.manager.add_message(f"質問{i} {text}", 'user')
+            self.manager.add_message(f"答え{i} {text}", 'assistant')
+
+    def _tokens(self, messages):
+        return sum(estimate_tokens(m['content']) + 4 for m in messages)
+
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens(''), 0)
+        self.assertEqual(estimate_tokens('abcdefgh'), 2)
+        self.assertEqual(estimate_tokens('こんにちは'), 5)
+        self.assertEqual(estimate_tokens('ab漢字'), 3)
+
+    def test_recent_turns_fit_in_budget(self):
+        self._add_turns(2)
+        context = ConversationContext(self.manager, max_tokens=1000, summary_tokens=100, message_tokens=50)
+        messages = context.build("次の質問")
+        self.assertEqual([m['role'] for m in messages], ['user', 'assistant'] * 2 + ['user'])
+        self.assertEqual(messages[-1]['content'], "次の質問")
+        self.assertIsNone(self.manager.get_summary())
+
+    def test_old_turns_are_summarized(self):
+        self._add_turns(20)
+        context = ConversationContext(self.manager, max_tokens=300, summary_tokens=80, message_tokens=50)
+        messages = context.build("次の質問")
+        self.assertLessEqual(self._tokens(messages), 300)
+        self.assertEqual(messages[0]['role'], 'system')
+        self.assertIn("答え", messages[0]['content'])
+        self.assertTrue(messages[-2]['content'].startswith("答え19"))
+
+        saved = self.manager.get_summary()
+        self.assertEqual(saved['summary'], messages[0]['content'].split('\n', 1)[1])
+
+        # 再起動後は保存した要約と、要約に含めていない発言だけを読み込む
+        restarted = ConversationContext(self.manager, max_tokens=300, summary_tokens=80, message_tokens=50)
+        self.assertEqual(restarted.build("次の質問"), messages)
+
+    def test_only_new_messages_are_loaded(self):
+        self._add_turns(3)
+        context = ConversationContext(self.manager, max_tokens=2000)
+        context.build("a")
+
+        loaded = []
+        get_messages_after = self.manager.get_messages_after
+
+        def counting_get_messages_after(message_id):
+            results = get_messages_after(message_id)
+            loaded.extend(results)
+            return results
+
+        self.manager.get_messages_after = counting_get_messages_after
+        self._add_turns(1, 'new')
+        messages = context.build("b")
+        self.assertEqual(len(loaded), 2)
+        self.assertEqual(len(messages), 9)
+
+    def test_long_message_skips_oldest_turns(self):
+        self._add_turns(3)
+        context = ConversationContext(self.manager, max_tokens=200, summary_tokens=50, message_tokens=20)
+        messages = context.build('y' * 400)
+        self.assertLessEqual(self._tokens(messages), 200)
+        self.assertEqual(messages[-1]['content'], 'y' * 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,212 @@
+"""
+AI会話履歴の管理のユニットテスト
+
+役割:
+- 会話の全文検索が関連度順に、抜粋付きで、ページ分割して返されることを確認
+
+主な内容:
+- FTS5の索引による検索、抜粋、ページ分割（すべての一致に届くこと）
+- 削除・更新したメッセージが索引から外れること
+- 索引の追加前に保存されていた会話の登録（移行）
+- 3文字未満の語での検索（LIKEによる検索）
+- 会話履歴のキーセット方式のページ取得
+- 保持期間を過ぎた会話の分割削除と、圧縮JSONLへの書き出し
+
+使用するクラス/モジュール:
+- unittest
+
+注意点:
+- テストごとに一時ディレクトリのDBを使い、終了後に削除すること
+"""
+
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from src.data.ai_conversation import AIConversationManager
+from src.data.conversation_retention import ConversationRetention
+from src.data.database import Database
+
+
+class TestConversationSearch(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.database = Database({'database_path': os.path.join(self.temp_dir, 'test.db')})
+        self.database.initialize()
+        self.manager = AIConversationManager(self.database)
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_ranked_search_with_snippets(self):
+        self.manager.add_message("ポモドーロの時間を調整する方法を教えてください", 'user')
+        self.manager.add_message("ポモドーロ、ポモドーロ、ポモドーロの繰り返し", 'assistant')
+        self.manager.add_message("休憩の取り方について", 'user')
+
+        results = self.manager.search_conversations("ポモドーロ")
+        self.assertEqual([r.id for r in results], [2, 1])
+        self.assertIn("[ポモドーロ]", results[1].snippet)
+
+        self.assertEqual([r.id for r in self.manager.search_conversations("ポモドーロ 時間")], [1])
+        self.assertEqual(self.manager.search_conversations("存在しない語"), [])
+        self.assertEqual(self.manager.search_conversations('"ポモ'), [])
+
+    def test_pagination(self):
+        for i in range(5):
+            self.manager.add_message(f"メッセージ {i} の本文", 'user')
+        first = self.manager.search_conversations("メッセージ", limit=2)
+        second = self.manager.search_conversations("メッセージ", limit=2, offset=2)
+        rest = self.manager.search_conversations("メッセージ", limit=2, offset=4)
+        self.assertEqual(len({r.id for r in first + second + rest}), 5)
+
+    def test_all_matches_are_reachable(self):
+        self.database.execute_many("INSERT INTO ai_conversations (message, role, timestamp) VALUES (?, ?, ?)",
+                                   [(f"ポモドーロ {i}", 'user', datetime(2024, 1, 1) + timedelta(minutes=i))
+                                    for i in range(2100)])
+        found = set()
+        for offset in range(0, 2100, 500):
+            found.update(r.id for r in self.manager.search_conversations("ポモドーロ", limit=500, offset=offset))
+        self.assertEqual(len(found), 2100)
+        self.assertEqual(len(self.manager.search_conversations("ポモドーロ", limit=100, offset=2050)), 50)
+
+        # 件数を指定した場合は、新しい順にその件数までの一致だけが対象になる
+        capped = self.manager.search_conversations("ポモドーロ", limit=500, max_candidates=100)
+        self.assertEqual(len(capped), 100)
+        self.assertEqual(min(r.id for r in capped), 2001)
+
+    def test_index_follows_updates_and_deletes(self):
+        message_id = self.manager.add_message("古い内容のメッセージ", 'user')
+        self.database.execute_update("UPDATE ai_conversations SET message = ? WHERE id = ?", ("新しい内容", message_id))
+        self.assertEqual(self.manager.search_conversations("古い内容"), [])
+        self.assertEqual(len(self.manager.search_conversations("新しい内容")), 1)
+
+        self.database.execute_update("DELETE FROM ai_conversations WHERE id = ?", (message_id,))
+        self.assertEqual(self.manager.search_conversations("新しい内容"), [])
+
+    def test_existing_messages_are_indexed_by_migration(self):
+        self.manager.add_message("索引の追加前の会話", 'user')
+        self.database.execute_update("INSERT INTO ai_conversations_fts (ai_conversations_fts) VALUES ('delete-all')")
+        self.assertEqual(self.manager.search_conversations("追加前"), [])
+
+        self.database.run_migrations()
+        self.assertEqual(len(self.manager.search_conversations("追加前")), 1)
+
+    def test_short_keyword_falls_back_to_like(self):
+        self.manager.add_message("AIに質問する 100%", 'user')
+        results = self.manager.search_conversations("AI")
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].snippet, "[AI]に質問する 100%")
+        self.assertEqual(len(self.manager.search_conversations("0%")), 1)
+        self.assertEqual(self.manager.search_conversations("_"), [])
+
+
+class TestConversationPaging(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.database = Database({'database_path': os.path.join(self.temp_dir, 'test.db')})
+        self.database.initialize()
+        self.manager = AIConversationManager(self.database)
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_keyset_pages_cover_history_once(self):
+        base = datetime(2024, 6, 1, 12, 0)
+        # 同じ timestamp の発言と、IDの順序と timestamp の順序が入れ替わった発言を含める
+        timestamps = [base, base, base + timedelta(minutes=5), base - timedelta(minutes=5), base,
+                      base + timedelta(minutes=1), base + timedelta(minutes=1)]
+        self.database.execute_many("INSERT INTO ai_conversations (message, role, timestamp) VALUES (?, ?, ?)",
+                                   [(f"発言 {i}", 'user', ts) for i, ts in enumerate(timestamps)])
+        expected = [row['id'] for row in self.database.execute_query(
+            "SELECT id FROM ai_conversations ORDER BY timestamp DESC, id DESC")]
+
+        pages = []
+        page = self.manager.get_messages_before(limit=3)
+        while page:
+            pages.append([message.id for message in page])
+            page = self.manager.get_messages_before(page[-1].timestamp, page[-1].id, limit=3)
+        self.assertEqual([len(ids) for ids in pages], [3, 3, 1])
+        self.assertEqual([message_id for ids in pages for message_id in ids], expected)
+
+        # datetime で指定しても保存時の文字列と同じ位置になる
+        before = self.manager.get_messages_before(base, 5, limit=10)
+        self.assertEqual([message.id for message in before], [2, 1, 4])
+
+
+class TestConversationRetention(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.database = Database({'database_path': os.path.join(self.temp_dir, 'test.db')})
+        self.database.initialize()
+        self.manager = AIConversationManager(self.database)
+        self.now = datetime(2024, 6, 1, 12, 0)
+        rows = [(f"古い会話 {i}", 'user', self.now - timedelta(days=60, minutes=-i)) for i in range(100)]
+        rows.append(("途中に挟まった新しい会話", 'user', self.now - timedelta(days=1)))
+        rows += [(f"古い会話 {i}", 'user', self.now - timedelta(days=40, minutes=-i)) for i in range(100, 150)]
+        rows += [(f"新しい会話 {i}", 'assistant', self.now - timedelta(days=5, minutes=-i)) for i in range(20)]
+        self.database.execute_many("INSERT INTO ai_conversations (message, role, timestamp) VALUES (?, ?, ?)", rows)
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_deletes_in_chunks_and_archives(self):
+        archive_dir = os.path.join(self.temp_dir, 'archive')
+        retention = ConversationRetention(self.database, days=30, archive_dir=archive_dir, pause=0)
+        retention.chunk_size = 50
+        progress = []
+        result = retention.run_once(lambda deleted, fraction: progress.append((deleted, fraction)), now=self.now)
+
+        self.assertEqual((result.deleted, result.archived), (150, 150))
+        self.assertGreater(result.chunks, 1)
+        self.assertEqual(progress[-1], (150, 1.0))
+        self.assertEqual([fraction for _, fraction in progress], sorted(fraction for _, fraction in progress))
+
+        remaining = self.database.execute_query("SELECT message FROM ai_conversations ORDER BY id")
+        self.assertEqual(len(remaining), 21)
+        self.assertEqual(remaining[0]['message'], "途中に挟まった新しい会話")
+        self.assertEqual(self.manager.search_conversations("古い会話"), [])
+
+        with gzip.open(result.archive_path, 'rt', encoding='utf-8') as f:
+            archived = [json.loads(line) for line in f]
+        self.assertEqual(archived[0]['message'], "古い会話 0")
+        self.assertEqual(len(archived), 150)
+
+        self.assertEqual(retention.run_once(now=self.now).deleted, 0)
+
+    def test_notifies_after_deleting(self):
+        deleted = []
+        retention = ConversationRetention(self.database, days=30, pause=0,
+                                          on_deleted=lambda: deleted.append(True))
+        retention.chunk_size = 50
+        retention.run_once(now=self.now)
+        self.assertEqual(deleted, [True])
+
+        # 削除する行がなかった場合は通知しない
+        retention.run_once(now=self.now)
+        self.assertEqual(deleted, [True])
+
+    def test_clear_old_conversations(self):
+        self.assertEqual(self.manager.clear_old_conversations(0), 171)
+        self.assertEqual(self.manager.get_conversation_stats()['total_messages'], 0)
+
+    def test_background_schedule(self):
+        retention = ConversationRetention(self.database, days=0, pause=0)
+        retention.start(interval_hours=1)
+        for _ in range(100):
+            if self.manager.get_conversation_stats()['total_messages'] == 0:
+                break
+            time.sleep(0.01)
+        retention.stop()
+        self.assertEqual(self.manager.get_conversation_stats()['total_messages'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,4 +17,294 @@
 - テストカバレッジを高めること
 - テストの独立性を保つこと（テスト間の依存を避ける）
 - テストデータはテストケースごとに適切に準備し、テスト実行後はクリーンアップすること
-"""
\ No newline at end of file
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import Mock
+
+from cryptography.fernet import Fernet
+
+from src.core.ai_interface import (AIInterface, AIRequestError, CircuitBreaker, ERROR_RESPONSE, RateLimiter,
+                                   ResponseCache)
+from src.core.task_manager import TaskManager
+from src.data.ai_conversation import ConversationMessage
+from src.data.database import Database
+from src.utils.ai_stub_server import StubChatServer
+
+
+class TestAIInterface(unittest.TestCase):
+    def setUp(self):
+        self.server = StubChatServer().start()
+
+        self.temp_dir = tempfile.mkdtemp()
+        key = Fernet.generate_key()
+        self.config = {
+            'encryption_key': key.decode(),
+            'encrypted_openai_api_key': Fernet(key).encrypt(b'test-key').decode(),
+            'ai_api_url': self.server.url,
+            'ai_read_timeout': 0.5,
+            'ai_max_retries': 2,
+            'ai_circuit_failure_threshold': 2,
+            'ai_cache_path': os.path.join(self.temp_dir, 'ai_cache.db'),
+        }
+        self.conversations = Mock()
+        self.conversations.get_summary.return_value = None
+        self.conversations.get_messages_after.return_value = []
+        self.ai = AIInterface(self.config, self.conversations)
+        self.delays = []
+        self.ai._sleep = self.delays.append
+
+    def tearDown(self):
+        self.ai.close()
+        self.server.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_session_is_reused(self):
+        self.assertEqual(self.ai.send_message("a"), 'ok')
+        self.assertEqual(self.ai.send_message("b"), 'ok')
+        self.assertEqual(len(set(self.server.client_ports)), 1)
+        self.assertEqual(self.conversations.add_message.call_count, 4)
+        metrics = self.ai.get_metrics()
+        self.assertEqual((metrics['calls'], metrics['succeeded'], metrics['retries']), (2, 2, 0))
+        self.assertIn('latency_p95_ms', metrics)
+
+    def test_conversation_context_is_sent(self):
+        self.conversations.get_messages_after.return_value = [
+            ConversationMessage(1, '前の質問', 'user'), ConversationMessage(2, '前の答え', 'assistant')]
+        self.ai.send_message("次の質問")
+        self.assertEqual([m['content'] for m in self.server.requests[-1]['messages']], ['前の質問', '前の答え', '次の質問'])
+        self.conversations.get_messages_after.assert_called_with(0)
+
+        # 定型の問い合わせには会話を付けない
+        self.ai.get_productivity_tips()
+        self.assertEqual(len(self.server.requests[-1]['messages']), 1)
+
+    def test_retry_after_is_honored(self):
+        self.server.responses = [(429, {'Retry-After': '3'}, 0), (503, {}, 0)]
+        self.assertEqual(self.ai.send_message("a"), 'ok')
+        self.assertEqual(self.delays[0], 3.0)
+        self.assertLessEqual(self.delays[1], self.ai.backoff_base * 2)
+        self.assertEqual(self.ai.get_metrics()['retries'], 2)
+
+    def test_client_error_is_not_retried(self):
+        self.server.responses = [(401, {}, 0)]
+        self.assertEqual(self.ai.send_message("a"), ERROR_RESPONSE)
+        self.assertEqual(len(self.server.client_ports), 1)
+        self.assertEqual(self.ai.circuit_breaker.failures, 0)
+
+    def test_timeout_and_circuit_breaker(self):
+        self.server.responses = [(200, {}, 1.0)] * 3 + [(503, {}, 0)] * 3
+        self.assertEqual(self.ai.send_message("a"), ERROR_RESPONSE)
+        self.assertEqual(self.ai.send_message("b"), ERROR_RESPONSE)
+        self.assertEqual(self.ai.get_metrics()['circuit_state'], 'open')
+
+        # 開いている間はサーバーに送信しない
+        sent = len(self.server.client_ports)
+        self.assertEqual(self.ai.send_message("c"), ERROR_RESPONSE)
+        self.assertEqual(len(self.server.client_ports), sent)
+        self.assertEqual(self.ai.get_metrics()['rejected'], 1)
+
+    def test_stream_message(self):
+        self.server.responses = [(503, {'Retry-After': '0'}, 0)]
+        self.assertEqual(list(self.ai.stream_message("a")), ['こん', 'にちは', '!'])
+        self.conversations.add_message.assert_called_with('こんにちは!', 'assistant')
+        self.assertEqual(self.ai.get_metrics()['retries'], 1)
+
+    def test_stream_yields_before_response_completes(self):
+        self.server.stream_interval = 0.3
+        started = time.perf_counter()
+        stream = self.ai.stream_message("a")
+        self.assertEqual(next(stream), 'こん')
+        self.assertLess(time.perf_counter() - started, 0.25)
+        self.assertEqual(''.join(stream), 'にちは!')
+
+    def test_stream_failure(self):
+        self.server.responses = [(503, {}, 0)] * 3
+        with self.assertRaises(AIRequestError):
+            list(self.ai.stream_message("a"))
+        self.conversations.add_message.assert_not_called()
+
+    def test_stream_disconnect_is_reported(self):
+        self.server.stream_abort_rate = 1.0
+        with self.assertRaises(AIRequestError):
+            list(self.ai.stream_message("a"))
+        self.conversations.add_message.assert_not_called()
+
+    def test_injected_errors_are_retried(self):
+        self.server.error_rate = 1.0
+        self.server.retry_after = 0
+        self.assertEqual(self.ai.send_message("a"), ERROR_RESPONSE)
+        self.assertEqual(len(self.server.client_ports), 3)
+        self.assertEqual(self.delays, [0.0, 0.0])
+
+        self.server.error_rate = 0
+        self.server.responses = []
+        self.ai.circuit_breaker.record_success()
+        self.assertEqual(self.ai.send_message("b"), 'ok')
+
+    def test_client_error_closes_half_open_circuit(self):
+        now = [0.0]
+        self.ai.circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        self.server.responses = [(503, {}, 0)] * 3 + [(401, {}, 0)]
+        self.assertEqual(self.ai.send_message("a"), ERROR_RESPONSE)
+        self.assertEqual(self.ai.circuit_breaker.state, 'open')
+
+        now[0] = 10
+        self.assertEqual(self.ai.send_message("b"), ERROR_RESPONSE)  # 401 でもAPIは応答している
+        self.assertEqual(self.ai.circuit_breaker.state, 'closed')
+
+    def test_invalid_url_fails_without_retry(self):
+        ai = AIInterface(dict(self.config, ai_api_url='localhost:9999/v1/chat'), self.conversations)
+        ai._sleep = self.delays.append
+        self.assertEqual(ai.send_message("a"), ERROR_RESPONSE)
+        metrics = ai.get_metrics()
+        self.assertEqual((metrics['failed'], metrics['retries']), (1, 0))
+        self.assertEqual(self.delays, [])
+        ai.close()
+
+    def test_missing_api_key(self):
+        ai = AIInterface({'encryption_key': self.config['encryption_key'], 'ai_api_url': self.server.url,
+                          'ai_cache_path': ''}, self.conversations)
+        self.assertEqual(ai.send_message("a"), ERROR_RESPONSE)
+        self.assertEqual(self.server.client_ports, [])
+        ai.close()
+
+    def test_helper_responses_are_cached(self):
+        self.assertEqual(self.ai.get_productivity_tips(), 'ok')
+        self.assertEqual(self.ai.get_productivity_tips(), 'ok')
+        self.assertEqual(len(self.server.client_ports), 1)
+        self.assertEqual(self.conversations.add_message.call_count, 2)
+
+        # 再起動後もファイルのキャッシュを使う
+        ai = AIInterface(self.config, self.conversations)
+        self.assertEqual(ai.get_productivity_tips(), 'ok')
+        self.assertEqual(len(self.server.client_ports), 1)
+        self.assertEqual(ai.get_metrics()['cache_disk_hits'], 1)
+        ai.close()
+
+        # 呼び出しごとにキャッシュを使わないこともできる
+        self.ai.get_productivity_tips(use_cache=False)
+        self.assertEqual(len(self.server.client_ports), 2)
+        self.assertEqual(self.ai.get_metrics()['cache_hits'], 1)
+
+    def test_errors_are_not_cached(self):
+        self.server.responses = [(401, {}, 0)]
+        self.assertEqual(self.ai.get_productivity_tips(), ERROR_RESPONSE)
+        self.assertEqual(self.ai.get_productivity_tips(), 'ok')
+
+    def test_analyze_tasks_batch_runs_concurrently(self):
+        self.server.content = json.dumps([{'title': 'a'}])
+        self.server.responses = [(200, {}, 0.2)] * 16
+        started = time.perf_counter()
+        results = self.ai.analyze_tasks_batch([f"タスク{i}" for i in range(16)], max_workers=8)
+        self.assertLess(time.perf_counter() - started, 1.6)  # 順番に送ると3.2秒
+        self.assertEqual(results, [[{'title': 'a'}]] * 16)
+        self.conversations.add_message.assert_not_called()
+
+    def test_decompose_backlog(self):
+        self.server.content = json.dumps({'subtasks': [{'title': '調べる', 'description': '資料'}, '書く']})
+        database = Database({'database_path': os.path.join(self.temp_dir, 'test.db')})
+        database.initialize()
+        task_manager = TaskManager(database, self.config)
+        try:
+            ids = self.ai.decompose_backlog(["報告書を作る\n来週まで", "会議の準備"], task_manager)
+            roots = task_manager.get_task_tree()
+            self.assertEqual([task.id for task in roots], ids)
+            self.assertEqual((roots[0].title, roots[0].description), ("報告書を作る", "来週まで"))
+            self.assertEqual([(t.title, t.description) for t in roots[1].subtasks], [('調べる', '資料'), ('書く', '')])
+            self.assertEqual(len(task_manager.get_task_history(roots[0].subtasks[0].id)), 1)
+        finally:
+            database.close()
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_requests_are_spaced(self):
+        now = [0.0]
+        waits = []
+        limiter = RateLimiter(120, clock=lambda: now[0], sleep=waits.append)
+        for _ in range(3):
+            limiter.acquire()
+        self.assertEqual(waits, [0.5, 1.0])
+
+        now[0] = 10
+        limiter.acquire()
+        self.assertEqual(len(waits), 2)
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.now = [1000.0]
+        self.cache = ResponseCache(os.path.join(self.temp_dir, 'cache.db'), max_entries=2, max_disk_entries=3,
+                                   ttl=60, clock=lambda: self.now[0])
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_key_depends_on_model_messages_and_params(self):
+        messages = [{'role': 'user', 'content': 'a'}]
+        key = ResponseCache.make_key('m', messages)
+        self.assertEqual(key, ResponseCache.make_key('m', [{'content': 'a', 'role': 'user'}]))
+        self.assertNotEqual(key, ResponseCache.make_key('other', messages))
+        self.assertNotEqual(key, ResponseCache.make_key('m', messages, {'temperature': 0}))
+
+    def test_ttl(self):
+        self.cache.put('a', 'A')
+        self.now[0] += 59
+        self.assertEqual(self.cache.get('a'), 'A')
+        self.now[0] += 1
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_size_eviction(self):
+        for key in 'abcd':
+            self.now[0] += 1
+            self.cache.put(key, key.upper())
+        self.assertEqual(list(self.cache._entries), ['c', 'd'])
+
+        # メモリから外れた分はファイルから読み、ファイルの上限を超えた最も古い分は削除されている
+        self.assertEqual(self.cache.get('b'), 'B')
+        self.assertEqual(self.cache.disk_hits, 1)
+        self.assertIsNone(self.cache.get('a'))
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_half_open_after_reset_timeout(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        now[0] = 10
+        self.assertEqual(breaker.state, 'half_open')
+        breaker.record_failure()  # 試しの呼び出しが失敗すると開き直す
+        self.assertFalse(breaker.allow())
+
+        now[0] = 20
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_half_open_admits_one_probe(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        breaker.record_failure()
+        now[0] = 10
+        self.assertEqual([breaker.allow() for _ in range(3)], [True, False, False])
+        breaker.record_failure()  # 試しの呼び出しが失敗すると開き直す
+        self.assertEqual(breaker.state, 'open')
+
+        now[0] = 20
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual([breaker.allow() for _ in range(3)], [True, True, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
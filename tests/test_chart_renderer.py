@@ -0,0 +1,94 @@
+"""
+レポート用グラフの描画とキャッシュのユニットテスト
+
+役割:
+- グラフが画面を使わずに画像データとして描画され、ディスクにキャッシュされることを確認
+
+主な内容:
+- PNG / SVG の描画
+- 同じグラフの2回目以降がキャッシュから返されること、データが変わると描画し直すこと
+- 件数上限を超えたときに最も古いキャッシュが削除されること
+- ワーカースレッドでの描画
+
+使用するクラス/モジュール:
+- unittest
+
+注意点:
+- テストごとに一時ディレクトリのDBとキャッシュを使い、終了後に削除すること
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from src.data.chart_renderer import ChartRenderer
+from src.data.data_analyzer import DataAnalyzer
+from src.data.database import Database
+
+
+class TestChartRenderer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.database = Database({'database_path': os.path.join(self.temp_dir, 'test.db')})
+        self.database.initialize()
+        start = datetime(2024, 1, 1, 9, 0)
+        self.database.execute_many("INSERT INTO sessions (start_time, end_time, duration) VALUES (?, ?, ?)",
+                                   [(start + timedelta(hours=i * 7), start + timedelta(hours=i * 7, minutes=25), 1500)
+                                    for i in range(20)])
+        self.analyzer = DataAnalyzer(self.database)
+        self.cache_dir = os.path.join(self.temp_dir, 'chart_cache')
+        self.renderer = ChartRenderer(self.analyzer, cache_dir=self.cache_dir, max_entries=2)
+
+    def tearDown(self):
+        self.renderer.shutdown()
+        self.database.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_formats(self):
+        self.assertTrue(self.renderer.render('work_patterns').startswith(b'\x89PNG'))
+        self.assertIn(b'<svg', self.renderer.render('hour_weekday_heatmap', 'svg'))
+        with self.assertRaises(ValueError):
+            self.renderer.render('unknown')
+
+    def test_cache_hits_and_data_version(self):
+        first = self.renderer.render('daily_work_time', days=3)
+        self.assertEqual(self.renderer.render('daily_work_time', days=3), first)
+        self.assertEqual((self.renderer.renders, self.renderer.hits), (1, 1))
+
+        # 別のインスタンス（再起動後）でもディスクのキャッシュを使う
+        renderer = ChartRenderer(self.analyzer, cache_dir=self.cache_dir)
+        renderer.render('daily_work_time', days=3)
+        self.assertEqual((renderer.renders, renderer.hits), (0, 1))
+
+        self.database.execute_insert("INSERT INTO sessions (start_time, duration) VALUES (?, ?)",
+                                     (datetime(2024, 2, 1, 9, 0), 600))
+        self.renderer.render('daily_work_time', days=3)
+        self.assertEqual(self.renderer.renders, 2)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.renderer.render('weekly_work_time')
+        self.renderer.render('monthly_work_time')
+        self.renderer.render('weekly_work_time')
+        self.renderer.render('daily_work_time')
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+        self.renderer.render('weekly_work_time')
+        self.assertEqual(self.renderer.hits, 2)
+        self.renderer.render('monthly_work_time')
+        self.assertEqual(self.renderer.renders, 4)
+
+    def test_render_async(self):
+        future = self.renderer.render_async('work_patterns', 'svg')
+        self.assertIn(b'<svg', future.result(timeout=30))
+
+    def test_plot_work_patterns_does_not_block(self):
+        path = os.path.join(self.temp_dir, 'patterns.png')
+        image = self.analyzer.plot_work_patterns(path)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), image)
+
+
+if __name__ == '__main__':
+    unittest.main()
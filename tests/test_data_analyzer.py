@@ -18,4 +18,230 @@
 - テストカバレッジを高めること
 - テストの独立性を保つこと（テスト間の依存を避ける）
 - テストデータはテストケースごとに適切に準備し、テスト実行後はクリーンアップすること
-"""
\ No newline at end of file
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from src.data.analytics_engine import SessionAnalytics
+from src.data.data_analyzer import DataAnalyzer
+from src.data import session_store
+from src.data.database import Database
+from src.data.session_store import SessionColumnStore
+from src.data.streaming_report import RunningStats, TDigest
+
+
+class TestDataAnalyzer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.database = Database({'database_path': os.path.join(self.temp_dir, 'test.db')})
+        self.database.initialize()
+        self.analyzer = DataAnalyzer(self.database)
+        self.start = datetime(2024, 1, 1, 8, 0)
+        self.added = 0
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _add_sessions(self, count):
+        rows = []
+        for index in range(self.added, self.added + count):
+            start_time = self.start + timedelta(hours=index * 5)
+            rows.append((start_time, start_time + timedelta(minutes=25), 1500 + index % 7 * 60))
+        self.database.execute_many("INSERT INTO sessions (start_time, end_time, duration) VALUES (?, ?, ?)", rows)
+        self.added += count
+
+    def _expected_patterns(self):
+        df = pd.DataFrame(self.database.execute_query("SELECT start_time, duration FROM sessions"))
+        df['start_time'] = pd.to_datetime(df['start_time'])
+        return {
+            'hourly_pattern': df.groupby(df['start_time'].dt.hour)['duration'].mean().to_dict(),
+            'daily_pattern': df.groupby(df['start_time'].dt.dayofweek)['duration'].mean().to_dict(),
+        }
+
+    def test_incremental_updates_match_full_computation(self):
+        self._add_sessions(100)
+        self.analyzer.generate_productivity_report()
+        self._add_sessions(30)
+
+        self.assertEqual(self.analyzer.analyze_work_patterns(), self._expected_patterns())
+        stats = self.analyzer.generate_focus_time_statistics()
+        durations = [row['duration'] for row in self.database.execute_query("SELECT duration FROM sessions")]
+        self.assertEqual(stats['total_focus_time'], sum(durations))
+        self.assertEqual(stats['max_focus_time'], max(durations))
+        self.assertEqual(self.analyzer.sessions.full_loads, 1)
+        self.assertEqual(self.analyzer.sessions.incremental_loads, 1)
+        self.assertFalse(self.analyzer.sessions.refresh())
+
+    def test_deleted_sessions_trigger_reload(self):
+        self._add_sessions(50)
+        self.analyzer.analyze_work_patterns()
+        self.database.execute_update("DELETE FROM sessions WHERE id <= 10")
+        self._add_sessions(10)
+
+        self.assertEqual(self.analyzer.analyze_work_patterns(), self._expected_patterns())
+        self.assertEqual(self.analyzer.sessions.full_loads, 2)
+        self.assertEqual(sum(self.analyzer.get_daily_work_time(days=None).values()),
+                         self.analyzer.generate_focus_time_statistics()['total_focus_time'])
+
+    def test_sql_and_pandas_backends_agree(self):
+        self._add_sessions(80)
+        self.database.execute_insert("INSERT INTO sessions (start_time, duration) VALUES (?, NULL)", (self.start,))
+        sql = SessionAnalytics(self.database, backend='sql')
+        pandas_backend = SessionAnalytics(self.database, backend='pandas')
+        self.assertEqual(sql.work_patterns(), pandas_backend.work_patterns())
+        self.assertEqual(sql.daily_work_time(), pandas_backend.daily_work_time())
+        self.assertEqual(sql.focus_time_statistics(), pandas_backend.focus_time_statistics())
+
+    def test_column_store_is_persisted_and_appended(self):
+        self._add_sessions(40)
+        self.assertEqual(len(self.analyzer.store['id']), 40)
+        self._add_sessions(5)
+
+        # 別のインスタンスはキャッシュを読み込み、追加分だけをDBから読む
+        store = SessionColumnStore(self.database)
+        self.assertEqual(store.refresh(), 5)
+        self.assertEqual(store.rebuilds, 0)
+        self.assertIsInstance(store['start'], np.memmap)
+        self.assertEqual(store['start'].dtype, np.int64)
+        self.assertEqual(store['duration'].dtype, np.float32)
+        self.assertEqual(store['task_id'].tolist(), [-1] * 45)
+
+        self.database.execute_update("DELETE FROM sessions WHERE id <= 10")
+        self.assertEqual(store.refresh(), 35)
+        self.assertEqual(store.rebuilds, 1)
+
+    def test_column_store_unmaps_before_appending(self):
+        self._add_sessions(10)
+        store = self.analyzer.store
+        store.refresh()
+        self.assertIsInstance(store._columns['id'], np.memmap)
+        self._add_sessions(5)
+
+        mapped = []
+        append_npy = session_store._append_npy
+
+        def record(*args):
+            # 追記中のファイルを、ストアがメモリマップしていないこと
+            mapped.append(any(isinstance(column, np.memmap) for column in store._columns.values()))
+            append_npy(*args)
+
+        with mock.patch('src.data.session_store._append_npy', side_effect=record):
+            self.assertEqual(store.refresh(), 5)
+        self.assertEqual(mapped, [False] * 4)
+        self.assertEqual(len(store['id']), 15)
+
+    def test_vectorized_metrics(self):
+        self._add_sessions(30)
+        df = pd.DataFrame(self.database.execute_query("SELECT start_time, duration FROM sessions"))
+        df['start_time'] = pd.to_datetime(df['start_time'])
+
+        heatmap = self.analyzer.get_hour_weekday_heatmap()
+        expected = df.groupby([df['start_time'].dt.dayofweek, df['start_time'].dt.hour])['duration'].sum()
+        for (weekday, hour), total in expected.items():
+            self.assertEqual(heatmap[weekday, hour], total)
+        self.assertEqual(heatmap.sum(), df['duration'].sum())
+
+        daily = df.groupby(df['start_time'].dt.strftime('%Y-%m-%d'))['duration'].sum()
+        rolling = self.analyzer.get_rolling_focus_average(window_days=3, days=len(daily))
+        self.assertEqual(list(rolling), list(daily.index))
+        self.assertAlmostEqual(rolling[daily.index[-1]], daily.iloc[-3:].mean())
+
+        self.assertEqual(self.analyzer.get_focus_streaks()['longest_streak'], len(daily))
+        percentiles = self.analyzer.get_duration_percentiles((50, 90))
+        self.assertAlmostEqual(percentiles[90], np.percentile(df['duration'], 90))
+
+    def test_streaming_report_matches_in_memory(self):
+        self._add_sessions(250)
+        in_memory = self.analyzer.generate_productivity_report()
+        streaming = self.analyzer.generate_productivity_report(streaming=True, chunk_size=16)
+
+        self.assertEqual(streaming['task_completion_rate'], in_memory['task_completion_rate'])
+        for name in ('hourly_pattern', 'daily_pattern'):
+            self.assertEqual(streaming['work_patterns'][name].keys(), in_memory['work_patterns'][name].keys())
+            for key, value in in_memory['work_patterns'][name].items():
+                self.assertAlmostEqual(streaming['work_patterns'][name][key], value)
+        for key, value in in_memory['focus_time_stats'].items():
+            self.assertAlmostEqual(streaming['focus_time_stats'][key], value)
+
+        expected = in_memory['focus_time_distribution']
+        actual = streaming['focus_time_distribution']
+        self.assertEqual(actual['count'], expected['count'])
+        self.assertEqual(actual['min_focus_time'], expected['min_focus_time'])
+        self.assertAlmostEqual(actual['variance'], expected['variance'], places=3)
+        for p, value in expected['percentiles'].items():
+            self.assertAlmostEqual(actual['percentiles'][p], value, delta=60)
+
+    def test_mergeable_accumulators(self):
+        rng = np.random.default_rng(0)
+        values = rng.lognormal(7, 0.5, 20000)
+        stats = RunningStats()
+        digests = []
+        for part in np.array_split(values, 7):
+            stats.merge(RunningStats.from_array(part))
+            digest = TDigest()
+            digest.add_array(part)
+            digests.append(digest)
+        merged = digests[0]
+        for digest in digests[1:]:
+            merged.merge(digest)
+
+        self.assertEqual(stats.count, len(values))
+        self.assertAlmostEqual(stats.mean, values.mean())
+        self.assertAlmostEqual(stats.variance, values.var(), delta=values.var() * 1e-9)
+        self.assertEqual((stats.minimum, stats.maximum), (values.min(), values.max()))
+        for q in (0.01, 0.5, 0.9, 0.99):
+            # 順位の誤差が1%以内であること
+            rank = (values < merged.quantile(q)).mean()
+            self.assertAlmostEqual(rank, q, delta=0.01)
+
+    def test_period_report_in_worker_processes(self):
+        self._add_sessions(60)
+        serial = self.analyzer.generate_period_report(max_workers=0)
+        parallel = self.analyzer.generate_period_report(max_workers=2)
+
+        self.assertEqual(parallel.keys(), serial.keys())
+        np.testing.assert_array_equal(parallel.pop('hour_weekday_heatmap'), serial.pop('hour_weekday_heatmap'))
+        self.assertEqual(parallel, serial)
+        self.assertEqual(sum(serial['weekly_work_time'].values()), serial['focus_time_stats']['total_focus_time'])
+
+    def test_small_period_report_skips_worker_processes(self):
+        self._add_sessions(20)
+        with mock.patch('src.data.data_analyzer.ProcessPoolExecutor') as executor:
+            report = self.analyzer.generate_period_report()
+
+        executor.assert_not_called()
+        self.assertEqual(sum(report['weekly_work_time'].values()), report['focus_time_stats']['total_focus_time'])
+
+    def test_read_only_store_does_not_touch_cache(self):
+        self._add_sessions(20)
+        self.analyzer.store.refresh()
+        self._add_sessions(5)
+        meta_path = self.analyzer.store._meta_path
+        with open(meta_path, encoding='utf-8') as f:
+            meta = f.read()
+
+        database = Database({'database_path': os.path.join(self.temp_dir, 'test.db')})
+        database.initialize(read_only=True)
+        store = SessionColumnStore(database)
+        self.assertEqual(len(store['id']), 25)
+        with open(meta_path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), meta)
+        database.close()
+
+    def test_completion_rate(self):
+        self.assertEqual(self.analyzer.calculate_task_completion_rate(), 0)
+        self.database.execute_many("INSERT INTO tasks (title, status) VALUES (?, ?)",
+                                   [("a", '完了'), ("b", '未着手'), ("c", '完了'), ("d", None)])
+        self.assertEqual(self.analyzer.calculate_task_completion_rate(), 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
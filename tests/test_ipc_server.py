@@ -0,0 +1,170 @@
+"""
+ヘッドレスデーモン（IPCサーバー）のテスト
+
+役割:
+- JSON-RPC APIの基本動作と、多数のローカルクライアントからの同時接続を確認
+
+主な内容:
+- タイマー・タスク・セッションの各メソッド呼び出し
+- 存在しないメソッドのエラー応答
+- 多数クライアントの同時呼び出しによる負荷テスト
+
+使用するクラス/モジュール:
+- unittest
+- unittest.mock
+
+注意点:
+- サーバーは専用スレッドのイベントループで動かし、DBもそのスレッドで初期化すること
+- テストごとに一時ディレクトリを作成し、終了後に削除すること
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from src.core.ipc_client import IPCClient, RemoteAIConversationManager, RemoteTimer, RemoteTaskManager
+from src.core.ipc_protocol import IPCError, INTERNAL_ERROR, INVALID_PARAMS, METHOD_NOT_FOUND
+from src.core.ipc_server import IPCServer
+from src.core.session_manager import SessionManager
+from src.core.task_manager import TaskManager
+from src.core.timer import Timer, TimerState
+from src.data.ai_conversation import AIConversationManager
+from src.data.database import Database
+
+
+class FakeConfig:
+    def __init__(self, **settings):
+        self._settings = settings
+
+    def get(self, key, default=None):
+        return self._settings.get(key, default)
+
+    def set(self, key, value):
+        self._settings[key] = value
+
+    def load(self):
+        pass
+
+
+class TestIPCServer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config = FakeConfig(database_path=os.path.join(self.temp_dir, 'test.db'), work_time=60)
+        if sys.platform == 'win32':
+            self.address = 'tcp://127.0.0.1:47699'
+        else:
+            self.address = os.path.join(self.temp_dir, 'test.sock')
+        self.server = None
+        self.ready = threading.Event()
+        self.server_thread = threading.Thread(target=self._run_server, daemon=True)
+        self.server_thread.start()
+        self.assertTrue(self.ready.wait(5))
+
+    def tearDown(self):
+        self.timer.stop()
+        self.server.close_threadsafe()
+        self.server_thread.join(5)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _run_server(self):
+        # DB接続はサーバーのスレッドで作成する
+        database = Database(self.config)
+        database.initialize()
+        self.timer = Timer(self.config, MagicMock())
+        self.server = IPCServer(self.address, self.timer, SessionManager(database, self.config),
+                                TaskManager(database, self.config), AIConversationManager(database), self.config)
+
+        async def serve():
+            await self.server.start()
+            self.ready.set()
+            await self.server.serve_forever()
+
+        asyncio.run(serve())
+        database.close()
+
+    def test_ping_and_unknown_method(self):
+        with IPCClient(self.address) as client:
+            self.assertEqual(client.call('server.ping'), 'pong')
+            with self.assertRaises(IPCError) as context:
+                client.call('task._add_task_history')
+            self.assertEqual(context.exception.code, METHOD_NOT_FOUND)
+
+    def test_invalid_params_and_handler_errors(self):
+        with IPCClient(self.address) as client:
+            with self.assertRaises(IPCError) as context:
+                client.call('task.get_task', no_such_param=1)
+            self.assertEqual(context.exception.code, INVALID_PARAMS)
+
+        # 引数は正しく、メソッドの中で TypeError が起きた場合は引数の誤りとして返さない
+        self.server.methods['task.get_task'] = lambda task_id: task_id + "1"
+        with IPCClient(self.address) as client:
+            with self.assertRaises(IPCError) as context:
+                client.call('task.get_task', task_id=1)
+            self.assertEqual(context.exception.code, INTERNAL_ERROR)
+
+    def test_remote_task_manager(self):
+        with IPCClient(self.address) as client:
+            task_manager = RemoteTaskManager(client)
+            parent_id = task_manager.create_task("親タスク")
+            task_manager.create_task("子タスク", parent_id=parent_id)
+            tree = task_manager.get_task_tree()
+            self.assertEqual(len(tree), 1)
+            self.assertEqual(tree[0].subtasks[0].title, "子タスク")
+
+    def test_timer_updates_are_pushed_to_subscribers(self):
+        updates = []
+        received = threading.Event()
+        with IPCClient(self.address) as client:
+            timer = RemoteTimer(client, self.config)
+
+            def observer(state, timer_type, remaining_time):
+                updates.append(state)
+                received.set()
+
+            timer.add_observer(observer)
+            timer.start()
+            self.assertTrue(received.wait(5))
+            self.assertEqual(updates[0], TimerState.RUNNING)
+            timer.stop()
+
+    def test_conversation_deletions_are_pushed_to_subscribers(self):
+        deleted = threading.Event()
+        with IPCClient(self.address) as client:
+            RemoteAIConversationManager(client).on_deleted(deleted.set)
+            self.server.notify_conversations_deleted()
+            self.assertTrue(deleted.wait(5))
+
+    def test_many_concurrent_clients(self):
+        client_count = 50
+        calls_per_client = 20
+
+        def run_client(index):
+            with IPCClient(self.address) as client:
+                for i in range(calls_per_client):
+                    task_id = client.call('task.create_task', title=f"タスク{index}-{i}")
+                    task = client.call('task.get_task', task_id=task_id)
+                    assert task['title'] == f"タスク{index}-{i}"
+                    client.call('timer.get_state')
+            return calls_per_client
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=client_count) as executor:
+            completed = sum(executor.map(run_client, range(client_count)))
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(completed, client_count * calls_per_client)
+        with IPCClient(self.address) as client:
+            self.assertEqual(len(client.call('task.get_all_tasks')), client_count * calls_per_client)
+        # 3000回の呼び出しが、1回ずつ数十msかかるような詰まり方をしていないこと
+        self.assertLess(elapsed, 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+通知管理のユニットテスト
+
+役割:
+- 通知キューの流量制御（優先度、統合、重複抑制、上限）が正しく動作することを確認
+
+主な内容:
+- 優先度順の取り出し
+- 送信待ちの同一キーの統合と、表示直後の重複の抑制
+- キューがあふれた場合の破棄とメトリクス
+- 連続した通知が1本のワーカーで表示されること
+- バックエンドの差し替え
+
+使用するクラス/モジュール:
+- unittest
+- unittest.mock
+
+注意点:
+- 時刻は差し替え可能な時計関数で制御し、実時間に依存しないこと
+"""
+
+import threading
+import unittest
+
+from src.core.notification_backends import NullBackend, RecordingBackend, create_backend
+from src.core.notification_manager import NotificationManager, NotificationPriority, NotificationQueue
+
+
+class TestNotificationQueue(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.queue = NotificationQueue(maxsize=3, dedup_window=30, clock=lambda: self.now)
+
+    def test_priority_order(self):
+        self.queue.put('low', "低", "", NotificationPriority.LOW)
+        self.queue.put('high', "高", "", NotificationPriority.HIGH)
+        self.queue.put('normal', "中", "", NotificationPriority.NORMAL)
+        self.assertEqual([self.queue.pop().key for _ in range(3)], ['high', 'normal', 'low'])
+        self.assertIsNone(self.queue.pop())
+
+    def test_pending_notifications_are_merged(self):
+        self.assertEqual(self.queue.put('goal', "目標", "1回目"), 'enqueued')
+        self.assertEqual(self.queue.put('goal', "目標", "2回目"), 'merged')
+        item = self.queue.pop()
+        self.assertEqual(item.message, "2回目")
+        self.assertEqual(item.merged_count, 1)
+        self.assertEqual(self.queue.metrics['merged'], 1)
+
+    def test_recently_shown_notifications_are_deduplicated(self):
+        self.queue.put('timer', "タイマー終了", "")
+        self.queue.pop()
+        self.now = 10
+        self.assertEqual(self.queue.put('timer', "タイマー終了", ""), 'deduplicated')
+        self.now = 31
+        self.assertEqual(self.queue.put('timer', "タイマー終了", ""), 'enqueued')
+
+    def test_overflow_drops_lowest_priority(self):
+        for index in range(3):
+            self.queue.put(f'low{index}', "低", "", NotificationPriority.LOW)
+        self.assertEqual(self.queue.put('high', "高", "", NotificationPriority.HIGH), 'enqueued')
+        self.assertEqual(self.queue.put('low3', "低", "", NotificationPriority.LOW), 'dropped')
+        self.assertEqual(self.queue.metrics['dropped'], 2)
+        self.assertEqual(self.queue.pop().key, 'high')
+
+
+class TestNotificationManager(unittest.TestCase):
+    def test_recording_backend(self):
+        backend = RecordingBackend()
+        manager = NotificationManager({}, backend=backend)
+        manager.notify_task_completion("レポート作成")
+        while manager._worker_active:
+            threading.Event().wait(0.01)
+        self.assertEqual(backend.notifications, [("タスク完了", "タスク「レポート作成」が完了しました。お疲れ様でした！")])
+
+    def test_named_backends(self):
+        self.assertIsInstance(create_backend('null'), NullBackend)
+        with self.assertRaises(ValueError):
+            create_backend('unknown')
+
+    def test_burst_is_shown_one_at_a_time(self):
+        manager = NotificationManager({'notification_rate_limit': 0})
+        shown = []
+        active = []
+        max_active = []
+        done = threading.Event()
+
+        def show(title, message):
+            active.append(title)
+            max_active.append(len(active))
+            threading.Event().wait(0.01)
+            shown.append(title)
+            active.remove(title)
+            if len(shown) == 4:
+                done.set()
+
+        manager._show_notification = show
+        manager.notify_timer_complete('WORK')
+        manager.notify_long_work_session(3 * 60 * 60)
+        manager.notify_task_completion("レポート作成")
+        manager.notify_daily_goal_achieved()
+        manager.notify_daily_goal_achieved()
+
+        self.assertTrue(done.wait(2))
+        while manager._worker_active:
+            threading.Event().wait(0.01)
+        self.assertEqual(max(max_active), 1)
+        metrics = manager.get_metrics()
+        self.assertEqual(metrics['shown'], 4)
+        self.assertEqual(metrics['merged'] + metrics['deduplicated'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+機密情報の保管のユニットテスト
+
+役割:
+- 暗号化した機密情報がプロセス内で一度だけ復号され、キャッシュから返されることを確認
+
+主な内容:
+- 復号結果のキャッシュと、設定の変更・invalidate() による復号のやり直し
+- 暗号化キーの更新（設定に保存した機密情報の再暗号化と、設定ファイルのキーの更新）
+- キーの更新が途中で終わった設定ファイルの読み込み
+
+使用するクラス/モジュール:
+- unittest
+
+注意点:
+- テストごとに一時ディレクトリのファイルを使い、終了後に削除すること
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from src.data.settings_manager import SettingsManager
+from src.utils.secret_store import SecretStore, secret_store
+
+
+class _DictConfig(dict):
+    """Config と同じ get / set / items / update を持つ設定"""
+
+    def set(self, key, value):
+        self[key] = value
+
+
+class TestSecretStore(unittest.TestCase):
+    def setUp(self):
+        self.store = SecretStore()
+        self.config = _DictConfig()
+        self.store.set_secret(self.config, 'openai_api_key', 'sk-test')
+        self.store.invalidate()
+
+    def test_decrypts_once_and_returns_cached_value(self):
+        for _ in range(100):
+            self.assertEqual(self.store.get_secret(self.config, 'openai_api_key'), 'sk-test')
+        self.assertEqual(self.store.decryptions, 1)
+
+    def test_changed_setting_is_decrypted_again(self):
+        self.store.get_secret(self.config, 'openai_api_key')
+        key = self.config['encryption_key'].encode()
+        self.config['encrypted_openai_api_key'] = Fernet(key).encrypt(b'sk-other').decode()
+        self.assertEqual(self.store.get_secret(self.config, 'openai_api_key'), 'sk-other')
+        self.assertEqual(self.store.decryptions, 2)
+
+    def test_invalidate_drops_cached_values(self):
+        self.store.get_secret(self.config, 'openai_api_key')
+        self.store.invalidate('openai_api_key')
+        self.store.get_secret(self.config, 'openai_api_key')
+        self.assertEqual(self.store.decryptions, 2)
+
+    def test_missing_or_cleared_secret_returns_none(self):
+        self.assertIsNone(self.store.get_secret(self.config, 'other_key'))
+        self.store.set_secret(self.config, 'openai_api_key', '')
+        self.assertIsNone(self.store.get_secret(self.config, 'openai_api_key'))
+
+    def test_rotate_reencrypts_secrets_with_new_key(self):
+        old_key = self.config['encryption_key']
+        self.config['encrypted_other'] = Fernet(old_key.encode()).encrypt(b'secret').decode()
+
+        self.assertEqual(self.store.rotate(self.config), 2)
+        new_key = self.config['encryption_key']
+        self.assertNotEqual(new_key, old_key)
+        with self.assertRaises(InvalidToken):
+            Fernet(old_key.encode()).decrypt(self.config['encrypted_openai_api_key'].encode())
+        self.assertEqual(Fernet(new_key.encode()).decrypt(self.config['encrypted_other'].encode()), b'secret')
+
+        # 再暗号化した値はキャッシュに入っているため、復号し直さない
+        self.assertEqual(self.store.get_secret(self.config, 'openai_api_key'), 'sk-test')
+        self.assertEqual(self.store.get_secret(self.config, 'other'), 'secret')
+        self.assertEqual(self.store.decryptions, 0)
+
+
+class TestSettingsManagerKeys(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.settings_file = os.path.join(self.temp_dir, 'settings.json')
+        self.key_file = os.path.join(self.temp_dir, 'encryption_key.key')
+
+    def tearDown(self):
+        secret_store.invalidate()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_key_file_is_read_once(self):
+        first = SettingsManager(self.settings_file, self.key_file)
+        with open(self.key_file, 'wb') as f:
+            f.write(Fernet.generate_key())
+        second = SettingsManager(self.settings_file, self.key_file)
+        self.assertEqual(second.encryption_key, first.encryption_key)
+
+    def test_rotate_encryption_key(self):
+        manager = SettingsManager(self.settings_file, self.key_file)
+        manager.save({'work_time': 1500})
+        old_key = manager.encryption_key
+
+        manager.rotate_encryption_key({'work_time': 1500})
+        with open(self.key_file, 'rb') as f:
+            self.assertNotEqual(f.read(), old_key)
+        self.assertFalse(os.path.exists(f"{self.key_file}.old"))
+        secret_store.invalidate()
+        self.assertEqual(SettingsManager(self.settings_file, self.key_file).load(), {'work_time': 1500})
+
+    def test_interrupted_rotation_can_still_be_loaded(self):
+        manager = SettingsManager(self.settings_file, self.key_file)
+        manager.save({'work_time': 1500})
+        # 古いキーを残して新しいキーを書いたところで中断した状態
+        with open(f"{self.key_file}.old", 'wb') as f:
+            f.write(manager.encryption_key)
+        with open(self.key_file, 'wb') as f:
+            f.write(Fernet.generate_key())
+
+        secret_store.invalidate()
+        self.assertEqual(SettingsManager(self.settings_file, self.key_file).load(), {'work_time': 1500})
+
+
+if __name__ == '__main__':
+    unittest.main()
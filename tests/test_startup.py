@@ -0,0 +1,45 @@
+"""
+起動時の読み込みのテスト
+
+役割:
+- アプリの起動時に読み込むモジュールが、重いライブラリを読み込まないことを確認
+
+主な内容:
+- コアモジュールと分析モジュールの読み込み後に pandas / matplotlib / requests が読み込まれていないこと
+
+使用するクラス/モジュール:
+- unittest
+- subprocess
+
+注意点:
+- 他のテストで読み込まれたモジュールの影響を受けないよう、新しいプロセスで確認すること
+- 起動時間そのものの予算は benchmarks/bench_startup.py で確認する
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestStartupImports(unittest.TestCase):
+    def _loaded_after_import(self, modules, candidates):
+        code = ("import sys; " + "; ".join(f"import {name}" for name in modules) +
+                f"; print(','.join(m for m in {candidates!r} if m in sys.modules))")
+        result = subprocess.run([sys.executable, '-c', code], cwd=project_root,
+                                capture_output=True, text=True, check=True)
+        return [name for name in result.stdout.strip().split(',') if name]
+
+    def test_core_modules_do_not_load_heavy_libraries(self):
+        modules = ['src.core.timer', 'src.core.session_manager', 'src.core.task_manager',
+                   'src.core.notification_manager', 'src.core.ai_interface', 'src.data.ai_conversation']
+        self.assertEqual(self._loaded_after_import(modules, ['pandas', 'matplotlib', 'numpy', 'requests']), [])
+
+    def test_analyzer_defers_pandas_and_matplotlib(self):
+        self.assertEqual(self._loaded_after_import(['src.data.data_analyzer'], ['pandas', 'matplotlib']), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
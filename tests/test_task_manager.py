@@ -1,14 +1,24 @@
+import os
+import shutil
+import sqlite3
+import tempfile
 import unittest
 from datetime import datetime, timedelta
 from src.core.task_manager import TaskManager
 from src.data.database import Database
-from src.utils.config import config
+from src.data.task_data import Task
 
 class TestTaskManager(unittest.TestCase):
     def setUp(self):
-        self.config = config
+        self.temp_dir = tempfile.mkdtemp()
+        self.config = {'database_path': os.path.join(self.temp_dir, 'test.db')}
         self.database = Database(self.config)
-        self.task_manager = TaskManager(self.database)
+        self.database.initialize()
+        self.task_manager = TaskManager(self.database, self.config)
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
 
     def test_create_task(self):
         task_id = self.task_manager.create_task("テストタスク", "説明", priority=1, due_date=datetime.now() + timedelta(days=1))
@@ -28,5 +38,34 @@ class TestTaskManager(unittest.TestCase):
         self.assertEqual(tasks[0].title, "今日のタスク")
         self.assertEqual(tasks[-1].title, "明日のタスク")
 
+    def test_priority_and_due_date_are_saved(self):
+        due_date = datetime(2024, 6, 1, 9, 30)
+        parent_id, = self.task_manager.create_tasks([
+            Task(title="親タスク", priority=2, due_date=due_date, subtasks=[Task(title="子タスク", priority=1)])])
+        parent = self.task_manager.get_task(parent_id)
+        self.assertEqual((parent.priority, parent.due_date), (2, due_date))
+
+        parent.priority = 3
+        parent.due_date = None
+        self.task_manager.update_task(parent)
+        self.assertEqual([(task.title, task.priority, task.due_date) for task in self.task_manager.get_all_tasks()],
+                         [("親タスク", 3, None), ("子タスク", 1, None)])
+
+    def test_migration_adds_priority_and_due_date(self):
+        self.database.close()
+        path = os.path.join(self.temp_dir, 'old.db')
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY, title TEXT NOT NULL, description TEXT, status TEXT, "
+                     "parent_id INTEGER, created_at TIMESTAMP, updated_at TIMESTAMP)")
+        conn.execute("INSERT INTO tasks (title) VALUES ('既存のタスク')")
+        conn.commit()
+        conn.close()
+
+        self.database = Database({'database_path': path})
+        self.database.initialize()
+        task_manager = TaskManager(self.database, self.config)
+        task_manager.create_task("新しいタスク", priority=1)
+        self.assertEqual([task.priority for task in task_manager.get_tasks_by_priority()], [1, 0])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -17,4 +17,52 @@
 - テストカバレッジを高めること
 - テストの独立性を保つこと（テスト間の依存を避ける）
 - テストデータはテストケースごとに適切に準備し、テスト実行後はクリーンアップすること
-"""
\ No newline at end of file
+"""
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from src.core.async_runtime import AsyncRuntime
+from src.core.timer import Timer, TimerState, TimerType
+
+
+class TestAsyncioTimer(unittest.TestCase):
+    def setUp(self):
+        self.runtime = AsyncRuntime()
+        self.runtime.start()
+        self.notification_manager = MagicMock()
+        self.timer = Timer({'work_time': 3, 'short_break': 2}, self.notification_manager, self.runtime)
+        self.timer.tick_interval = 0.01
+        self.timer.remaining_time = 3
+
+    def tearDown(self):
+        self.runtime.stop()
+
+    def test_ticks_until_completion(self):
+        completed = threading.Event()
+        remaining = []
+
+        def observer(state, timer_type, remaining_time):
+            remaining.append(remaining_time)
+            if timer_type == TimerType.SHORT_BREAK:
+                completed.set()
+
+        self.timer.add_observer(observer)
+        self.timer.start()
+        self.assertTrue(completed.wait(2))
+        self.assertEqual(remaining[:4], [3, 2, 1, 0])
+        self.assertEqual(self.timer.pomodoro_count, 1)
+        self.notification_manager.notify_timer_complete.assert_called_once_with('WORK')
+
+    def test_pause_cancels_pending_tick(self):
+        self.timer.remaining_time = 1000
+        self.timer.start()
+        self.timer.pause()
+        paused_at = self.timer.remaining_time
+        threading.Event().wait(0.05)
+        self.assertEqual(self.timer.state, TimerState.PAUSED)
+        self.assertEqual(self.timer.remaining_time, paused_at)
+
+
+if __name__ == '__main__':
+    unittest.main()